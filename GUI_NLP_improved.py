@@ -1,16 +1,19 @@
 import sys
 import os
 import json
-import time
 import re
-from queue import Queue
 from threading import Thread
 
 from PyQt6 import QtWidgets, QtGui, QtCore
 from PyQt6.QtCore import Qt, pyqtSignal, QObject, pyqtSlot
 
 from voice_recognition_improved import VoiceRecognizer
-from command_process import execute_command_gui
+from command_executor import CommandExecutor, DependencyFailed
+from command_pipeline import CommandPipeline
+import command_process
+import metrics
+import tracing
+from analysis_cache import analysis_cache
 from prompts import commands_description
 from chat_bubble import ChatBubble
 
@@ -36,7 +39,13 @@ import ai_functions_keeper_updated as ai_functions
 # Constants
 CHAT_HISTORY_FILE = "chat_history.json"
 MAX_HISTORY_ENTRIES = 100
-command_queue = Queue()  # Global command queue for compatibility
+METRICS_PORT = 9464
+# Hands-free voice input: a key that toggles recording like the mic button, and the always-on
+# wake-word listener (needs recorded templates in wake_word/, see wake_word.enroll)
+PUSH_TO_TALK_KEY = "F9"
+WAKE_WORD_ENABLED = False
+# Words that ask to repeat an analysis instead of returning the stored result
+RERUN_PATTERN = re.compile(r"\b(re-?run|again|redo|re-?analy[sz]e|fresh)\b", re.IGNORECASE)
 
 class TextEdit(QtWidgets.QTextEdit):
     def __init__(self, alignment='right', bubble_color="#F5FAFF", parent=None):
@@ -174,6 +183,9 @@ class ProcessMessageManager(QObject):
 
 
 class ChatWindow(QtWidgets.QMainWindow):
+    # Finished command futures are handed to the GUI thread through this signal
+    command_completed = pyqtSignal(object, object)
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("AI Assistant Chat")
@@ -184,21 +196,45 @@ class ChatWindow(QtWidgets.QMainWindow):
         self.pending_args = None
 
         self.process_manager = ProcessMessageManager(self)
+
+        # Assistant bubble currently receiving a streamed answer
+        self.stream_bubble = None
         
         # Initialize voice recognizer
         self.voice_recognizer = VoiceRecognizer()
         self.voice_recognizer.transcription_complete.connect(self.handle_transcribed_text)
+        self.voice_recognizer.partial_transcription.connect(self.show_partial_transcription)
         self.voice_recognizer.recording_status.connect(self.update_mic_status)
         self.voice_recognizer.error_occurred.connect(self.handle_voice_error)
         # self.voice_recognizer.audio_level.connect(self.update_audio_level)
         
         # Setup UI
         self.setup_ui()
+
+        # Push-to-talk key, works anywhere in the window
+        self.push_to_talk = QtGui.QShortcut(QtGui.QKeySequence(PUSH_TO_TALK_KEY), self)
+        self.push_to_talk.setContext(Qt.ShortcutContext.ApplicationShortcut)
+        self.push_to_talk.activated.connect(self.toggle_recording)
+        self.wake_word_listener = None
+        if WAKE_WORD_ENABLED:
+            self.start_wake_word_listener()
+
+        # Preload the local Ollama model in the background so the first offline request is fast
+        ai_functions.ollama_models.start()
+
+        # Command telemetry: Prometheus /metrics endpoint and a summary in the log every 5 minutes
+        metrics.start_metrics_server(METRICS_PORT)
+        self.telemetry_stop = metrics.start_log_summary(command_process.telemetry_summary, interval=300)
         
-        # Command queue and processing thread
-        self.listener_thread = Thread(target=self.command_listener, daemon=True)
-        self.listener_active = True
-        self.listener_thread.start()
+        # Commands run on a small worker pool; completion callbacks come back on the GUI thread
+        self.command_completed.connect(self.run_command_callback)
+        self.command_executor = CommandExecutor(
+            max_workers=3,
+            dispatch=lambda callback, future: self.command_completed.emit(callback, future)
+        )
+        # One pipeline for the session: a command also waits for the still running commands of
+        # earlier messages that change the state it needs (e.g. a loadData sent just before)
+        self.command_pipeline = CommandPipeline(self.command_executor)
         
         # Display welcome message
         QtCore.QTimer.singleShot(0, lambda: self.display_assistant_message("Hello! How can I assist you?"))
@@ -372,6 +408,11 @@ class ChatWindow(QtWidgets.QMainWindow):
         ]
 
         # Add voice recognition language options
+        auto_voice_action = voice_menu.addAction("Auto-detect (Default)")
+        auto_voice_action.setCheckable(True)
+        auto_voice_action.setChecked(self.voice_recognizer.language is None)
+        auto_voice_action.triggered.connect(lambda: self.change_voice_language(None, "auto-detect"))
+        voice_menu.addSeparator()
         for lang in languages:
             action = voice_menu.addAction(lang["name"])
             action.setCheckable(True)
@@ -454,13 +495,34 @@ class ChatWindow(QtWidgets.QMainWindow):
 
     def handle_microphone_button(self):
         if self.micButton.isChecked():
-            self.voice_recognizer.start_recording()
+            if self.wake_word_listener is not None and self.wake_word_listener.running:
+                # The listener already has the microphone open; record from its stream
+                self.wake_word_listener.record()
+            else:
+                self.voice_recognizer.start_recording()
             # self.audio_level_indicator.show()
         else:
             self.voice_recognizer.stop_recording()
             # self.audio_level_indicator.hide()
             # self.audio_level_indicator.setValue(0)
 
+    def toggle_recording(self):
+        """Push-to-talk key: same as clicking the mic button"""
+        self.micButton.setChecked(not self.micButton.isChecked())
+        self.handle_microphone_button()
+
+    def start_wake_word_listener(self):
+        """Listen for the wake word; the recording it starts stops by itself after the command"""
+        from wake_word import KeywordSpotter, WakeWordListener
+        try:
+            spotter = KeywordSpotter.from_folder()
+        except ValueError as e:
+            print(f"Wake word disabled: {e}")
+            return
+        self.wake_word_listener = WakeWordListener(self.voice_recognizer.engine, spotter)
+        if not self.wake_word_listener.start():
+            self.wake_word_listener = None
+
     def update_mic_status(self, is_recording):
         if is_recording:
             self.micButton.setToolTip("Recording... Click to stop")
@@ -475,6 +537,11 @@ class ChatWindow(QtWidgets.QMainWindow):
     def handle_voice_error(self, error_message):
         self.display_assistant_message(f"Voice recognition error: {error_message}")
 
+    @pyqtSlot(str)
+    def show_partial_transcription(self, text):
+        """Show the text recognized so far while the user is still speaking"""
+        self.inputField.setPlainText(text)
+
     @pyqtSlot(str)
     def handle_transcribed_text(self, text):
         if text:
@@ -483,54 +550,55 @@ class ChatWindow(QtWidgets.QMainWindow):
 
 
 
-    def command_listener(self):
-        # Keep track of commands in a sequence
-        command_sequence = []
-        
-        while self.listener_active:
-            try:
-                command, args = command_queue.get()
-                
-                # Add command to the sequence
-                command_sequence.append(command)
-                
-                def execute_and_display():
-                    try:
-                        msg, response = execute_command_gui(command, *args)
-                        print(f"Command executed, response: {response[:50]}...")
-                        
-                        # Only display response for commands after the first one
-                        # The first command's status message is already displayed in process_input
-                        # if len(command_sequence) > 1 or command_sequence[0] != command:
-                        QtCore.QMetaObject.invokeMethod(
-                            self, "display_assistant_message",
-                            QtCore.Qt.ConnectionType.QueuedConnection,
-                            QtCore.Q_ARG(str, response)
-                        )
-                        # else:
-                        #     print("Skipping display of first command response to avoid duplication")
-                            
-                        # Reset command sequence after all commands are processed
-                        if command_queue.empty():
-                            command_sequence.clear()
-                            
-                    except Exception as e:
-                        error_msg = f"Error executing command: {str(e)}"
-                        print(f"Error executing command: {e}")
-                        QtCore.QMetaObject.invokeMethod(
-                            self, "display_assistant_message",
-                            QtCore.Qt.ConnectionType.QueuedConnection,
-                            QtCore.Q_ARG(str, error_msg)
-                        )
-                    finally:
-                        command_queue.task_done()
-
-                execution_thread = Thread(target=execute_and_display, daemon=True)
-                execution_thread.start()
-                execution_thread.join()
-            except Exception as e:
-                print(f"Error in command listener: {e}")
-    
+    def submit_command(self, command, args):
+        """Run a command through the pipeline; its response is shown when the future completes"""
+        self.command_pipeline.start_request()
+        return self.command_pipeline.add(command, args, on_done=self.show_command_result)
+
+    def show_batch_result(self, future, steps):
+        """Display every step result of a finished command batch (runs on the GUI thread)"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            print(f"Error executing command batch: {error}")
+            self.display_assistant_message(f"Error executing command: {str(error)}")
+            return
+        results = future.result()
+        for result in results:
+            print(f"Command {result['command']} finished: {result['message'][:50]}...")
+            self.display_assistant_message(result["message"])
+        executed = [result for result in results if result["command"] != "batch"]
+        skipped = [command for command, _ in steps[len(executed):]]
+        if not skipped:
+            return
+        if not results:
+            reason = "PAUTReader returned no results for the batch."
+        elif results[-1]["command"] == "batch":
+            reason = "the batch request failed."
+        else:
+            reason = f"'{results[-1]['command']}' did not succeed."
+        self.display_assistant_message(f"Skipped {', '.join(skipped)}: {reason}")
+
+    def run_command_callback(self, callback, future):
+        callback(future)
+
+    def show_command_result(self, future):
+        """Display the response of a finished command (runs on the GUI thread)"""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if isinstance(error, DependencyFailed):
+            print(f"Skipped command: {error}")
+            self.display_assistant_message(f"Skipped '{error.command}': '{error.dependency}' did not succeed.")
+        elif error is not None:
+            print(f"Error executing command: {error}")
+            self.display_assistant_message(f"Error executing command: {str(error)}")
+        else:
+            msg, response = future.result()
+            print(f"Command executed, response: {response[:50]}...")
+            self.display_assistant_message(response)
+
     def display_assistant_message_from_thread(self, message):
         """Safe method to call display_assistant_message from a thread"""
         QtCore.QMetaObject.invokeMethod(
@@ -539,6 +607,57 @@ class ChatWindow(QtWidgets.QMainWindow):
             QtCore.Q_ARG(str, message)
         )
 
+    def stream_chat_response(self, user_input):
+        """Stream a chat answer into a live assistant bubble (called from a worker thread)"""
+        QtCore.QMetaObject.invokeMethod(
+            self, "begin_stream_message",
+            QtCore.Qt.ConnectionType.QueuedConnection
+        )
+
+        def send_batch(text):
+            QtCore.QMetaObject.invokeMethod(
+                self, "append_stream_delta",
+                QtCore.Qt.ConnectionType.QueuedConnection,
+                QtCore.Q_ARG(str, text)
+            )
+
+        response_text, stats = ai_functions.chat_stream_routed(user_input, send_batch)
+        if not response_text:
+            if LOCALIZATION_AVAILABLE:
+                send_batch(localization_manager.get_error_message("no_response"))
+            else:
+                send_batch("I processed your request but couldn't generate a proper response. Please try again.")
+
+        ttft_txt = f"{stats['ttft'] * 1000:.0f} ms" if stats.get("ttft") is not None else "n/a"
+        QtCore.QMetaObject.invokeMethod(
+            self, "finish_stream_message",
+            QtCore.Qt.ConnectionType.QueuedConnection,
+            QtCore.Q_ARG(str, ttft_txt)
+        )
+
+    @pyqtSlot()
+    def begin_stream_message(self):
+        """Create an empty assistant bubble that streamed text is appended to"""
+        self.stream_bubble = ChatBubble("", is_user=False)
+        self.chat_layout.addWidget(self.stream_bubble)
+        QtCore.QTimer.singleShot(0, self.auto_scroll_bottom)
+
+    @pyqtSlot(str)
+    def append_stream_delta(self, text):
+        """Append one coalesced batch of streamed tokens to the live bubble"""
+        if self.stream_bubble is None:
+            self.begin_stream_message()
+        self.stream_bubble.append_text(text)
+        QtCore.QTimer.singleShot(0, self.auto_scroll_bottom)
+
+    @pyqtSlot(str)
+    def finish_stream_message(self, ttft_txt):
+        """Close the live bubble and report time-to-first-token"""
+        if self.stream_bubble is not None:
+            self.stream_bubble.setToolTip(f"First token after {ttft_txt}")
+        print(f"Streaming finished, time to first token: {ttft_txt}")
+        self.stream_bubble = None
+
     @pyqtSlot(str)
     def display_user_message(self, message):
         message = message.replace('\n', '<br>')
@@ -564,7 +683,9 @@ class ChatWindow(QtWidgets.QMainWindow):
             return
             
         if user_text.lower() in ["/quit", "/exit", "/bye"]:
-            self.listener_active = False
+            self.command_executor.shutdown()
+            if self.wake_word_listener is not None:
+                self.wake_word_listener.stop()
             self.close()
             sys.exit()
             
@@ -573,6 +694,13 @@ class ChatWindow(QtWidgets.QMainWindow):
             self.inputField.clear()
             return
 
+        if user_text.lower() == "/cache":
+            self.inputField.clear()
+            lines = [f"{command}: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.0%})"
+                     for command, stats in analysis_cache.hit_rates().items()]
+            self.display_assistant_message("Analysis result cache\n" + "\n".join(lines))
+            return
+
         # Display user message
         self.display_user_message(user_text)
         self.inputField.clear()
@@ -592,6 +720,11 @@ class ChatWindow(QtWidgets.QMainWindow):
         Thread(target=self.process_input, args=(user_text,), daemon=True).start()
 
     def process_input(self, user_input):
+        """Process user input inside a trace covering everything the utterance triggers"""
+        with tracing.start_trace("process_input", chars=len(user_input)):
+            self.process_input_traced(user_input)
+
+    def process_input_traced(self, user_input):
         """Process user input using the updated functions"""
         try:
             # Clear any previous process messages
@@ -602,7 +735,8 @@ class ChatWindow(QtWidgets.QMainWindow):
             
             # Detect language if localization is available
             if LOCALIZATION_AVAILABLE:
-                language_code = set_current_language(user_input)
+                with tracing.span("detect_language"):
+                    language_code = set_current_language(user_input)
                 print(f"Input language detected as: {language_code}")
                 
                 # Update language button tooltip with detected language
@@ -623,7 +757,8 @@ class ChatWindow(QtWidgets.QMainWindow):
                     QtCore.Q_ARG(str, language_name)
                 )
             elif LANGUAGE_PROMPTS_AVAILABLE:
-                language_code = prompt_manager.set_current_language(user_input)
+                with tracing.span("detect_language"):
+                    language_code = prompt_manager.set_current_language(user_input)
                 print(f"Input language detected as: {language_code}")
                 
                 # Update language button tooltip with detected language
@@ -660,7 +795,7 @@ class ChatWindow(QtWidgets.QMainWindow):
                 command = self.pending_command
                 args = self.pending_args
                 progress_txt = ai_functions.status_message(command, args)
-                command_queue.put((command, args))
+                self.submit_command(command, args)
                 self.pending_command = None
                 self.pending_args = None
                 # self.display_assistant_message_from_thread(str(progress_txt))
@@ -748,7 +883,7 @@ class ChatWindow(QtWidgets.QMainWindow):
                     break
                     
             if is_defect_question:
-                progress_txt = ai_functions.chat_with_gpt(user_input)
+                progress_txt = ai_functions.chat_routed(user_input)
                 self.display_assistant_message_from_thread(str(progress_txt))
                 
                 # Suggest running defect detection with localized text
@@ -859,6 +994,15 @@ class ChatWindow(QtWidgets.QMainWindow):
             
             if commands is not None and commands.strip():
                 commands = ai_functions.parse_comma_separated(commands)
+                pipeline = self.command_pipeline
+                pipeline.start_request()
+                # Several commands that would run one after the other anyway go to PAUTReader in
+                # one batch request (unless it has no batch endpoint); otherwise the pipeline runs
+                # the independent ones in parallel
+                use_batch = (len(commands) > 1 and pipeline.sequential(commands)
+                             and command_process.batch_supported.get(command_process.BASE_URL) is not False)
+                batch_steps = []
+                rerun = bool(RERUN_PATTERN.search(user_input))
                 if commands:
                     print("Commands list is: ", commands)
                     for i, command in enumerate(commands):
@@ -876,12 +1020,13 @@ class ChatWindow(QtWidgets.QMainWindow):
                                     progress_txt += f"\n{warning_txt}"
                                 # self.display_assistant_message_from_thread(str(progress_txt))
                             
-                            command_queue.put((command, args))
+                            # Starts right away unless it needs state an earlier command is still changing
+                            if use_batch:
+                                batch_steps.append((command, args))
+                            else:
+                                pipeline.add(command, args, on_done=self.show_command_result, rerun=rerun,
+                                             progress=update_process)
                             command_executed = True
-                            
-                            # If this is not the last command, add a small delay
-                            if i < len(commands) - 1:
-                                time.sleep(0.5)  # Small delay between commands
                         
                         elif command == ", ".join(["loadData", "updatePlot", "getFileInformation", "getDirectory",
                                       "doAnalysisSNR", "startDefectDetection", "setNewDirectory", "makeSingleFileOnly",
@@ -890,11 +1035,16 @@ class ChatWindow(QtWidgets.QMainWindow):
                             command_executed = True
 
                         update_process(progress_txt)
+
+                if batch_steps:
+                    pipeline.add_batch(
+                        batch_steps, on_done=lambda future: self.show_batch_result(future, batch_steps),
+                        rerun=rerun, progress=update_process)
             
             # If no valid command was executed but it's ambiguous, answer as question and suggest command
             if not command_executed and is_ambiguous:
                 print(f"Ambiguous input detected, suggesting command: {suggested_command}")
-                answer_txt = ai_functions.chat_with_gpt(user_input)
+                answer_txt = ai_functions.chat_routed(user_input)
                 self.display_assistant_message_from_thread(str(answer_txt))
                 
                 args = []
@@ -948,8 +1098,13 @@ class ChatWindow(QtWidgets.QMainWindow):
                 return
             
             if not command_executed:
-                print("No valid command detected, using chat_with_gpt")
-                progress_txt = ai_functions.chat_with_gpt(user_input)
+                print("No valid command detected, streaming answer from chat_stream_routed")
+                QtCore.QMetaObject.invokeMethod(
+                    self.process_manager, "clear_process_message",
+                    QtCore.Qt.ConnectionType.QueuedConnection
+                )
+                self.stream_chat_response(user_input)
+                return
                 
             if not progress_txt:
                 if LOCALIZATION_AVAILABLE:
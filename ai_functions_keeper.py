@@ -13,8 +13,6 @@ import re
 from transformers import AutoModelForCausalLM, AutoTokenizer
 import torch
 import ollama
-import io
-import wave
 from prompts import command_name_extraction, commands_description, commands_names_extraction
 
 
@@ -400,28 +398,16 @@ def command_listener_legacy():
         msg, response = execute_command_gui(command, *args)
         command_queue.task_done()
 
-def extract_text(audio_bytes):
-    wav_buffer = io.BytesIO()
-    with wave.open(wav_buffer, 'wb') as wf:
-        wf.setnchannels(1)  # mono - one channel
-        wf.setsampwidth(2)  # 16-bit (pyaudio.paInt16 = 2 bytes)
-        wf.setframerate(16000)  # Hz sample rate
-        wf.writeframes(audio_bytes)
-    wav_buffer.seek(0)
-    wav_buffer.name = "temp.wav"
-
-    # TODO: take a look at https://github.com/vndee/local-talking-llm
-    # ai assistant and speech2text using langchain
-    transcript = openai.Audio.transcribe(
-        model="whisper-1",
-        file=wav_buffer,
-        language="en"  # TODO: add ability to choose the language
-    )
-    if transcript:
-        extracted_text = transcript.get("text", "")
-        return extracted_text
-    else:
-        return ""
+def extract_text(audio_bytes, language=None):
+    """
+    Transcribe raw 16 kHz mono 16-bit PCM with the shared voice engine (voice_engine.py)
+
+    Args:
+        audio_bytes: Raw PCM audio
+        language: Language code (default: the engine language)
+    """
+    from voice_engine import default_engine
+    return default_engine().transcribe(audio_bytes, language)
 
 
 
@@ -13,9 +13,17 @@ import re
 from transformers import AutoModelForCausalLM, AutoTokenizer
 import torch
 import ollama
-import io
-import wave
+import time
+import threading
+from collections import OrderedDict
 from prompts import command_name_extraction, commands_description, commands_names_extraction
+from chat_streaming import DeltaBatcher, consume_chat_stream
+from backend_router import BackendRouter, HedgeLost, attempt_cancelled
+from ollama_lifecycle import OllamaModelManager
+from extraction_schema import EXTRACTION_RESPONSE_FORMAT, parse_extraction
+from prompt_registry import PromptRegistry
+from tracing import traced
+from voice_engine import default_engine
 
 # Import localization manager instead of language_prompts
 try:
@@ -44,10 +52,16 @@ except ImportError:
 
 # now we will use only english. Other languages will be added later
 nlp = spacy.load("en_core_web_md")
-# TODO: check if file is opened, if ues check is it the file we want to work with and load another if not
-# TODO: add delay (in c#) to wait for data file to be loaded before making manipulations with it
-# TODO: think, it will be better to do in VS. I e file information is stored there
-opened_file_name = ""
+
+# Local model used for offline chat and argument extraction. The manager preloads it in the
+# background (call ollama_models.start() at startup) and every request passes keep_alive,
+# so the model stays resident between requests instead of being reloaded after idle periods.
+OLLAMA_MODEL = "mistral"
+OLLAMA_KEEP_ALIVE = "30m"
+ollama_models = OllamaModelManager([OLLAMA_MODEL], keep_alive=OLLAMA_KEEP_ALIVE)
+# Commands that need a loaded file wait for loadData's response (see command_pipeline.py).
+# The loaded file, current directory and completed analyses are mirrored in app_state.py;
+# execute_command_gui skips loading a file that is already open.
 command_queue = Queue()
 
 command_keywords = {
@@ -62,6 +76,9 @@ command_keywords = {
                         "update directory"]
 }
 
+# Output cap for streamed chat answers (the blocking chat_with_gpt keeps its 500 token limit)
+CHAT_STREAM_MAX_TOKENS = 1500
+
 command_names_list = ["loadData", "updatePlot", "getFileInformation", "getDirectory",
                       "doAnalysisSNR", "startDefectDetection", "setNewDirectory", "makeSingleFileOnly",
                       "doFolderAnalysis"]
@@ -83,10 +100,131 @@ except Exception as e:
     print(f"Error initializing OpenAI client: {e}")
 
 
+# Master extraction system prompt; {commands_description} is filled per language by the prompt registry
+MASTER_EXTRACTION_TEMPLATE = """You are an AI assistant that extracts ALL information from user input in a single response.
+
+AVAILABLE COMMANDS:
+{commands_description}
+
+Your task is to analyze the user input and return a JSON object with the following structure:
+{{
+    "commands": ["command1", "command2"],  // Array of command names that match the user's request
+    "filename": "extracted_filename",      // Any filename mentioned (with extension)
+    "folder_path": "extracted_folder_path", // Any folder/directory path mentioned
+    "intent": "execute_commands"           // Always "execute_commands" if commands found, otherwise "chat"
+}}
+
+RULES:
+1. If user wants to perform actions described in the commands, list ALL relevant command names
+2. Extract filename with extension (.fpd, .opd) if mentioned
+3. Extract folder path if mentioned (can be full path or folder name)
+4. If no commands match, set "intent": "chat" and "commands": []
+5. Return ONLY valid JSON, no explanations or additional text
+6. If no filename/folder mentioned, use empty string ""
+
+EXAMPLES:
+
+User: "Open test.fpd file and run defect detection"
+Response: {{"commands": ["loadData", "startDefectDetection"], "filename": "test.fpd", "folder_path": "", "intent": "execute_commands"}}
+
+User: "Change directory to C:/Data and analyze all files"
+Response: {{"commands": ["setNewDirectory", "doFolderAnalysis"], "filename": "", "folder_path": "C:/Data", "intent": "execute_commands"}}
+
+User: "How does ultrasonic testing work?"
+Response: {{"commands": [], "filename": "", "folder_path": "", "intent": "chat"}}
+
+Now analyze this user input:
+"""
+
+# Default conversation prompt used when no localized prompts are available
+DEFAULT_CHAT_PROMPT_TEMPLATE = """You are an AI assistant designed specifically to assist with software that processes Phased Array Ultrasonic Testing (PAUT) data.
+
+Your primary role is to provide information related to **ultrasonic testing, nondestructive testing (NDT), and PAUT data analysis**.
+
+Additionally, you can send commands to the software. The list of valid commands you can use is: 
+{commands_description}
+
+I can now search for files and folders on your computer to help you load data or set directories without needing the exact path.
+
+#### Strict Rules:
+- You **MUST NOT** answer questions that are unrelated to PAUT, ultrasonic testing, or NDT.
+- If a user asks something outside of your expertise, respond with:  
+*"I am designed only for PAUT and ultrasonic testing-related tasks."*
+- You **MUST NOT** generate or provide programming code.
+- You **CANNOT** discuss or engage in topics unrelated to PAUT, ultrasonic testing, or NDT.
+- Your responses should be **brief, clear, and professional**.
+
+#### Allowed Actions:
+- Explain **ultrasonic testing principles**.
+- Guide users on **PAUT data interpretation**.
+- Assist with **NDT software commands** and provide usage instructions.
+- Answer **technical questions related to PAUT and NDT**.
+- Answer all questions and messages received from user, but never provide any coding.
+
+Stay within these boundaries and maintain a professional and technical tone.
+"""
+
+
+def _commands_description_for(language_code):
+    if LOCALIZATION_AVAILABLE:
+        return localization_manager.get_prompt("commands_description", language_code)
+    elif LANGUAGE_PROMPTS_AVAILABLE:
+        return prompt_manager.get_prompt("commands_description", language_code)
+    return commands_description
+
+
+def _chat_prompt_for(language_code):
+    if LOCALIZATION_AVAILABLE:
+        return localization_manager.get_prompt("general_conversation_prompt", language_code)
+    elif LANGUAGE_PROMPTS_AVAILABLE:
+        return prompt_manager.get_prompt("general_conversation_prompt", language_code)
+    return DEFAULT_CHAT_PROMPT_TEMPLATE.format(commands_description=commands_description)
+
+
+# System prompts are rendered and token-counted once per (prompt_type, language)
+prompt_registry = PromptRegistry()
+prompt_registry.register("master_extraction",
+                         lambda language_code: MASTER_EXTRACTION_TEMPLATE.format(
+                             commands_description=_commands_description_for(language_code)))
+prompt_registry.register("general_conversation_prompt", _chat_prompt_for)
+
+# Structured outputs (json_schema response_format) need gpt-4o-mini or newer
+EXTRACTION_MODEL = "gpt-4o-mini"
+# Recent extraction results, reused while the same message is being processed (the command
+# step and every argument step ask about it). Shared by the worker threads, so lock-protected;
+# small and short-lived, so a repeated message later on is extracted again.
+EXTRACTION_MEMO_SIZE = 8
+EXTRACTION_MEMO_SECONDS = 60
+_extraction_memo = OrderedDict()  # user_input -> (time, result), oldest first
+_extraction_memo_lock = threading.Lock()
+
+
+def _remembered_extraction(user_input):
+    with _extraction_memo_lock:
+        entry = _extraction_memo.get(user_input)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] > EXTRACTION_MEMO_SECONDS:
+            del _extraction_memo[user_input]
+            return None
+        _extraction_memo.move_to_end(user_input)
+        return entry[1]
+
+
+def _remember_extraction(user_input, result):
+    with _extraction_memo_lock:
+        _extraction_memo[user_input] = (time.monotonic(), result)
+        _extraction_memo.move_to_end(user_input)
+        while len(_extraction_memo) > EXTRACTION_MEMO_SIZE:
+            _extraction_memo.popitem(last=False)
+
+
+@traced()
 def extract_all_information_gpt(user_input):
     """
     Master function to extract all information from user input in a single GPT request.
-    Returns commands, arguments, and metadata in one call.
+    Returns commands, arguments, and metadata in one call. The response is bound to the
+    ExtractionResult schema, so a message never costs more than this one LLM call.
     
     Args:
         user_input: User input text
@@ -100,94 +238,58 @@ def extract_all_information_gpt(user_input):
             "intent": "execute_commands" or "chat"
         }
     """
+    # The command step and every argument step ask about the same message; answer them from one call
+    remembered = _remembered_extraction(user_input)
+    if remembered is not None:
+        return remembered
+
     try:
         if client is None:
             print("OpenAI client not initialized")
             return None
         
-        # Detect language and get appropriate prompt
+        # Detect language; the prompt itself is rendered once per language by the registry
         if LOCALIZATION_AVAILABLE:
             language_code = set_current_language(user_input)
             print(f"Language detected for master extraction: {language_code}")
-            
-            # Get language-specific commands description
-            commands_description_text = localization_manager.get_prompt("commands_description", language_code)
         elif LANGUAGE_PROMPTS_AVAILABLE:
             language_code = prompt_manager.set_current_language(user_input)
             print(f"Language detected for master extraction: {language_code}")
-            
-            # Get language-specific commands description
-            commands_description_text = prompt_manager.get_prompt("commands_description", language_code)
         else:
             # Basic language detection
             is_korean = any('\uac00' <= char <= '\ud7a3' for char in user_input)
             is_russian = any('\u0400' <= char <= '\u04FF' for char in user_input)
             language_code = "ko" if is_korean else "ru" if is_russian else "en"
             print(f"Basic language detection: {language_code}")
-            
-            # Use default commands description
-            commands_description_text = commands_description
-
-        # Create comprehensive extraction prompt
-        master_prompt = f"""You are an AI assistant that extracts ALL information from user input in a single response.
 
-AVAILABLE COMMANDS:
-{commands_description_text}
-
-Your task is to analyze the user input and return a JSON object with the following structure:
-{{
-    "commands": ["command1", "command2"],  // Array of command names that match the user's request
-    "filename": "extracted_filename",      // Any filename mentioned (with extension)
-    "folder_path": "extracted_folder_path", // Any folder/directory path mentioned
-    "language": "{language_code}",         // Detected language code
-    "intent": "execute_commands"           // Always "execute_commands" if commands found, otherwise "chat"
-}}
-
-RULES:
-1. If user wants to perform actions described in the commands, list ALL relevant command names
-2. Extract filename with extension (.fpd, .opd) if mentioned
-3. Extract folder path if mentioned (can be full path or folder name)
-4. If no commands match, set "intent": "chat" and "commands": []
-5. Return ONLY valid JSON, no explanations or additional text
-6. If no filename/folder mentioned, use empty string ""
-
-EXAMPLES:
-
-User: "Open test.fpd file and run defect detection"
-Response: {{"commands": ["loadData", "startDefectDetection"], "filename": "test.fpd", "folder_path": "", "language": "en", "intent": "execute_commands"}}
-
-User: "Change directory to C:/Data and analyze all files"
-Response: {{"commands": ["setNewDirectory", "doFolderAnalysis"], "filename": "", "folder_path": "C:/Data", "language": "en", "intent": "execute_commands"}}
-
-User: "How does ultrasonic testing work?"
-Response: {{"commands": [], "filename": "", "folder_path": "", "language": "en", "intent": "chat"}}
-
-Now analyze this user input:
-"""
+        # Static system prompt, byte-identical for every request in this language (prompt cache friendly)
+        master_prompt = prompt_registry.get("master_extraction", language_code)
 
+        # Structured output: the response is constrained to the ExtractionResult schema
         response = client.chat.completions.create(
-            model="gpt-3.5-turbo",
+            model=EXTRACTION_MODEL,
             messages=[
                 {"role": "system", "content": master_prompt},
                 {"role": "user", "content": user_input}
             ],
+            response_format=EXTRACTION_RESPONSE_FORMAT,
+            max_tokens=200,
             temperature=0
         )
         
-        response_text = response.choices[0].message.content.strip()
+        response_text = response.choices[0].message.content or ""
         print(f"Master extraction response: {response_text}")
         
-        # Parse JSON response
+        # Validate against the schema; malformed output is repaired locally, never re-requested
         try:
-            import json
-            result = json.loads(response_text)
-            print(f"Parsed extraction result: {result}")
-            return result
-        except json.JSONDecodeError as e:
-            print(f"Error parsing JSON response: {e}")
-            print(f"Raw response: {response_text}")
-            # Fallback to old method if JSON parsing fails
+            result = parse_extraction(response_text).model_dump()
+        except ValueError as e:
+            print(f"Error parsing extraction response: {e}")
             return None
+        result["language"] = language_code
+        print(f"Parsed extraction result: {result}")
+        _remember_extraction(user_input, result)
+        return result
             
     except Exception as e:
         print(f"Error in master extraction: {e}")
@@ -197,7 +299,8 @@ Now analyze this user input:
 def get_command_gpt_consolidated(user_input):
     """
     New consolidated command extraction using the master function.
-    Falls back to old method if master extraction fails.
+    If the extraction fails the message is treated as chat; the legacy command
+    extractors are not called, which caps a message at one extraction request.
     
     Args:
         user_input: User input text
@@ -206,32 +309,24 @@ def get_command_gpt_consolidated(user_input):
         Extracted command name(s) or empty string
     """
     try:
-        # Try the new consolidated approach first
         result = extract_all_information_gpt(user_input)
         
         if result and result.get("intent") == "execute_commands" and result.get("commands"):
-            commands = result["commands"]
-            if isinstance(commands, list):
-                return ",".join(commands)
-            else:
-                return str(commands)
-        elif result and result.get("intent") == "chat":
-            return ""
-        else:
-            # Fallback to old method
-            print("Master extraction failed, falling back to old method")
-            return get_command_gpt(user_input)
+            return ",".join(result["commands"])
+        if result is None:
+            print("Master extraction failed, handling the message as chat")
+        return ""
             
     except Exception as e:
         print(f"Error in consolidated command extraction: {e}")
-        # Fallback to old method
-        return get_command_gpt(user_input)
+        return ""
 
 
 def extract_arguments_consolidated(command, user_input, process_callback=None):
     """
     New consolidated argument extraction using the master function.
-    Falls back to old method if master extraction fails.
+    Falls back to regex-only extraction (no LLM calls) if the master extraction
+    has no usable filename or folder.
     
     Args:
         command: Command name
@@ -295,8 +390,8 @@ def extract_arguments_consolidated(command, user_input, process_callback=None):
                             process_callback(warning_txt)
                         return args, warning_txt
                 else:
-                    # No filename extracted, fallback to old method
-                    return extract_arguments(command, user_input, process_callback)
+                    # No filename extracted, fall back to regex extraction
+                    return extract_arguments(command, user_input, process_callback, use_llm=False)
                     
             elif command in ["setNewDirectory", "doFolderAnalysis"]:
                 folder_path = result.get("folder_path", "")
@@ -353,19 +448,19 @@ def extract_arguments_consolidated(command, user_input, process_callback=None):
                             process_callback(warning_txt)
                         return args, warning_txt
                 else:
-                    # No folder path extracted, fallback to old method
-                    return extract_arguments(command, user_input, process_callback)
+                    # No folder path extracted, fall back to regex extraction
+                    return extract_arguments(command, user_input, process_callback, use_llm=False)
             else:
                 # For other commands that don't need file/folder arguments
                 return [], ""
         else:
-            # Master extraction failed, fallback to old method
-            return extract_arguments(command, user_input, process_callback)
+            # Master extraction failed, fall back to regex extraction
+            return extract_arguments(command, user_input, process_callback, use_llm=False)
             
     except Exception as e:
         print(f"Error in consolidated argument extraction: {e}")
-        # Fallback to old method
-        return extract_arguments(command, user_input, process_callback)
+        # Fall back to regex extraction
+        return extract_arguments(command, user_input, process_callback, use_llm=False)
 
 
     command = command.strip()
@@ -492,6 +587,53 @@ def get_command_gpt_old_patterns(user_input):
         return None
 
 
+def get_chat_system_prompt(user_input):
+    """
+    Select the language-specific system prompt for general conversation
+
+    Args:
+        user_input: User input text
+
+    Returns:
+        System prompt text
+    """
+    # Detect language using centralized function
+    if LOCALIZATION_AVAILABLE:
+        language_code = set_current_language(user_input)
+        print(f"Language detected for chat: {language_code}")
+    elif LANGUAGE_PROMPTS_AVAILABLE:
+        language_code = prompt_manager.set_current_language(user_input)
+        print(f"Language detected for chat: {language_code}")
+    else:
+        # Basic language detection
+        is_korean = any('\uac00' <= char <= '\ud7a3' for char in user_input)
+        is_russian = any('\u0400' <= char <= '\u04FF' for char in user_input)
+        language_code = "ko" if is_korean else "ru" if is_russian else "en"
+        print(f"Basic language detection for chat: {language_code}")
+
+    # Rendered once per language, so the system prefix is identical across requests
+    system_prompt = prompt_registry.get("general_conversation_prompt", language_code)
+    print(f"Using {language_code} prompt for conversation "
+          f"({prompt_registry.token_count('general_conversation_prompt', language_code)} tokens)")
+    return system_prompt
+
+
+def _gpt_chat_completion(system_prompt, user_input):
+    """gpt-4o chat completion, streamed and joined (see _read_stream); API errors propagate to the caller"""
+    response = client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_input}
+        ],
+        max_tokens=500,
+        temperature=0.4,
+        stream=True
+    )
+    response_text = _read_stream(response, _gpt_chunk_text).strip()
+    return response_text.strip("```")
+
+
 def chat_with_gpt(user_input):
     """
     Generate a response to user input using language-specific prompts
@@ -507,70 +649,12 @@ def chat_with_gpt(user_input):
             print("OpenAI client not initialized")
             return "Sorry, I'm having trouble connecting to my knowledge base."
 
-        # Detect language using centralized function
-        if LOCALIZATION_AVAILABLE:
-            language_code = set_current_language(user_input)
-            print(f"Language detected for chat: {language_code}")
-            
-            # Get language-specific prompt
-            system_prompt = localization_manager.get_prompt("general_conversation_prompt", language_code)
-            print(f"Using {language_code} prompt for conversation")
-        elif LANGUAGE_PROMPTS_AVAILABLE:
-            language_code = prompt_manager.set_current_language(user_input)
-            print(f"Language detected for chat: {language_code}")
-            
-            # Get language-specific prompt
-            system_prompt = prompt_manager.get_prompt("general_conversation_prompt", language_code)
-            print(f"Using {language_code} prompt for conversation")
-        else:
-            # Basic language detection
-            is_korean = any('\uac00' <= char <= '\ud7a3' for char in user_input)
-            is_russian = any('\u0400' <= char <= '\u04FF' for char in user_input)
-            language_code = "ko" if is_korean else "ru" if is_russian else "en"
-            print(f"Basic language detection for chat: {language_code}")
-            
-            # Use default prompt
-            system_prompt = f"""You are an AI assistant designed specifically to assist with software that processes Phased Array Ultrasonic Testing (PAUT) data.
-
-Your primary role is to provide information related to **ultrasonic testing, nondestructive testing (NDT), and PAUT data analysis**.
-
-Additionally, you can send commands to the software. The list of valid commands you can use is: 
-{commands_description}
-
-I can now search for files and folders on your computer to help you load data or set directories without needing the exact path.
-
-#### Strict Rules:
-- You **MUST NOT** answer questions that are unrelated to PAUT, ultrasonic testing, or NDT.
-- If a user asks something outside of your expertise, respond with:  
-*"I am designed only for PAUT and ultrasonic testing-related tasks."*
-- You **MUST NOT** generate or provide programming code.
-- You **CANNOT** discuss or engage in topics unrelated to PAUT, ultrasonic testing, or NDT.
-- Your responses should be **brief, clear, and professional**.
-
-#### Allowed Actions:
-- Explain **ultrasonic testing principles**.
-- Guide users on **PAUT data interpretation**.
-- Assist with **NDT software commands** and provide usage instructions.
-- Answer **technical questions related to PAUT and NDT**.
-- Answer all questions and messages received from user, but never provide any coding.
-
-Stay within these boundaries and maintain a professional and technical tone.
-"""
+        system_prompt = get_chat_system_prompt(user_input)
         print(f"Sending request to OpenAI API with user input: {user_input[:50]}...")
 
         try:
             # Use direct API call with the basic OpenAI client
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_input}
-                ],
-                max_tokens=500,
-                temperature=0.4
-            )
-            response_text = response.choices[0].message.content.strip()
-            response_text = response_text.strip("```")
+            response_text = _gpt_chat_completion(system_prompt, user_input)
             
             print(f"Received response from OpenAI API: {response_text[:50]}...")
             return response_text
@@ -608,6 +692,58 @@ Stay within these boundaries and maintain a professional and technical tone.
             return f"I encountered an error: {str(e)}"
 
 
+def _stream_gpt(user_input, delta_callback, frame_interval=0.05):
+    """Streamed gpt-4o chat completion; API errors propagate to the caller"""
+    if client is None:
+        raise RuntimeError("OpenAI client not initialized")
+
+    system_prompt = get_chat_system_prompt(user_input)
+    print(f"Streaming request to OpenAI API with user input: {user_input[:50]}...")
+
+    batcher = DeltaBatcher(delta_callback, frame_interval=frame_interval)
+    started_at = time.perf_counter()
+    stream = client.chat.completions.create(
+        model="gpt-4o",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_input}
+        ],
+        max_tokens=CHAT_STREAM_MAX_TOKENS,
+        temperature=0.4,
+        stream=True
+    )
+    response_text, stats = consume_chat_stream(stream, batcher, started_at=started_at)
+
+    if stats["ttft"] is not None:
+        print(f"Streamed response: first token after {stats['ttft'] * 1000:.0f} ms, "
+              f"total {stats['total'] * 1000:.0f} ms, {stats['chunks']} chunks in {stats['batches']} batches")
+    return response_text.strip(), stats
+
+
+def chat_with_gpt_stream(user_input, delta_callback, frame_interval=0.05):
+    """
+    Stream a response to user input, forwarding text to the GUI in coalesced batches
+
+    Args:
+        user_input: User input text
+        delta_callback: Called with each batch of new text (from the worker thread)
+        frame_interval: Minimum time in seconds between two batches (~50 ms = one UI frame)
+
+    Returns:
+        tuple: (response_text, stats) where stats holds "ttft" (time to first token) and "total" in seconds
+    """
+    try:
+        return _stream_gpt(user_input, delta_callback, frame_interval)
+    except Exception as e:
+        print(f"Error streaming from OpenAI: {type(e).__name__}: {e}")
+        if LOCALIZATION_AVAILABLE:
+            response_text = localization_manager.get_error_message("general_error", error=str(e))
+        else:
+            response_text = f"I encountered an error: {str(e)}"
+        delta_callback(response_text)
+        return response_text, {"ttft": None, "total": None, "chunks": 0, "batches": 0}
+
+
 def contains_code(response: str) -> bool:
     """
     Check if the AI response contains any programming code.
@@ -689,11 +825,13 @@ def chat_with_ollama(user_input):
             """
 
     response = ollama.generate(
-        model="mistral",
+        model=OLLAMA_MODEL,
+        keep_alive=OLLAMA_KEEP_ALIVE,
         prompt=f"{prompt_new}",
-        options={"temperature": 0.5}
+        options={"temperature": 0.5},
+        stream=True
     )
-    response_txt = response['response'].strip()
+    response_txt = _read_stream(response, lambda part: part['response']).strip()
 
     if contains_code(response_txt):
         response_txt = "I am AI assistant to work with PAUTReader software based on Mistral model. " \
@@ -704,7 +842,8 @@ def chat_with_ollama(user_input):
 
 def get_command_ollama(user_input):
     response = ollama.generate(
-        model="mistral",
+        model=OLLAMA_MODEL,
+        keep_alive=OLLAMA_KEEP_ALIVE,
         # prompt=f"{command_name_extraction}\n\n{user_input}",
         prompt=f"""
                 You are an AI assistant that **ONLY extracts command names** from user input.
@@ -827,10 +966,8 @@ def status_message(command, args):
         return f"Processing command: {command}..."
 
 
-def extract_folder_ollama(user_input):
-    """
-    Extract folder path from user input using language-specific prompts
-    """
+def _folder_extraction_prompt(user_input):
+    """Language-specific prompt for folder path extraction"""
     # Detect language and get appropriate prompt
     if LOCALIZATION_AVAILABLE:
         language_code = set_current_language(user_input)
@@ -843,10 +980,56 @@ def extract_folder_ollama(user_input):
     else:
         # Fallback to English prompt
         system_prompt = "Extract full folder path with folder name from the input. Return only the folder path. No extra words. No explanations. No formatting."
+    return system_prompt
+
+
+def _filename_extraction_prompt(user_input):
+    """Language-specific prompt for filename extraction"""
+    # Detect language and get appropriate prompt
+    if LOCALIZATION_AVAILABLE:
+        language_code = set_current_language(user_input)
+        system_prompt = localization_manager.get_prompt("file_path_extraction_prompt", language_code)
+        print(f"Using {language_code} prompt for filename extraction")
+    elif LANGUAGE_PROMPTS_AVAILABLE:
+        language_code = prompt_manager.set_current_language(user_input)
+        system_prompt = prompt_manager.get_prompt("file_path_extraction_prompt", language_code)
+        print(f"Using {language_code} prompt for filename extraction")
+    else:
+        # Fallback to English prompt
+        system_prompt = "Extract only the file name from the input. Return only the file name. No extra words. No explanations. No formatting."
+    return system_prompt
+
+
+def _regex_folder(user_input):
+    """Simple regex folder extraction used when no LLM backend answers"""
+    folder_match = re.search(r'([A-Za-z]:\\[^\\]+(?:\\[^\\]+)*)', user_input)
+    if folder_match:
+        return folder_match.group(1)
+    # Try to extract folder name without full path
+    folder_name_match = re.search(r'(?:folder|directory|dir)\s+([a-zA-Z0-9_\s-]+)', user_input, re.IGNORECASE)
+    if folder_name_match:
+        return folder_name_match.group(1).strip()
+    return ""
+
+
+def _regex_filename(user_input):
+    """Simple regex filename extraction used when no LLM backend answers"""
+    filename_match = re.search(r'([a-zA-Z0-9_.-]+\.(fpd|opd))', user_input)
+    if filename_match:
+        return filename_match.group(1)
+    return ""
+
+
+def extract_folder_ollama(user_input):
+    """
+    Extract folder path from user input using language-specific prompts
+    """
+    system_prompt = _folder_extraction_prompt(user_input)
     
     try:
         response = ollama.generate(
-            model="mistral",
+            model=OLLAMA_MODEL,
+            keep_alive=OLLAMA_KEEP_ALIVE,
             prompt=f"{system_prompt}\n\n{user_input}",
             options={"temperature": 0}
         )
@@ -855,36 +1038,19 @@ def extract_folder_ollama(user_input):
     except Exception as e:
         print(f"Error in ollama folder extraction: {e}")
         # Fallback to simple regex extraction
-        folder_match = re.search(r'([A-Za-z]:\\[^\\]+(?:\\[^\\]+)*)', user_input)
-        if folder_match:
-            return folder_match.group(1)
-        # Try to extract folder name without full path
-        folder_name_match = re.search(r'(?:folder|directory|dir)\s+([a-zA-Z0-9_\s-]+)', user_input, re.IGNORECASE)
-        if folder_name_match:
-            return folder_name_match.group(1).strip()
-        return ""
+        return _regex_folder(user_input)
 
 
 def extract_filename_ollama(user_input):
     """
     Extract filename from user input using language-specific prompts
     """
-    # Detect language and get appropriate prompt
-    if LOCALIZATION_AVAILABLE:
-        language_code = set_current_language(user_input)
-        system_prompt = localization_manager.get_prompt("file_path_extraction_prompt", language_code)
-        print(f"Using {language_code} prompt for filename extraction")
-    elif LANGUAGE_PROMPTS_AVAILABLE:
-        language_code = prompt_manager.set_current_language(user_input)
-        system_prompt = prompt_manager.get_prompt("file_path_extraction_prompt", language_code)
-        print(f"Using {language_code} prompt for filename extraction")
-    else:
-        # Fallback to English prompt
-        system_prompt = "Extract only the file name from the input. Return only the file name. No extra words. No explanations. No formatting."
+    system_prompt = _filename_extraction_prompt(user_input)
     
     try:
         response = ollama.generate(
-            model="mistral",
+            model=OLLAMA_MODEL,
+            keep_alive=OLLAMA_KEEP_ALIVE,
             prompt=f"{system_prompt}\n\n{user_input}",
             options={"temperature": 0}
         )
@@ -893,10 +1059,173 @@ def extract_filename_ollama(user_input):
     except Exception as e:
         print(f"Error in ollama filename extraction: {e}")
         # Fallback to simple regex extraction
-        filename_match = re.search(r'([a-zA-Z0-9_.-]+\.(fpd|opd))', user_input)
-        if filename_match:
-            return filename_match.group(1)
-        return ""
+        return _regex_filename(user_input)
+
+
+############################   BACKEND ROUTING   #################
+# OpenAI and the local Ollama mistral model are interchangeable for chat and argument
+# extraction; the router picks whichever is currently fastest and healthy per task type.
+backend_router = BackendRouter()
+
+
+def _read_stream(stream, text_of):
+    """
+    Join a streamed backend answer. Backends are streamed so that a call that lost a hedged
+    request stops at the next chunk and closes its connection instead of running to the end.
+    """
+    parts = []
+    try:
+        for chunk in stream:
+            if attempt_cancelled():
+                raise HedgeLost("another backend answered first")
+            parts.append(text_of(chunk))
+    finally:
+        stream.close()
+    return "".join(parts)
+
+
+def _gpt_chunk_text(chunk):
+    return (chunk.choices[0].delta.content or "") if chunk.choices else ""
+
+
+def _ollama_generate(prompt, temperature=0):
+    """Streamed ollama.generate call; connection errors propagate to the router"""
+    response = ollama.generate(
+        model=OLLAMA_MODEL,
+        keep_alive=OLLAMA_KEEP_ALIVE,
+        prompt=prompt,
+        options={"temperature": temperature},
+        stream=True
+    )
+    return _read_stream(response, lambda part: part['response']).strip()
+
+
+def _gpt_extract(system_prompt, user_input):
+    """Short deterministic extraction with gpt-3.5-turbo; errors propagate to the router"""
+    if client is None:
+        raise RuntimeError("OpenAI client not initialized")
+    response = client.chat.completions.create(
+        model="gpt-3.5-turbo",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_input}
+        ],
+        max_tokens=100,
+        temperature=0,
+        stream=True
+    )
+    return _read_stream(response, _gpt_chunk_text).strip().strip('"')
+
+
+def _chat_backends(user_input):
+    def openai_chat():
+        if client is None:
+            raise RuntimeError("OpenAI client not initialized")
+        return _gpt_chat_completion(get_chat_system_prompt(user_input), user_input)
+
+    return {
+        "openai": openai_chat,
+        "ollama": lambda: chat_with_ollama(user_input),
+    }
+
+
+@traced()
+def chat_routed(user_input):
+    """
+    Answer a chat message with the fastest healthy backend (OpenAI gpt-4o or local mistral)
+
+    Args:
+        user_input: User input text
+
+    Returns:
+        Generated response text
+    """
+    try:
+        return backend_router.call("chat", _chat_backends(user_input), is_failure=lambda text: not text)
+    except Exception as e:
+        print(f"All chat backends failed: {e}")
+        if LOCALIZATION_AVAILABLE:
+            return localization_manager.get_error_message("connection_error")
+        return "I'm having trouble connecting to my knowledge base. Please check your internet connection."
+
+
+@traced()
+def chat_stream_routed(user_input, delta_callback, frame_interval=0.05):
+    """
+    Streamed variant of chat_routed. OpenAI answers are streamed; if OpenAI is unhealthy or fails
+    before the first token, the answer comes from local mistral and is delivered in one batch.
+
+    Returns:
+        tuple: (response_text, stats) as returned by chat_with_gpt_stream
+    """
+    backends = _chat_backends(user_input)
+    openai_error = None
+    order = backend_router.ranked("chat", list(backends))
+    if order[0] == "openai":
+        delivered = []
+
+        def forward(text):
+            delivered.append(text)
+            delta_callback(text)
+
+        started = time.perf_counter()
+        try:
+            response_text, stats = _stream_gpt(user_input, forward, frame_interval)
+            backend_router.record("chat", "openai", time.perf_counter() - started)
+            return response_text, stats
+        except Exception as e:
+            backend_router.record("chat", "openai", time.perf_counter() - started, e)
+            print(f"Streaming chat via OpenAI failed: {type(e).__name__}: {e}")
+            if delivered:
+                return "".join(delivered), {"ttft": None, "total": None, "chunks": 0, "batches": len(delivered)}
+            # OpenAI just failed: fall back to the other backends only
+            openai_error = e
+            del backends["openai"]
+
+    started = time.perf_counter()
+    try:
+        response_text = backend_router.call("chat", backends, is_failure=lambda text: not text)
+    except Exception as e:
+        # Show what actually went wrong (e.g. an invalid API key) rather than a generic message
+        print(f"All chat backends failed: {e}")
+        error = openai_error or e
+        if LOCALIZATION_AVAILABLE:
+            response_text = localization_manager.get_error_message("general_error", error=str(error))
+        else:
+            response_text = f"I encountered an error: {str(error)}"
+        delta_callback(response_text)
+        return response_text, {"ttft": None, "total": None, "chunks": 0, "batches": 1}
+    delta_callback(response_text)
+    return response_text, {"ttft": time.perf_counter() - started, "total": time.perf_counter() - started,
+                           "chunks": 1, "batches": 1}
+
+
+def extract_filename_routed(user_input):
+    """Filename extraction on the fastest healthy backend, regex as the last resort"""
+    system_prompt = _filename_extraction_prompt(user_input)
+    backends = {
+        "openai": lambda: _gpt_extract(system_prompt, user_input),
+        "ollama": lambda: _ollama_generate(f"{system_prompt}\n\n{user_input}"),
+    }
+    try:
+        return backend_router.call("filename", backends)
+    except Exception as e:
+        print(f"All filename extraction backends failed: {e}")
+        return _regex_filename(user_input)
+
+
+def extract_folder_routed(user_input):
+    """Folder extraction on the fastest healthy backend, regex as the last resort"""
+    system_prompt = _folder_extraction_prompt(user_input)
+    backends = {
+        "openai": lambda: _gpt_extract(system_prompt, user_input),
+        "ollama": lambda: _ollama_generate(f"{system_prompt}\n\n{user_input}"),
+    }
+    try:
+        return backend_router.call("folder", backends)
+    except Exception as e:
+        print(f"All folder extraction backends failed: {e}")
+        return _regex_folder(user_input)
 
 
 # llama3
@@ -928,7 +1257,19 @@ def get_best_matching_commands(user_keywords, threshold=0.5, max_threshold=0.95)
     return [cmd[0] for cmd in matched_commands]
 
 
-def extract_arguments(command, user_input, process_callback=None):
+def extract_arguments(command, user_input, process_callback=None, use_llm=True):
+    """
+    Extract command arguments with regexes, file search and (optionally) an LLM.
+
+    Args:
+        command: Command name
+        user_input: User input text
+        process_callback: Optional callback for process updates
+        use_llm: If False, names are taken from regexes only (no backend calls)
+
+    Returns:
+        tuple: (args, warning_txt)
+    """
     args = []
     warning_txt = ""
 
@@ -994,7 +1335,7 @@ def extract_arguments(command, user_input, process_callback=None):
                 if process_callback:
                     process_callback(warning_txt)
 
-        filename = extract_filename_ollama(user_input).strip()
+        filename = (extract_filename_routed(user_input) if use_llm else _regex_filename(user_input)).strip()
         print(f"Extracted filename: '{filename}'")
         if process_callback:
             if LOCALIZATION_AVAILABLE:
@@ -1118,7 +1459,7 @@ def extract_arguments(command, user_input, process_callback=None):
                 warning_txt = f"Directory not found at path: {full_path}"
                 print(warning_txt)
 
-        folder_name = extract_folder_ollama(user_input).strip()
+        folder_name = (extract_folder_routed(user_input) if use_llm else _regex_folder(user_input)).strip()
         if folder_name:
             # Try to find the folder in the system
             if FILE_FINDER_AVAILABLE:
@@ -1148,7 +1489,7 @@ def extract_arguments(command, user_input, process_callback=None):
                 warning_txt = f"Directory not found at path: {full_path}"
                 print(warning_txt)
 
-        folder_name = extract_folder_ollama(user_input).strip()
+        folder_name = (extract_folder_routed(user_input) if use_llm else _regex_folder(user_input)).strip()
         if folder_name:
             # Try to find the folder in the system
             if FILE_FINDER_AVAILABLE:
@@ -1196,33 +1537,24 @@ def command_listener_legacy():
         command_queue.task_done()
 
 
-def extract_text(audio_bytes):
-    if client is None:
+def extract_text(audio_bytes, language=None):
+    """
+    Transcribe raw 16 kHz mono 16-bit PCM with the shared voice engine (the GUI recognizer's
+    engine when one exists, see voice_engine.default_engine)
+
+    Args:
+        audio_bytes: Raw PCM audio
+        language: Language code (default: the engine language)
+    """
+    engine = default_engine(client)
+    if engine.backend is None:
+        engine.configure_backend(warm_up=False)
+    if engine.backend is None:
         print("OpenAI client not initialized")
         return "Error: Unable to connect to speech recognition service"
 
-    wav_buffer = io.BytesIO()
-    with wave.open(wav_buffer, 'wb') as wf:
-        wf.setnchannels(1)  # mono - one channel
-        wf.setsampwidth(2)  # 16-bit (pyaudio.paInt16 = 2 bytes)
-        wf.setframerate(16000)  # Hz sample rate
-        wf.writeframes(audio_bytes)
-    wav_buffer.seek(0)
-    wav_buffer.name = "temp.wav"
-
     try:
-        # Use the new client.audio.transcriptions.create method
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=wav_buffer,
-            language="en"  # TODO: add ability to choose the language
-        )
-
-        if transcript:
-            extracted_text = transcript.text
-            return extracted_text
-        else:
-            return ""
+        return engine.transcribe(audio_bytes, language)
     except Exception as e:
         print(f"Error transcribing audio: {e}")
         return f"Error: {str(e)}"
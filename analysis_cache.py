@@ -0,0 +1,157 @@
+"""
+Persistent store of analysis results keyed by file content fingerprint.
+SNR analysis, defect detection and single-file reports are expensive in PAUTReader; when the
+same file (same path, size, mtime and partial content hash) is analysed again the stored
+response is returned instead. Results survive restarts in ANALYSIS_CACHE_FILE.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from typing import Optional
+
+ANALYSIS_CACHE_FILE = "analysis_cache.json"
+ANALYSIS_COMMANDS = ("doAnalysisSNR", "startDefectDetection", "makeSingleFileOnly")
+
+# Bytes hashed from the start and from the end of the file; .fpd files can be several GB
+PARTIAL_HASH_BYTES = 1 << 20
+
+
+def file_fingerprint(path: str) -> Optional[str]:
+    """
+    (size, mtime, partial hash) fingerprint of a local file
+
+    Returns:
+        Fingerprint string, or None if the file cannot be read
+    """
+    try:
+        stat = os.stat(path)
+        digest = hashlib.sha1()
+        with open(path, "rb") as f:
+            digest.update(f.read(PARTIAL_HASH_BYTES))
+            if stat.st_size > 2 * PARTIAL_HASH_BYTES:
+                f.seek(-PARTIAL_HASH_BYTES, os.SEEK_END)
+                digest.update(f.read(PARTIAL_HASH_BYTES))
+    except OSError:
+        return None
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{digest.hexdigest()}"
+
+
+class AnalysisCache:
+    """
+    Analysis responses keyed by (command, file path, size, mtime, partial content hash).
+
+    Args:
+        cache_file: JSON file the results are persisted to (None keeps them in memory only)
+        max_entries: Least recently used entries beyond this are dropped
+    """
+    def __init__(self, cache_file: Optional[str] = ANALYSIS_CACHE_FILE, max_entries: int = 500):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.stats = {}  # command -> {"hits": int, "misses": int}
+        self._load()
+
+    def _load(self):
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read analysis cache {self.cache_file}: {e}")
+            self.entries = {}
+
+    def _save(self):
+        if not self.cache_file:
+            return
+        try:
+            temp_file = self.cache_file + ".tmp"
+            with open(temp_file, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, ensure_ascii=False, indent=1)
+            os.replace(temp_file, self.cache_file)
+        except OSError as e:
+            print(f"Could not write analysis cache {self.cache_file}: {e}")
+
+    @staticmethod
+    def key(command: str, path: str) -> Optional[str]:
+        fingerprint = file_fingerprint(path)
+        if fingerprint is None:
+            return None
+        return f"{command}|{os.path.normcase(os.path.abspath(path))}|{fingerprint}"
+
+    def _count(self, command: str, hit: bool):
+        counters = self.stats.setdefault(command, {"hits": 0, "misses": 0})
+        counters["hits" if hit else "misses"] += 1
+
+    def get(self, command: str, path: Optional[str], key: Optional[str] = None) -> Optional[str]:
+        """
+        Stored response of an analysis on this exact file content
+
+        Args:
+            key: Key taken earlier with key() (default: the file's content now)
+
+        Returns:
+            Response message, or None on a miss (or for files that cannot be fingerprinted)
+        """
+        if command not in ANALYSIS_COMMANDS or not (path or key):
+            return None
+        key = key or self.key(command, path)
+        with self.lock:
+            entry = self.entries.get(key) if key else None
+            self._count(command, entry is not None)
+            if entry is None:
+                return None
+            entry["used"] = time.time()
+            return entry["message"]
+
+    def store(self, command: str, path: Optional[str], message: str, key: Optional[str] = None):
+        """
+        Remember the response of a successful analysis
+
+        Args:
+            key: Key taken with key() when the command was sent (default: the file's content now)
+        """
+        if command not in ANALYSIS_COMMANDS or not (path or key):
+            return
+        key = key or self.key(command, path)
+        if key is None:
+            return
+        with self.lock:
+            # Results for an older version of the same file are obsolete
+            prefix = key.rsplit("|", 1)[0] + "|"
+            for old_key in [k for k in self.entries if k.startswith(prefix) and k != key]:
+                del self.entries[old_key]
+            now = time.time()
+            self.entries[key] = {"message": message, "stored": now, "used": now}
+            if len(self.entries) > self.max_entries:
+                by_use = sorted(self.entries, key=lambda k: self.entries[k]["used"])
+                for old_key in by_use[:len(self.entries) - self.max_entries]:
+                    del self.entries[old_key]
+            self._save()
+
+    def hit_rates(self) -> dict:
+        """Hits, misses and hit rate per command and in total"""
+        with self.lock:
+            report = {}
+            total_hits = total_misses = 0
+            for command, counters in self.stats.items():
+                lookups = counters["hits"] + counters["misses"]
+                report[command] = dict(counters, hit_rate=counters["hits"] / lookups if lookups else 0.0)
+                total_hits += counters["hits"]
+                total_misses += counters["misses"]
+            lookups = total_hits + total_misses
+            report["total"] = {"hits": total_hits, "misses": total_misses,
+                               "hit_rate": total_hits / lookups if lookups else 0.0,
+                               "entries": len(self.entries)}
+            return report
+
+    def clear(self):
+        with self.lock:
+            self.entries = {}
+            self._save()
+
+
+analysis_cache = AnalysisCache()
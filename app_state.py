@@ -0,0 +1,113 @@
+"""
+Client-side mirror of the PAUTReader application state.
+Updated from command responses, it remembers the current directory, the loaded file and the
+analyses already run on it, so repeated loadData/setNewDirectory/analysis commands can be
+answered locally instead of reloading a large .fpd file or rerunning a detection.
+
+PAUTReader can also be used directly, so every entry expires after max_age seconds.
+"""
+import os
+import time
+import threading
+from typing import Optional
+
+# Commands whose result only depends on the loaded file
+FILE_RESULT_COMMANDS = ("getFileInformation", "doAnalysisSNR", "startDefectDetection", "makeSingleFileOnly")
+
+
+def normalize_path(path: str) -> str:
+    return os.path.normcase(os.path.normpath(str(path).strip().strip('"\'')))
+
+
+class AppStateMirror:
+    """
+    Last known PAUTReader state.
+
+    Args:
+        max_age: Seconds after which a remembered value is no longer trusted
+    """
+    def __init__(self, max_age: float = 600.0):
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.directory = None      # (path, timestamp)
+        self.loaded_file = None    # (path, timestamp)
+        self.file_results = {}     # command -> (response message, timestamp) for the loaded file
+        self.skipped = 0
+
+    def _fresh(self, entry) -> bool:
+        return entry is not None and time.monotonic() - entry[1] < self.max_age
+
+    def record(self, command: str, args, success: bool, response=None, message: str = ""):
+        """
+        Update the mirror from a command response
+
+        Args:
+            command: Command name
+            args: Arguments the command was sent with
+            success: Whether PAUTReader executed the command
+            response: Parsed JSON response
+            message: Display message of the response
+        """
+        now = time.monotonic()
+        with self.lock:
+            if command == "loadData":
+                # A failed load may have left any file open
+                self.loaded_file = (normalize_path(args[0]), now) if success and args else None
+                self.file_results = {}
+            elif not success:
+                return
+            elif command == "getDirectory" and isinstance(response, dict) and "FolderName" in response:
+                self.directory = (normalize_path(response["FolderName"]), now)
+            elif command == "setNewDirectory":
+                # Relative names are resolved by PAUTReader, only absolute paths are known exactly
+                folder = args[0] if args else ""
+                self.directory = (normalize_path(folder), now) if folder and os.path.isabs(folder) else None
+            elif command in FILE_RESULT_COMMANDS and self._fresh(self.loaded_file):
+                self.file_results[command] = (message, now)
+
+    def cached_response(self, command: str, args) -> Optional[str]:
+        """
+        Response for a command that would not change anything in PAUTReader
+
+        Returns:
+            Display message, or None if the command has to be sent
+        """
+        with self.lock:
+            if command == "loadData" and args and self._fresh(self.loaded_file):
+                if normalize_path(args[0]) == self.loaded_file[0]:
+                    self.skipped += 1
+                    return f"File is already loaded: {args[0]}"
+            elif command == "setNewDirectory" and args and self._fresh(self.directory):
+                if os.path.isabs(args[0]) and normalize_path(args[0]) == self.directory[0]:
+                    self.skipped += 1
+                    return f"Current directory is already {args[0]}"
+            elif command in FILE_RESULT_COMMANDS and self._fresh(self.loaded_file):
+                entry = self.file_results.get(command)
+                if self._fresh(entry):
+                    self.skipped += 1
+                    return entry[0]
+        return None
+
+    def current_file(self) -> Optional[str]:
+        """Path of the file PAUTReader has loaded, if known"""
+        with self.lock:
+            return self.loaded_file[0] if self._fresh(self.loaded_file) else None
+
+    def invalidate(self):
+        """Forget everything (e.g. after PAUTReader was restarted)"""
+        with self.lock:
+            self.directory = None
+            self.loaded_file = None
+            self.file_results = {}
+
+    def snapshot(self) -> dict:
+        with self.lock:
+            return {
+                "directory": self.directory[0] if self._fresh(self.directory) else None,
+                "loaded_file": self.loaded_file[0] if self._fresh(self.loaded_file) else None,
+                "completed": sorted(command for command, entry in self.file_results.items() if self._fresh(entry)),
+                "skipped_commands": self.skipped,
+            }
+
+
+app_state = AppStateMirror()
@@ -0,0 +1,91 @@
+"""
+Preallocated int16 sample buffer for audio capture.
+The capture callback copies each block straight into a NumPy array (no per-chunk bytes
+objects and no join at the end). The array holds max_seconds of audio, allocated and
+touched up front (about 10 MB for 300 s at 16 kHz), so the callback never allocates or
+copies more than its own block; past max_seconds it works as a ring that keeps the most
+recent audio.
+
+Positions are absolute sample counts since the start of the recording, so consumers (level
+meter, VAD, encoder) can read "everything since position p" as a view of the buffer.
+
+The buffer is single-producer and lock-free: only the capture callback writes, and it
+publishes new samples by advancing `written` after they have been copied. Readers take
+`written` first and then read the array, so it holds every sample up to their snapshot. The
+callback never waits for a consumer.
+"""
+import numpy as np
+
+
+class AudioBuffer:
+    """
+    Preallocated ring buffer of mono int16 samples.
+
+    Args:
+        sample_rate: Sample rate of the recorded audio
+        max_seconds: Longest recording kept; older audio is overwritten after that
+    """
+    def __init__(self, sample_rate: int = 16000, max_seconds: float = 300.0):
+        self.sample_rate = sample_rate
+        self.data = np.empty(int(sample_rate * max_seconds), dtype=np.int16)
+        self.data.fill(0)  # touch every page now, not on first write in the capture callback
+        self.written = 0
+
+    @property
+    def capacity(self) -> int:
+        return len(self.data)
+
+    @property
+    def start(self) -> int:
+        """Oldest position still held"""
+        return max(0, self.written - self.capacity)
+
+    @property
+    def duration(self) -> float:
+        return (self.written - self.start) / self.sample_rate
+
+    @property
+    def dropped(self) -> int:
+        """Samples overwritten because the recording exceeded max_seconds"""
+        return self.start
+
+    def write(self, samples: np.ndarray):
+        """Append int16 samples (copied once, into the preallocated array); producer only"""
+        samples = samples.reshape(-1)
+        needed = self.written + len(samples)
+        data = self.data
+        if len(samples) > len(data):
+            samples = samples[-len(data):]
+        # Absolute position of the first sample kept (later than written if the block was cut)
+        position = (needed - len(samples)) % len(data)
+        first = min(len(samples), len(data) - position)
+        data[position:position + first] = samples[:first]
+        if first < len(samples):
+            data[:len(samples) - first] = samples[first:]
+        self.written = needed  # publish
+
+    def view(self, start: int = 0, end: int = None) -> np.ndarray:
+        """
+        Samples between two absolute positions
+
+        A view into the buffer (no copy) unless the range wraps around the end of the ring.
+        Positions older than start are clamped.
+        """
+        written = self.written
+        data = self.data
+        end = written if end is None else min(end, written)
+        start = max(start, written - len(data), 0)
+        if start >= end:
+            return data[:0]
+        first = start % len(data)
+        last = first + (end - start)
+        if last <= len(data):
+            return data[first:last]
+        return np.concatenate((data[first:], data[:last - len(data)]))
+
+    def samples(self) -> np.ndarray:
+        """Everything still held, oldest first"""
+        return self.view(self.start)
+
+    def clear(self):
+        self.written = 0
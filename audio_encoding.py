@@ -0,0 +1,134 @@
+"""
+In-memory audio encoding for the transcription upload.
+Recordings are encoded in a BytesIO straight from the recorded int16 samples and uploaded
+from memory; nothing is written to disk on the normal path. Besides WAV, the upload can be
+compressed to FLAC (lossless, about half the size) or Opus (lossy, a tenth of the size or
+less), which both Whisper accepts; those need the optional soundfile package and fall back
+to WAV without it. Debug capture of the uploads is optional: DebugAudioWriter saves them on
+a background thread and prunes the debug folder to a size and file cap.
+"""
+import io
+import os
+import time
+import wave
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Tuple
+
+import numpy as np
+
+try:
+    import soundfile
+except ImportError:  # FLAC/Opus upload needs soundfile (libsndfile)
+    soundfile = None
+
+# codec -> (upload file name, soundfile format, soundfile subtype)
+CODECS = {
+    "wav": ("speech.wav", None, None),
+    "flac": ("speech.flac", "FLAC", "PCM_16"),
+    "opus": ("speech.ogg", "OGG", "OPUS"),
+}
+
+DEBUG_AUDIO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "debug_audio")
+
+
+def wav_bytes(samples, sample_rate: int = 16000, channels: int = 1) -> bytes:
+    """
+    Encode 16-bit PCM to a WAV file in memory
+
+    Args:
+        samples: int16 samples as bytes or any buffer (e.g. a NumPy array or view); the
+                 samples are written through a memoryview, without an intermediate copy
+        sample_rate: Sample rate in Hz
+        channels: Number of interleaved channels
+
+    Returns:
+        bytes: Complete WAV file
+    """
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)  # 16-bit audio
+        wf.setframerate(sample_rate)
+        wf.writeframes(memoryview(samples).cast("B"))
+    return buffer.getvalue()
+
+
+def encode_audio(samples, sample_rate: int = 16000, channels: int = 1, codec: str = "flac") -> Tuple[str, bytes, str]:
+    """
+    Encode 16-bit PCM for upload
+
+    Args:
+        samples: int16 samples (NumPy array or bytes)
+        sample_rate: Sample rate in Hz
+        channels: Number of interleaved channels
+        codec: "wav", "flac" or "opus"
+
+    Returns:
+        tuple: (file name for the upload, encoded bytes, codec actually used)
+    """
+    if codec not in CODECS:
+        raise ValueError(f"Unknown audio codec '{codec}', expected one of {', '.join(CODECS)}")
+    name, file_format, subtype = CODECS[codec]
+    if file_format is not None and soundfile is not None:
+        try:
+            if not isinstance(samples, np.ndarray):
+                samples = np.frombuffer(samples, dtype=np.int16)
+            buffer = io.BytesIO()
+            soundfile.write(buffer, samples.reshape(-1, channels), sample_rate, format=file_format, subtype=subtype)
+            return name, buffer.getvalue(), codec
+        except Exception as e:  # e.g. a libsndfile build without Opus support
+            print(f"Could not encode audio as {codec} ({e}), uploading WAV")
+    elif file_format is not None:
+        print(f"soundfile is not installed, uploading WAV instead of {codec}")
+    return CODECS["wav"][0], wav_bytes(samples, sample_rate, channels), "wav"
+
+
+class DebugAudioWriter:
+    """
+    Saves uploaded recordings for debugging without blocking the audio path.
+
+    Args:
+        directory: Folder the recordings are written to
+        max_files: Oldest recordings are deleted above this number of files
+        max_bytes: Oldest recordings are deleted above this total size
+    """
+    def __init__(self, directory: str = DEBUG_AUDIO_DIR, max_files: int = 20, max_bytes: int = 50 * 1024 * 1024):
+        self.directory = directory
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="debug-audio")
+        self.lock = threading.Lock()
+
+    def save(self, data: bytes, extension: str = "wav"):
+        """Queue one recording for writing; returns the Future of the written path"""
+        name = f"debug_audio_{time.strftime('%Y%m%d_%H%M%S')}_{int(time.time() * 1000) % 1000:03d}.{extension}"
+        return self.executor.submit(self._write, name, data)
+
+    def _write(self, name: str, data: bytes) -> str:
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, name)
+            with open(path, "wb") as f:
+                f.write(data)
+            self._prune()
+        print(f"Debug audio saved to: {path}")
+        return path
+
+    def _prune(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith("debug_audio_") and os.path.isfile(path):
+                stat = os.stat(path)
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        while entries and (len(entries) > self.max_files or total > self.max_bytes):
+            _, size, path = entries.pop(0)
+            try:
+                os.remove(path)
+                total -= size
+            except OSError as e:
+                print(f"Could not delete old debug audio {path}: {e}")
+                break
@@ -0,0 +1,52 @@
+"""
+Audio level metering for the microphone indicator.
+The level is the RMS and peak of the most recent window of the recording, computed on the
+audio consumer thread (never in the capture callback) from a decimated view of the capture
+buffer, and reported at a fixed UI rate: however often the consumer runs, at most rate_hz
+levels per second reach the Qt event loop, and only the latest one.
+"""
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class LevelMeter:
+    """
+    Rate-limited RMS/peak meter.
+
+    Args:
+        sample_rate: Sample rate of the metered audio
+        window_ms: Length of the sliding window the level is computed over
+        rate_hz: Levels reported per second
+        decimation: Only every n-th sample of the window is looked at
+    """
+    def __init__(self, sample_rate: int = 16000, window_ms: int = 100, rate_hz: float = 20.0, decimation: int = 4):
+        self.window = int(sample_rate * window_ms / 1000)
+        self.interval = 1.0 / rate_hz
+        self.decimation = decimation
+        self.next_report = 0.0
+
+    def due(self, now: Optional[float] = None) -> bool:
+        """Whether the next level should be reported (and, if so, schedule the one after)"""
+        now = time.monotonic() if now is None else now
+        if now < self.next_report:
+            return False
+        # Keep the cadence, but after a pause start a new one instead of reporting twice in a row
+        if now - self.next_report < self.interval:
+            self.next_report += self.interval
+        else:
+            self.next_report = now + self.interval
+        return True
+
+    def measure(self, samples: np.ndarray) -> Tuple[float, float]:
+        """
+        RMS and peak of the last window of int16 samples, both relative to full scale (0..1)
+        """
+        view = samples[-self.window:][::self.decimation]  # strided view, no copy
+        if not len(view):
+            return 0.0, 0.0
+        values = view.astype(np.float32)
+        rms = float(np.sqrt(np.mean(values * values))) / 32768.0
+        peak = float(np.max(np.abs(values))) / 32768.0
+        return rms, peak
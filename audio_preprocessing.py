@@ -0,0 +1,74 @@
+"""
+Preprocessing of a finished recording before it is sent for transcription.
+Leading and trailing silence (the pause between clicking the mic and speaking, and before
+clicking it again) is trimmed with the same VAD that cuts streaming segments, the gain is
+normalized so quiet and loud speakers reach Whisper at a similar level, and recordings
+without any speech are rejected locally instead of costing an API call.
+"""
+from typing import Optional
+
+import numpy as np
+
+from voice_activity import SpeechSegmenter
+
+TARGET_RMS_DBFS = -20.0
+MAX_GAIN_DB = 20.0
+PEAK_LIMIT_DBFS = -1.0
+
+
+def speech_bounds(samples: np.ndarray, sample_rate: int = 16000, margin_ms: int = 250) -> Optional[tuple]:
+    """
+    Sample range from the first to the last speech frame, widened by a margin
+
+    Returns:
+        tuple: (start, end) sample positions, or None if the recording holds no speech
+    """
+    segmenter = SpeechSegmenter(sample_rate)
+    frame_length = segmenter.frame_length
+    frame_count = len(samples) // frame_length
+    if not frame_count:
+        return None
+    frames = samples[:frame_count * frame_length].reshape(frame_count, frame_length).astype(np.float32) / 32768.0
+
+    # The whole recording is known, so start the noise floor at its quiet frames instead of
+    # at the first frame (operators sometimes start talking right away)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    segmenter.noise_floor = max(float(np.percentile(rms, 10)), segmenter.min_rms / segmenter.threshold_ratio)
+
+    speech = np.array([segmenter.is_speech(frame) for frame in frames])
+    # Require a run of speech frames, as the segmenter does, so single clicks do not count
+    runs = np.convolve(speech.astype(np.int32), np.ones(segmenter.start_frames, dtype=np.int32), "valid")
+    voiced = np.flatnonzero(runs >= segmenter.start_frames)
+    if not len(voiced):
+        return None
+    margin = int(sample_rate * margin_ms / 1000)
+    start = max(0, int(voiced[0]) * frame_length - margin)
+    end = min(len(samples), (int(voiced[-1]) + segmenter.start_frames) * frame_length + margin)
+    return start, end
+
+
+def normalize_gain(samples: np.ndarray, target_dbfs: float = TARGET_RMS_DBFS, max_gain_db: float = MAX_GAIN_DB,
+                   peak_limit_dbfs: float = PEAK_LIMIT_DBFS) -> np.ndarray:
+    """Scale int16 samples to the target RMS level, without boosting above max_gain_db or clipping"""
+    values = samples.astype(np.float32)
+    rms = float(np.sqrt(np.mean(values * values))) / 32768.0 if len(values) else 0.0
+    peak = float(np.max(np.abs(values))) / 32768.0 if len(values) else 0.0
+    if rms <= 0 or peak <= 0:
+        return samples
+    gain_db = min(target_dbfs - 20 * np.log10(rms), max_gain_db, peak_limit_dbfs - 20 * np.log10(peak))
+    gain = 10 ** (gain_db / 20)
+    return np.clip(values * gain, -32768, 32767).astype(np.int16)
+
+
+def prepare_for_transcription(samples: np.ndarray, sample_rate: int = 16000) -> Optional[np.ndarray]:
+    """
+    Trim silence and normalize the gain of a recording
+
+    Returns:
+        np.ndarray: int16 samples to upload, or None if no speech was detected
+    """
+    bounds = speech_bounds(samples, sample_rate)
+    if bounds is None:
+        return None
+    start, end = bounds
+    return normalize_gain(samples[start:end])
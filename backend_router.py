@@ -0,0 +1,245 @@
+"""
+Latency-aware router for LLM backends (OpenAI and local Ollama).
+Keeps rolling latency and error statistics per (task, backend), picks the fastest
+healthy backend, hedges slow requests and fails over when a backend is unreachable.
+Once a hedged request is answered, the other calls are told to stop (see attempt_cancelled()).
+"""
+import time
+import threading
+import contextvars
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional
+
+
+_attempt_cancelled: contextvars.ContextVar = contextvars.ContextVar("backend_attempt_cancelled", default=None)
+
+
+class HedgeLost(Exception):
+    """Raised by a backend call that stopped because another backend answered first"""
+
+
+def attempt_cancelled() -> bool:
+    """
+    True inside a backend call started by BackendRouter.call() once another backend has
+    answered the same request. Streaming backends check it between chunks and close their stream.
+    """
+    cancelled = _attempt_cancelled.get()
+    return cancelled is not None and cancelled.is_set()
+
+
+def is_network_error(error: Exception) -> bool:
+    """
+    Check whether an exception means the backend could not be reached at all.
+    Covers builtin connection errors plus requests/httpx/openai connection and timeout errors.
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    name = type(error).__name__
+    return "Connection" in name or "Timeout" in name or "Connect" in name
+
+
+class BackendStats:
+    """
+    Rolling latency and outcome window for one backend on one task type.
+    """
+    def __init__(self, window: int = 50):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True for success, False for failure
+        self.unhealthy_until = 0.0
+        self.last_error = ""
+
+    def record(self, latency: float, error: Optional[Exception] = None, cooldown: float = 30.0):
+        self.outcomes.append(error is None)
+        if error is None:
+            self.latencies.append(latency)
+            self.unhealthy_until = 0.0
+        else:
+            self.last_error = f"{type(error).__name__}: {error}"
+            if is_network_error(error):
+                self.unhealthy_until = time.monotonic() + cooldown
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Nearest-rank percentile of successful call latencies, None if there are no samples"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+        return ordered[index]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1.0 - sum(self.outcomes) / len(self.outcomes)
+
+    @property
+    def samples(self) -> int:
+        return len(self.outcomes)
+
+
+class BackendRouter:
+    """
+    Routes a task to one of several interchangeable backends.
+
+    Backends are passed per call as an ordered dict of name -> zero-argument callable;
+    the declared order is the preference used while there are no measurements yet.
+    """
+    def __init__(self, window: int = 50, min_samples: int = 3, error_rate_threshold: float = 0.5,
+                 cooldown: float = 30.0, min_hedge_delay: float = 2.0, max_workers: int = 4):
+        self.window = window
+        self.min_samples = min_samples
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown = cooldown
+        self.min_hedge_delay = min_hedge_delay
+        self.stats: Dict[tuple, BackendStats] = {}
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="backend-router")
+
+    def _stats(self, task: str, backend: str) -> BackendStats:
+        key = (task, backend)
+        if key not in self.stats:
+            self.stats[key] = BackendStats(self.window)
+        return self.stats[key]
+
+    def record(self, task: str, backend: str, latency: float, error: Optional[Exception] = None):
+        """Record the outcome of a call that was made outside of call() (e.g. a streamed answer)"""
+        with self.lock:
+            self._stats(task, backend).record(latency, error, self.cooldown)
+
+    def is_healthy(self, task: str, backend: str) -> bool:
+        with self.lock:
+            stats = self._stats(task, backend)
+            if time.monotonic() < stats.unhealthy_until:
+                return False
+            if stats.samples >= self.min_samples and stats.error_rate > self.error_rate_threshold:
+                return False
+            return True
+
+    def ranked(self, task: str, backends: List[str]) -> List[str]:
+        """
+        Order backends for a task: healthy ones by p50 latency (unmeasured ones first so they
+        get sampled, keeping the declared order), then unhealthy ones as a last resort.
+        """
+        healthy = []
+        unhealthy = []
+        for index, name in enumerate(backends):
+            with self.lock:
+                stats = self._stats(task, name)
+                p50 = stats.percentile(50) if len(stats.latencies) >= self.min_samples else None
+            entry = (p50 if p50 is not None else 0.0, index, name)
+            if self.is_healthy(task, name):
+                healthy.append(entry)
+            else:
+                unhealthy.append(entry)
+        return [name for _, _, name in sorted(healthy)] + [name for _, _, name in sorted(unhealthy)]
+
+    def hedge_delay(self, task: str, backend: str) -> float:
+        """How long to wait for a backend before starting a hedged request on the next one"""
+        with self.lock:
+            p95 = self._stats(task, backend).percentile(95)
+        if p95 is None:
+            return self.min_hedge_delay
+        return max(self.min_hedge_delay, p95)
+
+    def _timed_call(self, task: str, backend: str, func: Callable, is_failure: Callable,
+                    cancelled: threading.Event):
+        _attempt_cancelled.set(cancelled)
+        started = time.perf_counter()
+        try:
+            result = func()
+            if is_failure(result):
+                raise RuntimeError(f"Backend '{backend}' returned no result")
+        except Exception as e:
+            # A call stopped because it lost the hedge says nothing about the backend's health
+            if not cancelled.is_set():
+                self.record(task, backend, time.perf_counter() - started, e)
+            raise
+        self.record(task, backend, time.perf_counter() - started)
+        return result
+
+    def call(self, task: str, backends: Dict[str, Callable], is_failure: Optional[Callable] = None):
+        """
+        Run a task on the best backend, hedging and failing over as needed.
+
+        Args:
+            task: Task type used to keep separate statistics (e.g. "chat", "filename")
+            backends: Ordered mapping of backend name -> zero-argument callable
+            is_failure: Predicate marking a returned value as failed (default: None result)
+
+        Returns:
+            Result of the first backend that succeeds; calls still running are cancelled
+
+        Raises:
+            RuntimeError: If every backend failed
+        """
+        if is_failure is None:
+            is_failure = lambda result: result is None
+
+        order = self.ranked(task, list(backends))
+        if not order:
+            raise RuntimeError(f"No backends configured for task '{task}'")
+
+        pending = {}
+        cancel_events = {}
+        errors = []
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            name = order[next_index]
+            next_index += 1
+            # Copy the context so tracing spans of the backend call stay in the caller's trace
+            cancelled = threading.Event()
+            future = self.executor.submit(contextvars.copy_context().run,
+                                          self._timed_call, task, name, backends[name], is_failure, cancelled)
+            pending[future] = name
+            cancel_events[future] = cancelled
+
+        launch()
+        while pending:
+            timeout = None
+            if next_index < len(order):
+                timeout = self.hedge_delay(task, order[next_index - 1])
+
+            done, _ = wait(list(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                print(f"Router: '{order[next_index - 1]}' slow on '{task}', hedging with '{order[next_index]}'")
+                launch()
+                continue
+
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    result = future.result()
+                    if name != order[0]:
+                        print(f"Router: '{task}' served by fallback backend '{name}'")
+                    for loser in pending:
+                        loser.cancel()
+                        cancel_events[loser].set()
+                    return result
+                except Exception as e:
+                    print(f"Router: backend '{name}' failed on '{task}': {e}")
+                    errors.append(f"{name}: {e}")
+
+            if not pending and next_index < len(order):
+                launch()
+
+        raise RuntimeError(f"All backends failed for task '{task}': {'; '.join(errors)}")
+
+    def summary(self) -> Dict[str, dict]:
+        """Current statistics per task/backend pair, for logging or display"""
+        report = {}
+        for task, backend in list(self.stats):
+            with self.lock:
+                stats = self._stats(task, backend)
+                entry = {
+                    "p50": stats.percentile(50),
+                    "p95": stats.percentile(95),
+                    "error_rate": stats.error_rate,
+                    "samples": stats.samples,
+                    "last_error": stats.last_error,
+                }
+            entry["healthy"] = self.is_healthy(task, backend)
+            report[f"{task}/{backend}"] = entry
+        return report
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Compare the upload codecs for voice transcription: encoded size and encoding time for every
+codec and, with --transcribe, the end-to-end Whisper latency (encoding plus request).
+Uses a 16 kHz mono WAV recording (e.g. one from debug_audio/) or a synthetic test signal.
+
+    python benchmark_audio_codecs.py --wav debug_audio/debug_audio_20250101_120000_000.wav --transcribe
+"""
+import sys
+import os
+import time
+import wave
+import argparse
+
+import numpy as np
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from audio_encoding import CODECS, encode_audio
+
+
+def load_wav(path):
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1:
+            raise ValueError("Expected a 16-bit mono WAV file")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16), wf.getframerate()
+
+
+def synthetic_speech(seconds=5.0, sample_rate=16000):
+    """Voiced bursts (harmonics of a gliding fundamental) separated by pauses, over light noise"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    f0 = 140 + 30 * np.sin(2 * np.pi * 0.7 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+    voiced = sum(np.sin(k * phase) / k for k in range(1, 12))
+    envelope = (np.sin(2 * np.pi * 0.6 * t) > -0.2).astype(np.float32)
+    rng = np.random.default_rng(0)
+    signal = 0.25 * voiced * envelope + 0.005 * rng.standard_normal(len(t))
+    return (np.clip(signal, -1, 1) * 32767).astype(np.int16), sample_rate
+
+
+def transcribe(client, file_name, audio, language):
+    started = time.perf_counter()
+    transcript = client.audio.transcriptions.create(model="whisper-1", file=(file_name, audio), language=language)
+    return time.perf_counter() - started, transcript.text.strip()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--wav", help="16-bit mono WAV recording (default: synthetic signal)")
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--transcribe", action="store_true", help="Also measure Whisper latency (needs key.txt)")
+    parser.add_argument("--language", default="en")
+    options = parser.parse_args()
+
+    samples, sample_rate = load_wav(options.wav) if options.wav else synthetic_speech()
+    duration = len(samples) / sample_rate
+    print(f"Audio: {duration:.2f}s at {sample_rate} Hz")
+
+    client = None
+    if options.transcribe:
+        from openai import OpenAI
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "key.txt"), "r") as f:
+            client = OpenAI(api_key=f.read().strip())
+
+    print(f"\n{'codec':<6} {'size':>10} {'kbit/s':>8} {'encode':>10} {'end-to-end':>12}")
+    for codec in CODECS:
+        encode_times, latencies = [], []
+        for _ in range(options.repetitions):
+            started = time.perf_counter()
+            file_name, audio, used = encode_audio(samples, sample_rate, 1, codec)
+            encode_times.append(time.perf_counter() - started)
+            if client is not None:
+                latency, text = transcribe(client, file_name, audio, options.language)
+                latencies.append(encode_times[-1] + latency)
+        if used != codec:
+            print(f"{codec:<6} not available (encoded as {used})")
+            continue
+        end_to_end = f"{sorted(latencies)[len(latencies) // 2] * 1000:9.0f} ms" if latencies else "-"
+        print(f"{codec:<6} {len(audio) / 1024:8.1f} KB {len(audio) * 8 / duration / 1000:8.1f} "
+              f"{min(encode_times) * 1000:7.1f} ms {end_to_end:>12}")
+        if latencies:
+            print(f"       transcript: {text}")
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark PAUTReader command latency with and without the pooled keep-alive session.
+Runs against the local API stub, so no PAUTReader instance is needed.
+
+    python benchmark_command_pool.py --requests 200 --delay-ms 0
+"""
+import sys
+import os
+import time
+import argparse
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import command_process
+from app_state import app_state
+from paut_stub_server import start_stub_server
+
+COMMAND_MIX = [
+    ("getDirectory", ()),
+    ("loadData", ("C:/Data/scan_001.fpd",)),
+    ("updatePlot", ()),
+    ("getFileInformation", ()),
+    ("doAnalysisSNR", ()),
+]
+
+# A multi-step request: set directory, open file, run SNR and defect detection, make report
+MULTI_STEP_REQUEST = [
+    ("setNewDirectory", ("C:/Data", False, "")),
+    ("loadData", ("C:/Data/scan_001.fpd",)),
+    ("doAnalysisSNR", ()),
+    ("startDefectDetection", ()),
+    ("makeSingleFileOnly", ()),
+]
+
+
+def run(base_url, total_requests, pooled):
+    command_process.POOLING_ENABLED = pooled
+    command_process.session_pool.close_all()
+    latencies = {}
+    for i in range(total_requests):
+        command, args = COMMAND_MIX[i % len(COMMAND_MIX)]
+        started = time.perf_counter()
+        response = command_process.send_command(command, *args, base_url=base_url)
+        elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            print(f"{command} failed with status {response.status_code}")
+        latencies.setdefault(command, []).append(elapsed)
+    return latencies
+
+
+def run_multi_step(base_url, repetitions, batch):
+    command_process.POOLING_ENABLED = True
+    command_process.batch_supported.clear()
+    if not batch:
+        command_process.batch_supported[base_url] = False
+    latencies = {"request": []}
+    for _ in range(repetitions):
+        app_state.invalidate()  # measure the round-trips, not the state mirror
+        started = time.perf_counter()
+        results = command_process.execute_command_batch(MULTI_STEP_REQUEST, base_url=base_url)
+        latencies["request"].append((time.perf_counter() - started) * 1000)
+        if not all(result["success"] for result in results):
+            print(f"Multi-step request failed: {results}")
+    return latencies
+
+
+def report(title, latencies):
+    print(f"\n=== {title} ===")
+    everything = []
+    for command, values in latencies.items():
+        values = sorted(values)
+        everything.extend(values)
+        print(f"{command:<20} mean {sum(values) / len(values):7.2f} ms   "
+              f"p50 {values[len(values) // 2]:7.2f} ms   p95 {values[int(len(values) * 0.95) - 1]:7.2f} ms")
+    everything.sort()
+    print(f"{'all':<20} mean {sum(everything) / len(everything):7.2f} ms   "
+          f"p50 {everything[len(everything) // 2]:7.2f} ms")
+    return sum(everything) / len(everything)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--delay-ms", type=float, default=0.0)
+    options = parser.parse_args()
+
+    server, base_url = start_stub_server(options.port, options.delay_ms / 1000.0)
+    try:
+        run(base_url, len(COMMAND_MIX), pooled=True)  # warm-up
+        unpooled = report("New connection per command", run(base_url, options.requests, pooled=False))
+        pooled = report("Pooled keep-alive session", run(base_url, options.requests, pooled=True))
+        print(f"\nMean latency change with pooling: {(pooled - unpooled) / unpooled * 100:+.1f}%")
+
+        repetitions = max(1, options.requests // len(MULTI_STEP_REQUEST))
+        individual = report("Multi-step request, one call per command", run_multi_step(base_url, repetitions, False))
+        batched = report("Multi-step request, batch endpoint", run_multi_step(base_url, repetitions, True))
+        print(f"\nMean latency change with batching: {(batched - individual) / individual * 100:+.1f}%")
+    finally:
+        server.should_exit = True
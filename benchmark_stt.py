@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Compare the speech-to-text backends on recorded samples: latency per recording and word
+error rate against reference transcripts. Every 16 kHz mono WAV in the folder is
+transcribed by each backend; a text file with the same name (scan_01.wav -> scan_01.txt)
+holds the reference transcript.
+
+    python benchmark_stt.py recordings/ --backends openai local --model-size base --threads 4
+"""
+import sys
+import os
+import re
+import time
+import wave
+import argparse
+
+import numpy as np
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stt_backends import BACKENDS, create_backend
+
+
+def load_samples(folder):
+    """(name, int16 samples, reference text or None) for every WAV file of the folder"""
+    samples = []
+    for name in sorted(os.listdir(folder)):
+        if not name.lower().endswith(".wav"):
+            continue
+        with wave.open(os.path.join(folder, name), "rb") as wf:
+            if wf.getsampwidth() != 2 or wf.getnchannels() != 1 or wf.getframerate() != 16000:
+                print(f"Skipping {name}: expected 16 kHz 16-bit mono")
+                continue
+            audio = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        reference_file = os.path.join(folder, os.path.splitext(name)[0] + ".txt")
+        reference = None
+        if os.path.exists(reference_file):
+            with open(reference_file, "r", encoding="utf-8") as f:
+                reference = f.read().strip()
+        samples.append((name, audio, reference))
+    return samples
+
+
+def words(text):
+    return re.findall(r"[\w']+", text.lower())
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance divided by the reference length"""
+    ref, hyp = words(reference), words(hypothesis)
+    distances = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        previous, distances[0] = distances[0], i
+        for j, hyp_word in enumerate(hyp, 1):
+            current = min(distances[j] + 1, distances[j - 1] + 1, previous + (ref_word != hyp_word))
+            previous, distances[j] = distances[j], current
+    return distances[-1] / max(1, len(ref))
+
+
+def make_backend(name, options):
+    if name == "openai":
+        from openai import OpenAI
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "key.txt"), "r") as f:
+            client = OpenAI(api_key=f.read().strip())
+        return create_backend("openai", client, codec=options.codec)
+    return create_backend("local", model_size=options.model_size, cpu_threads=options.threads)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("folder", help="Folder with 16 kHz mono WAV recordings and .txt references")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--codec", default="flac", help="Upload codec of the API backend")
+    parser.add_argument("--model-size", default="base", help="Model of the local backend")
+    parser.add_argument("--threads", type=int, default=4, help="CPU threads of the local backend")
+    options = parser.parse_args()
+
+    recordings = load_samples(options.folder)
+    if not recordings:
+        sys.exit(f"No 16 kHz mono WAV files in {options.folder}")
+    audio_seconds = sum(len(audio) for _, audio, _ in recordings) / 16000
+    print(f"{len(recordings)} recordings, {audio_seconds:.1f}s of audio")
+
+    for name in options.backends:
+        try:
+            backend = make_backend(name, options)
+        except (ImportError, OSError, ValueError) as e:
+            print(f"\n=== {name}: unavailable ({e}) ===")
+            continue
+        started = time.perf_counter()
+        backend.warm_up()
+        print(f"\n=== {name} (warm-up {time.perf_counter() - started:.1f}s) ===")
+        latencies, errors = [], []
+        for file_name, audio, reference in recordings:
+            started = time.perf_counter()
+            text = backend.transcribe(audio, 16000, options.language)
+            latencies.append(time.perf_counter() - started)
+            wer = word_error_rate(reference, text) if reference is not None else None
+            if wer is not None:
+                errors.append(wer)
+            wer_text = f"WER {wer * 100:5.1f}%" if wer is not None else "no reference"
+            print(f"{file_name:<30} {latencies[-1] * 1000:8.0f} ms  {wer_text}  {text}")
+        latencies.sort()
+        print(f"{'median latency':<30} {latencies[len(latencies) // 2] * 1000:8.0f} ms   "
+              f"real-time factor {sum(latencies) / audio_seconds:.2f}")
+        if errors:
+            print(f"{'mean WER':<30} {sum(errors) / len(errors) * 100:7.1f} %")
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the voice engine over stored recordings.
+Every 16 kHz mono WAV in the folder is replayed through VoiceEngine's capture path (the
+file takes the place of the microphone, at real-time speed unless --fast is given) for each
+combination of mode (streaming / whole recording), upload codec and speech-to-text
+backend. Reported per configuration: latency from "stop" to the final text, which is what
+the user waits for, and the word error rate against NAME.txt reference transcripts.
+
+    python benchmark_voice_engine.py recordings/ --modes streaming whole --codecs flac opus --backends openai
+"""
+import sys
+import os
+import time
+import argparse
+import itertools
+import threading
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from audio_encoding import CODECS
+from benchmark_stt import load_samples, word_error_rate
+from stt_backends import BACKENDS
+from voice_engine import BLOCK_SIZE, VoiceEngine, load_openai_client
+
+
+def replay(samples, realtime):
+    """Capture source writing a recording into the engine's buffer block by block"""
+    def source(buffer):
+        block_seconds = BLOCK_SIZE / 16000
+        started = time.perf_counter()
+        for index, start in enumerate(range(0, len(samples), BLOCK_SIZE)):
+            if realtime:
+                time.sleep(max(0.0, started + index * block_seconds - time.perf_counter()))
+            buffer.write(samples[start:start + BLOCK_SIZE])
+    return source
+
+
+def run_recording(engine, samples, realtime, timeout=120.0):
+    """Replay one recording; returns (seconds from stop to result, text or None, error)"""
+    done = threading.Event()
+    result = {}
+    engine.on_transcription = lambda text: (result.update(text=text), done.set())
+    engine.on_error = lambda message: (result.update(error=message), done.set())
+    engine.start(source=replay(samples, realtime))
+    engine.recording_thread.join()
+    stopped = time.perf_counter()
+    engine.stop()
+    if not done.wait(timeout):
+        return None, None, "timeout"
+    return time.perf_counter() - stopped, result.get("text"), result.get("error")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("folder", help="Folder with 16 kHz mono WAV recordings and .txt references")
+    parser.add_argument("--modes", nargs="+", choices=("streaming", "whole"), default=["streaming", "whole"])
+    parser.add_argument("--codecs", nargs="+", choices=list(CODECS), default=["flac"])
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=["openai"])
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--model-size", default="base", help="Model of the local backend")
+    parser.add_argument("--threads", type=int, default=4, help="CPU threads of the local backend")
+    parser.add_argument("--fast", action="store_true", help="Replay as fast as possible instead of in real time")
+    options = parser.parse_args()
+
+    recordings = load_samples(options.folder)
+    if not recordings:
+        sys.exit(f"No 16 kHz mono WAV files in {options.folder}")
+    client = load_openai_client() if "openai" in options.backends else None
+
+    summary = []
+    for backend, codec, mode in itertools.product(options.backends, options.codecs, options.modes):
+        if backend == "local" and codec != options.codecs[0]:
+            continue  # nothing is uploaded, the codec does not matter
+        engine = VoiceEngine(client)
+        engine.language = options.language
+        engine.streaming = mode == "streaming"
+        engine.upload_codec = codec
+        engine.stt_backend = backend
+        engine.local_model_size = options.model_size
+        engine.stt_threads = options.threads
+        engine.configure_backend(warm_up=False)
+        if engine.backend is None or engine.backend.name != backend:
+            print(f"\n=== {backend}: unavailable ===")
+            continue
+        engine.backend.warm_up()
+
+        label = f"{backend}/{codec if backend == 'openai' else options.model_size}/{mode}"
+        print(f"\n=== {label} ===")
+        latencies, errors = [], []
+        for file_name, samples, reference in recordings:
+            latency, text, error = run_recording(engine, samples, not options.fast)
+            if error:
+                print(f"{file_name:<30} error: {error}")
+                continue
+            latencies.append(latency)
+            wer = word_error_rate(reference, text) if reference is not None else None
+            if wer is not None:
+                errors.append(wer)
+            wer_text = f"WER {wer * 100:5.1f}%" if wer is not None else "no reference"
+            print(f"{file_name:<30} {latency * 1000:8.0f} ms after stop  {wer_text}  {text}")
+        if latencies:
+            latencies.sort()
+            mean_wer = sum(errors) / len(errors) * 100 if errors else None
+            summary.append((label, latencies[len(latencies) // 2], mean_wer))
+
+    if summary:
+        print(f"\n{'configuration':<32} {'median latency':>15} {'mean WER':>9}")
+        for label, latency, mean_wer in summary:
+            wer_text = f"{mean_wer:8.1f}%" if mean_wer is not None else "        -"
+            print(f"{label:<32} {latency * 1000:12.0f} ms {wer_text}")
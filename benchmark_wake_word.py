@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Measure the wake-word spotter: CPU overhead of always-on listening and detection latency.
+A 16 kHz mono WAV recording is fed to the KeywordSpotter in the chunks the listener uses
+(every 100 ms). Reported: CPU time as a share of one core in real time, and for every
+detection the time from the end of the wake word to the moment it was recognized (VAD
+hangover + wait for the next pass + spotting time).
+
+Without arguments a synthetic test is run: gliding-formant "words", one of which (with
+different pitch and length) matches the templates, mixed with non-matching words and noise.
+
+    python benchmark_wake_word.py --templates wake_word/ --wav hallway_recording.wav
+"""
+import sys
+import os
+import time
+import wave
+import argparse
+
+import numpy as np
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from wake_word import KeywordSpotter, WAKE_WORD_DIR
+
+SAMPLE_RATE = 16000
+
+
+def synthetic_word(formant_start, formant_end, seconds=0.7, pitch=140, level=0.1, seed=0):
+    """Harmonics of a vibrato pitch shaped by one formant gliding between two frequencies"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    f0 = pitch * (1 + 0.05 * np.sin(2 * np.pi * 2 * t))
+    phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+    formant = formant_start + (formant_end - formant_start) * t / seconds
+    signal = sum(np.sin(k * phase) * np.exp(-((k * f0 - formant) / 300.0) ** 2) for k in range(1, 28))
+    envelope = np.minimum(1, np.minimum(t / 0.05, (seconds - t) / 0.05))
+    return level * signal * envelope / np.max(np.abs(signal)) + 0.002 * rng.standard_normal(len(t))
+
+
+def synthetic_test():
+    """(templates, test recording, end times of the wake words in seconds)"""
+    rng = np.random.default_rng(1)
+    noise = lambda seconds: 0.002 * rng.standard_normal(int(seconds * SAMPLE_RATE))
+    pcm = lambda parts: (np.clip(np.concatenate(parts), -1, 1) * 32767).astype(np.int16)
+    templates = [pcm([synthetic_word(500, 2000, 0.7, pitch=140 + 10 * i, seed=i)]) for i in range(3)]
+    parts, ends, position = [], [], 0.0
+    for kind in ("other", "wake", "other", "other", "wake", "silence", "wake"):
+        gap = noise(1.0)
+        if kind == "wake":
+            word = synthetic_word(520, 1900, 0.8, pitch=125, level=0.06, seed=len(parts))
+        elif kind == "other":
+            word = synthetic_word(2000, 500, 0.9, seed=len(parts))
+        else:
+            word = noise(5.0)
+        parts += [gap, word]
+        position += (len(gap) + len(word)) / SAMPLE_RATE
+        if kind == "wake":
+            ends.append(position)
+    parts.append(noise(1.0))
+    return templates, pcm(parts), ends
+
+
+def load_wav(path):
+    with wave.open(path, "rb") as wf:
+        if wf.getsampwidth() != 2 or wf.getnchannels() != 1 or wf.getframerate() != SAMPLE_RATE:
+            raise ValueError(f"{path}: expected 16 kHz 16-bit mono")
+        return np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--templates", default=WAKE_WORD_DIR, help="Folder with wake-word WAV templates")
+    parser.add_argument("--wav", help="Test recording (default: synthetic test)")
+    parser.add_argument("--interval", type=float, default=0.1, help="Seconds of audio per spotting pass")
+    parser.add_argument("--threshold", type=float, default=None)
+    options = parser.parse_args()
+
+    expected = None
+    spotter_options = {"threshold": options.threshold} if options.threshold is not None else {}
+    if options.wav:
+        spotter = KeywordSpotter.from_folder(options.templates, **spotter_options)
+        recording = load_wav(options.wav)
+    else:
+        templates, recording, expected = synthetic_test()
+        spotter = KeywordSpotter(templates, **spotter_options)
+    duration = len(recording) / SAMPLE_RATE
+    print(f"{len(spotter.templates)} templates, {duration:.1f}s test recording")
+
+    chunk = int(options.interval * SAMPLE_RATE)
+    cpu = 0.0
+    detections = []
+    for start in range(0, len(recording), chunk):
+        started, cpu_started = time.perf_counter(), time.process_time()
+        detection = spotter.feed(recording[start:start + chunk])
+        cpu += time.process_time() - cpu_started
+        if detection is not None:
+            spotting = time.perf_counter() - started
+            chunk_end = min(start + chunk, len(recording))
+            # audio after the word end that had to be captured, plus the spotting time itself
+            latency = (chunk_end - detection["word_end"]) / SAMPLE_RATE + spotting
+            detections.append((detection["word_end"] / SAMPLE_RATE, latency, detection["distance"]))
+
+    print(f"\nCPU: {cpu:.3f}s for {duration:.1f}s of audio = {cpu / duration * 100:.2f}% of one core")
+    print(f"\n{'word end':>9} {'latency':>9} {'distance':>9}")
+    for word_end, latency, distance in detections:
+        print(f"{word_end:8.2f}s {latency * 1000:6.0f} ms {distance:9.2f}")
+    if detections:
+        latencies = sorted(latency for _, latency, _ in detections)
+        print(f"median detection latency {latencies[len(latencies) // 2] * 1000:.0f} ms")
+    if expected is not None:
+        found = sum(any(abs(word_end - end) < 0.15 for word_end, _, _ in detections) for end in expected)
+        false_alarms = len(detections) - found
+        print(f"\nSynthetic test: {found}/{len(expected)} wake words detected, {false_alarms} false alarms")
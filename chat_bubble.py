@@ -92,6 +92,14 @@ class ChatBubble(QtWidgets.QWidget):
         
         # Don't set a fixed maximum width - we'll handle this in resizeEvent
         
+    def append_text(self, text):
+        """Append streamed text to the bubble and let the layout re-measure it"""
+        self.message += text.replace('\n', '<br>')
+        self.text_label.setText(self.message)
+        self.update_bubble_width()
+        self.bubble.adjustSize()
+        self.updateGeometry()
+
     def sizeHint(self):
         # Return the size hint from the bubble
         return self.bubble.sizeHint()
@@ -99,7 +107,9 @@ class ChatBubble(QtWidgets.QWidget):
     def resizeEvent(self, event):
         # Handle resize events safely without touching text cursors
         super().resizeEvent(event)
-        
+        self.update_bubble_width()
+
+    def update_bubble_width(self):
         # Calculate maximum bubble width based on parent widget width
         if self.parent():
             parent_width = self.parent().width()
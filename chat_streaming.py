@@ -0,0 +1,101 @@
+"""
+Helpers for streaming chat completions into the GUI.
+Token deltas are coalesced into frames so the Qt event loop receives a few
+updates per second instead of one cross-thread call per token.
+"""
+import time
+import threading
+from typing import Callable, Optional
+
+
+class DeltaBatcher:
+    """
+    Collects streamed text deltas and flushes them to a callback at most once per frame.
+    Text held back inside a frame is sent by a trailing timer, so it does not wait for the
+    next delta when the stream pauses.
+    """
+    def __init__(self, flush_callback: Callable[[str], None], frame_interval: float = 0.05):
+        self.flush_callback = flush_callback
+        self.frame_interval = frame_interval
+        self.pending = []
+        self.last_flush = 0.0
+        self.batches_sent = 0
+        self.timer: Optional[threading.Timer] = None
+        self.lock = threading.Lock()
+
+    def add(self, delta: str):
+        """Queue a delta; flush now if the current frame has elapsed, else at the end of the frame"""
+        if not delta:
+            return
+        with self.lock:
+            self.pending.append(delta)
+            remaining = self.frame_interval - (time.perf_counter() - self.last_flush)
+            if remaining > 0:
+                if self.timer is None:
+                    self.timer = threading.Timer(remaining, self.flush)
+                    self.timer.daemon = True
+                    self.timer.start()
+                return
+            self._send()
+
+    def flush(self):
+        """Send whatever is still pending (called by the trailing timer and once the stream ends)"""
+        with self.lock:
+            if self.pending:
+                self._send()
+
+    def _send(self):
+        # Called with the lock held, so the timer and the stream thread deliver batches in order
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch = "".join(self.pending)
+        self.pending = []
+        self.last_flush = time.perf_counter()
+        self.batches_sent += 1
+        self.flush_callback(batch)
+
+
+def consume_chat_stream(stream, batcher: DeltaBatcher, started_at: Optional[float] = None):
+    """
+    Read an OpenAI chat completion stream and push content deltas through the batcher.
+
+    Args:
+        stream: Iterable of chat completion chunks (client.chat.completions.create(stream=True))
+        batcher: DeltaBatcher that forwards coalesced text to the GUI
+        started_at: perf_counter() value taken just before the request was sent
+
+    Returns:
+        tuple: (full_text, stats) where stats contains time-to-first-token and totals in seconds
+    """
+    if started_at is None:
+        started_at = time.perf_counter()
+
+    parts = []
+    chunk_count = 0
+    first_token_at = None
+
+    try:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            content = chunk.choices[0].delta.content
+            if not content:
+                continue
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+            chunk_count += 1
+            parts.append(content)
+            batcher.add(content)
+    finally:
+        # Text received before a stream error is still shown
+        batcher.flush()
+    finished_at = time.perf_counter()
+
+    stats = {
+        "ttft": (first_token_at - started_at) if first_token_at is not None else None,
+        "total": finished_at - started_at,
+        "chunks": chunk_count,
+        "batches": batcher.batches_sent,
+    }
+    return "".join(parts), stats
@@ -0,0 +1,168 @@
+"""
+Executor service for PAUTReader commands.
+Commands run on a bounded worker pool; every submitted command gets a Future right away.
+A command only waits for the commands it explicitly depends on, and completion callbacks
+can be dispatched onto another thread (the Qt GUI thread) instead of the worker.
+"""
+import threading
+import contextvars
+from concurrent.futures import Future, InvalidStateError, ThreadPoolExecutor
+from typing import Callable, Iterable, Optional
+
+import tracing
+from command_process import cancel_folder_analysis, execute_command_batch, execute_command_gui
+
+
+class DependencyFailed(Exception):
+    """Raised on a command whose prerequisite command failed or was cancelled"""
+    def __init__(self, command: str, dependency: str):
+        super().__init__(f"'{command}' was not run because '{dependency}' did not succeed")
+        self.command = command
+        self.dependency = dependency
+
+
+def gui_result_failed(result) -> bool:
+    """Failure check for the (status message, response) tuples of execute_command_gui"""
+    status_message = result[0] if isinstance(result, tuple) else ""
+    return status_message.startswith(("Failed", "Unknown command"))
+
+
+class CommandExecutor:
+    """
+    Bounded pool executing commands with per-command futures.
+
+    Args:
+        execute: Function called as execute(command, *args) on a worker thread
+        execute_batch: Function called as execute_batch(steps) for submit_batch
+        on_shutdown: Called by shutdown() to stop work that runs inside a command (sharded folder analysis)
+        max_workers: Maximum number of commands running at the same time
+        dispatch: Function called as dispatch(callback, future) to run completion callbacks
+                  on the right thread; by default callbacks run on the worker that finished
+        is_failure: Predicate on a result; dependants of a failed command are not run
+    """
+    def __init__(self, execute: Callable = execute_command_gui, max_workers: int = 3,
+                 dispatch: Optional[Callable] = None, is_failure: Optional[Callable] = gui_result_failed,
+                 execute_batch: Callable = execute_command_batch,
+                 on_shutdown: Optional[Callable] = cancel_folder_analysis):
+        self.execute = execute
+        self.execute_batch = execute_batch
+        self.on_shutdown = on_shutdown
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="command")
+        self.dispatch = dispatch or (lambda callback, future: callback(future))
+        self.is_failure = is_failure
+        self.lock = threading.Lock()
+        self.waiting = set()  # futures whose dependencies have not finished yet
+        self.closed = False
+
+    def submit(self, command: str, args: Iterable = (), depends_on: Iterable[Future] = (),
+               on_done: Optional[Callable[[Future], None]] = None, **options) -> Future:
+        """
+        Enqueue a command
+
+        Args:
+            command: Command name (key of COMMAND_ENDPOINTS)
+            args: Arguments for the command
+            depends_on: Futures of commands that must succeed before this one starts
+            on_done: Callback receiving the finished future (dispatched via self.dispatch)
+            **options: Keyword arguments for execute (e.g. rerun=True)
+
+        Returns:
+            Future resolving to the result of execute(command, *args, **options)
+        """
+        return self._submit(command, lambda: self.execute(command, *args, **options), depends_on, on_done)
+
+    def submit_batch(self, steps: list, depends_on: Iterable[Future] = (),
+                     on_done: Optional[Callable[[Future], None]] = None, **options) -> Future:
+        """
+        Enqueue an ordered list of commands that PAUTReader runs as one batch (one pool job)
+
+        Args:
+            steps: List of (command, args) tuples
+            **options: Keyword arguments for execute_batch (e.g. rerun=True, progress=...)
+
+        Returns:
+            Future resolving to the step results of execute_batch(steps, **options)
+        """
+        steps = list(steps)
+        return self._submit("batch", lambda: self.execute_batch(steps, **options), depends_on, on_done)
+
+    def _submit(self, command: str, call: Callable, depends_on: Iterable[Future],
+                on_done: Optional[Callable[[Future], None]]) -> Future:
+        future = Future()
+        future.command = command
+        # Run the command in the submitter's trace, which stays open until the command is done
+        context = contextvars.copy_context()
+        future.add_done_callback(tracing.hold())
+        if on_done is not None:
+            future.add_done_callback(lambda finished: self.dispatch(on_done, finished))
+
+        dependencies = [dependency for dependency in depends_on if dependency is not None]
+        with self.lock:
+            if self.closed:
+                raise RuntimeError("Command executor is shut down")
+            if not dependencies:
+                self._start(future, call, context)
+                return future
+            self.waiting.add(future)
+
+        remaining = [len(dependencies)]
+        remaining_lock = threading.Lock()
+
+        def dependency_done(_):
+            with remaining_lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            with self.lock:
+                self.waiting.discard(future)
+                if future.cancelled():
+                    return
+                failed = next((dependency for dependency in dependencies
+                               if not self._succeeded(dependency)), None)
+                if failed is None and not self.closed:
+                    self._start(future, call, context)
+                    return
+            # Resolve outside the lock: done callbacks run synchronously, and those of this
+            # future include the dependency_done of its own dependants, which take the lock
+            try:
+                if failed is not None:
+                    future.set_exception(DependencyFailed(command, getattr(failed, "command", "?")))
+                else:
+                    future.cancel()
+            except InvalidStateError:
+                pass  # cancelled by the caller in the meantime
+
+        for dependency in dependencies:
+            dependency.add_done_callback(dependency_done)
+        return future
+
+    def _succeeded(self, future: Future) -> bool:
+        if future.cancelled() or future.exception() is not None:
+            return False
+        return not (self.is_failure and self.is_failure(future.result()))
+
+    def _start(self, future: Future, call: Callable, context: contextvars.Context):
+        def run():
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                future.set_result(call())
+            except BaseException as e:
+                future.set_exception(e)
+
+        # Never resolves the future here (submit and dependency_done call this under the
+        # lock); if the pool drops the job on shutdown, the future is cancelled from there
+        job = self.pool.submit(context.run, run)
+        job.add_done_callback(lambda job: job.cancelled() and future.cancel())
+
+    def shutdown(self, wait: bool = False):
+        """Cancel commands still waiting on dependencies, stop running folder analyses and the pool"""
+        with self.lock:
+            self.closed = True
+            waiting = list(self.waiting)
+            self.waiting.clear()
+        for future in waiting:
+            future.cancel()
+        if self.on_shutdown is not None:
+            self.on_shutdown()
+        self.pool.shutdown(wait=wait, cancel_futures=True)
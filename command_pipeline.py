@@ -0,0 +1,136 @@
+"""
+Dependency-aware scheduling of multi-command requests.
+Each command in COMMAND_ENDPOINTS declares the application state it requires and provides.
+A command only waits for the earlier commands that change state it uses (e.g. startDefectDetection
+waits for loadData); everything else starts at once. The GUI keeps one pipeline for the whole
+session, so a command also waits for a still running command of an earlier message.
+"""
+import threading
+from concurrent.futures import Future
+from typing import Callable, Iterable, List, Optional
+
+from command_process import COMMAND_ENDPOINTS
+
+
+class CommandPipeline:
+    """
+    Builds the dependency graph of the submitted commands while they are added.
+
+    Ordering rules against earlier commands:
+      - a command waits for the last earlier command that provides a state it requires
+      - a command that changes a state waits for the last earlier command providing it and
+        for the earlier commands that still read the previous value of that state
+
+    Args:
+        executor: CommandExecutor running the commands
+        endpoints: Command table with "requires"/"provides" entries
+    """
+    def __init__(self, executor, endpoints: dict = COMMAND_ENDPOINTS):
+        self.executor = executor
+        self.endpoints = endpoints
+        self.steps: List[dict] = []
+        self.lock = threading.Lock()
+
+    def start_request(self):
+        """
+        Forget the commands of earlier requests that have finished: they impose no order any
+        more, and a failed one must not block the commands of a new request
+        """
+        with self.lock:
+            self.steps = [step for step in self.steps if not step["future"].done()]
+
+    def _state(self, command: str, key: str) -> tuple:
+        return tuple(self.endpoints.get(command, {}).get(key, ()))
+
+    def dependencies_for(self, command: str) -> List[int]:
+        """Indices of the already added steps the command has to wait for"""
+        requires = self._state(command, "requires")
+        provides = self._state(command, "provides")
+        dependencies = set()
+        for state in requires + provides:
+            for index in range(len(self.steps) - 1, -1, -1):
+                if state in self.steps[index]["provides"]:
+                    dependencies.add(index)
+                    break
+        for state in provides:
+            for index in range(len(self.steps) - 1, -1, -1):
+                step = self.steps[index]
+                if state in step["provides"]:
+                    break
+                if state in step["requires"]:
+                    dependencies.add(index)
+        return sorted(dependencies)
+
+    def add(self, command: str, args: Iterable = (),
+            on_done: Optional[Callable[[Future], None]] = None, **options) -> Future:
+        """
+        Schedule a command; it starts as soon as the commands it depends on have succeeded
+
+        Returns:
+            Future of the command
+        """
+        with self.lock:
+            dependencies = self.dependencies_for(command)
+            future = self.executor.submit(command, args,
+                                          depends_on=[self.steps[index]["future"] for index in dependencies],
+                                          on_done=on_done, **options)
+            self.steps.append(self._step(command, dependencies, future))
+        waits_for = self.steps[-1]["waits_for"]
+        print(f"Scheduled {command}" + (f" after {', '.join(waits_for)}" if waits_for else " immediately"))
+        return future
+
+    def add_batch(self, steps: list, on_done: Optional[Callable[[Future], None]] = None, **options) -> Future:
+        """
+        Schedule (command, args) steps that PAUTReader runs as one batch; the batch starts once
+        the earlier commands any of its steps depends on have succeeded
+
+        Returns:
+            Future of the batch
+        """
+        with self.lock:
+            first = len(self.steps)
+            dependencies = set()
+            for command, _ in steps:
+                dependencies.update(index for index in self.dependencies_for(command) if index < first)
+                self.steps.append(self._step(command, []))
+            try:
+                future = self.executor.submit_batch(steps,
+                                                    depends_on=[self.steps[index]["future"]
+                                                                for index in sorted(dependencies)],
+                                                    on_done=on_done, **options)
+            except Exception:
+                del self.steps[first:]
+                raise
+            for step in self.steps[first:]:
+                step["future"] = future
+        return future
+
+    def _step(self, command: str, dependencies: List[int], future: Optional[Future] = None) -> dict:
+        return {
+            "command": command,
+            "requires": self._state(command, "requires"),
+            "provides": self._state(command, "provides"),
+            "waits_for": [self.steps[index]["command"] for index in dependencies],
+            "future": future,
+        }
+
+    def sequential(self, commands: Iterable[str]) -> bool:
+        """
+        True if every command would wait for the one before it, so nothing could run in
+        parallel (such a request loses nothing when it is sent to PAUTReader as one batch)
+        """
+        planner = CommandPipeline(None, self.endpoints)
+        for index, command in enumerate(commands):
+            dependencies = planner.dependencies_for(command)
+            if index and index - 1 not in dependencies:
+                return False
+            planner.steps.append(planner._step(command, dependencies))
+        return True
+
+    @property
+    def futures(self) -> List[Future]:
+        return [step["future"] for step in self.steps]
+
+    def describe(self) -> List[tuple]:
+        """(command, [commands it waits for]) for every step, in the order they were added"""
+        return [(step["command"], step["waits_for"]) for step in self.steps]
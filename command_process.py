@@ -1,4 +1,16 @@
+import os
+import json
+import time
+import threading
+
 import requests
+from http_session import SessionPool, DEFAULT_TIMEOUT
+from app_state import app_state
+from analysis_cache import ANALYSIS_COMMANDS, analysis_cache
+from folder_manifest import analyse_folder_incremental
+from folder_analysis_driver import FolderAnalysisDriver, format_summary, format_progress
+from metrics import registry, SIZE_BUCKETS
+from tracing import span
 
 BASE_URL = "http://localhost:5000/api/app"
 # revise all the methods to be corectly defined as POST or GET:
@@ -11,6 +23,11 @@ BASE_URL = "http://localhost:5000/api/app"
 # POST:
 # Use for sending data to the server to initiate actions or modify state.
 # Parameters are included in the body, ensuring flexibility and better security for sensitive data.
+#
+# "timeout" is the (connect, read) timeout in seconds; read timeouts follow how long the
+# operation can take in PAUTReader (loading a large .fpd, AI defect detection, folder reports).
+# "requires"/"provides" name the application state a command reads or changes
+# ("directory", "file_loaded", "plot", "analysis"); command_pipeline.py orders commands with them.
 
 
 COMMAND_ENDPOINTS = {
@@ -18,22 +35,33 @@ COMMAND_ENDPOINTS = {
         "endpoint": f"{BASE_URL}/loadData",
         "method": "POST",
         "payload": lambda file_path: {"FilePath": file_path},
+        "timeout": (3.05, 180),
+        "requires": ("directory",),
+        "provides": ("file_loaded",),
     },
     "updatePlot": {
         "endpoint": f"{BASE_URL}/updatePlot",
         "method": "POST",
         "payload": lambda: {},
+        "timeout": (3.05, 30),
+        "requires": ("file_loaded",),
+        "provides": ("plot",),
     },
     "getFileInformation": {
         "endpoint": f"{BASE_URL}/getFileInformation",
         "method": "POST",
         "payload": lambda: {},
+        "timeout": (3.05, 15),
+        "requires": ("file_loaded",),
+        "provides": (),
     },
     "getDirectory": {
         "endpoint": f"{BASE_URL}/getDirectory?folderName=Documents",
         "method": "GET",
         "payload": lambda: {},
-
+        "timeout": (3.05, 10),
+        "requires": ("directory",),
+        "provides": (),
     },
     "setNewDirectory": {
         "endpoint": f"{BASE_URL}/setNewDirectory",
@@ -43,26 +71,44 @@ COMMAND_ENDPOINTS = {
             "isrootPathForSearchIsCurrentDir": is_root_path,
             "rootPathForFolderSearch": root_path,
         },
+        "timeout": (3.05, 30),
+        "requires": (),
+        "provides": ("directory",),
     },
     "doAnalysisSNR": {
         "endpoint": f"{BASE_URL}/startSNRAnalysis",
         "method": "POST",
         "payload": lambda: {},
+        "timeout": (3.05, 120),
+        "requires": ("file_loaded",),
+        "provides": ("analysis",),
     },
     "startDefectDetection": {
         "endpoint": f"{BASE_URL}/startDefectDetection",
         "method": "POST",
         "payload": lambda: {},
+        "timeout": (3.05, 600),
+        "requires": ("file_loaded",),
+        "provides": ("analysis",),
     },
     "makeSingleFileOnly": {
         "endpoint": f"{BASE_URL}/makeSingleFileOnly",
         "method": "POST",
         "payload": lambda: {},
+        "timeout": (3.05, 600),
+        "requires": ("file_loaded", "analysis"),
+        "provides": (),
     },
     "doFolderAnalysis": {
         "endpoint": f"{BASE_URL}/doFolderAnalysis",
         "method": "POST",
-        "payload": lambda folder_path: {"Folder": folder_path},
+        # "Files" limits the analysis to the listed file names; an empty list only rebuilds the
+        # folder report (see folder_manifest.py)
+        "payload": lambda folder_path, files=None: {"Folder": folder_path} if files is None
+        else {"Folder": folder_path, "Files": files},
+        "timeout": (3.05, 7200),
+        "requires": ("directory",),
+        "provides": (),
     },
 }
 # "payload": lambda: {},  # get methods should not contain it
@@ -73,19 +119,112 @@ COMMAND_ENDPOINTS = {
 },'''
 
 
+# API roots of PAUTReader worker instances for sharded folder analysis (folder_analysis_driver.py),
+# e.g. PAUT_FOLDER_INSTANCES="http://localhost:5000/api/app,http://localhost:5001/api/app".
+# Empty: doFolderAnalysis is sent to the main instance as one (incremental) request, so
+# PAUTReader still writes its own folder report.
+FOLDER_ANALYSIS_INSTANCES = [url.strip() for url in os.environ.get("PAUT_FOLDER_INSTANCES", "").split(",")
+                             if url.strip()]
+
+# Keep-alive sessions shared by all command calls; set POOLING_ENABLED = False to open a
+# new connection per request (used by benchmark_command_pool.py for comparison)
+session_pool = SessionPool()
+POOLING_ENABLED = True
+
+
+# Telemetry for every PAUTReader call, exposed on /metrics (see metrics.py)
+command_duration = registry.histogram("paut_command_duration_seconds",
+                                      "PAUTReader command latency", ("command",))
+command_request_bytes = registry.histogram("paut_command_request_bytes",
+                                           "Size of the JSON payload sent", ("command",), SIZE_BUCKETS)
+command_response_bytes = registry.histogram("paut_command_response_bytes",
+                                            "Size of the response body", ("command",), SIZE_BUCKETS)
+command_responses = registry.counter("paut_command_responses_total",
+                                     "Responses by status code ('error' when no response arrived)",
+                                     ("command", "status"))
+command_retries = registry.counter("paut_command_retries_total",
+                                   "Retries made by the HTTP adapter", ("command",))
+
+
+def instrumented_request(command_name, method, url, timeout, payload, **kwargs):
+    """Send one HTTP request to PAUTReader and record its telemetry"""
+    command_request_bytes.observe(len(json.dumps(payload)), command=command_name)
+    started = time.perf_counter()
+    try:
+        with span("http_request", command=command_name, method=method):
+            if POOLING_ENABLED:
+                response = session_pool.request(method, url, timeout=timeout, **kwargs)
+            else:
+                response = requests.request(method, url, timeout=timeout, **kwargs)
+    except requests.RequestException:
+        command_duration.observe(time.perf_counter() - started, command=command_name)
+        command_responses.inc(command=command_name, status="error")
+        raise
+    command_duration.observe(time.perf_counter() - started, command=command_name)
+    command_responses.inc(command=command_name, status=response.status_code)
+    command_response_bytes.observe(len(response.content), command=command_name)
+    retries = getattr(getattr(response.raw, "retries", None), "history", ())
+    if retries:
+        command_retries.inc(len(retries), command=command_name)
+    return response
+
+
+def telemetry_summary():
+    """One line per command with call count, error rate and p50/p95 latency bucket"""
+    lines = []
+    with command_duration.lock:
+        calls = {key[0]: series["count"] for key, series in command_duration.series.items()}
+    with command_responses.lock:
+        responses = dict(command_responses.values)
+    for command_name, count in sorted(calls.items()):
+        failed = sum(value for (command, status), value in responses.items()
+                     if command == command_name and status != "200")
+        lines.append(f"  {command_name:<22} calls {count:>5}  errors {failed / count:6.1%}  "
+                     f"p50 <= {command_duration.quantile(0.5, command=command_name):g}s  "
+                     f"p95 <= {command_duration.quantile(0.95, command=command_name):g}s")
+    if not lines:
+        return ""
+    return "PAUTReader command telemetry:\n" + "\n".join(lines)
+
+
+def endpoint_url(command_info, base_url=None):
+    """Endpoint of a command, optionally pointed at another PAUTReader instance"""
+    if base_url is None:
+        return command_info["endpoint"]
+    return base_url.rstrip("/") + command_info["endpoint"][len(BASE_URL):]
+
+
+def send_command(command_name, *args, base_url=None):
+    """
+    Send one command to the PAUTReader API
+
+    Args:
+        command_name: Key of COMMAND_ENDPOINTS
+        *args: Arguments for the command payload
+        base_url: Optional API root of another PAUTReader instance (defaults to BASE_URL)
+
+    Returns:
+        requests.Response
+    """
+    command_info = COMMAND_ENDPOINTS[command_name]
+    endpoint = endpoint_url(command_info, base_url)
+    method = command_info["method"]
+    payload = command_info["payload"](*args)
+    timeout = command_info.get("timeout", DEFAULT_TIMEOUT)
+
+    if method == "POST":
+        kwargs = {"json": payload}
+    elif method == "GET":
+        kwargs = {"params": payload}
+    else:
+        raise ValueError("Unsupported HTTP method")
+
+    return instrumented_request(command_name, method, endpoint, timeout, payload, **kwargs)
+
+
 def execute_command(command_name, *args):
     if command_name in COMMAND_ENDPOINTS:
-        command_info = COMMAND_ENDPOINTS[command_name]
-        endpoint = command_info["endpoint"]
-        method = command_info["method"]
-        payload = command_info["payload"](*args)
-
-        if method == "POST":
-            response = requests.post(endpoint, json=payload)
-        elif method == "GET":
-            response = requests.get(endpoint, params=payload)
-        else:
-            raise ValueError("Unsupported HTTP method")
+        response = send_command(command_name, *args)
 
         if response.status_code == 200:
             print(f"Command '{command_name}' executed successfully.")
@@ -98,21 +237,163 @@ def execute_command(command_name, *args):
         print(f"Unknown command '{command_name}'")
 
 
-def execute_command_gui(command_name, *args):
+def response_message(json_response):
+    """Convert a JSON response of the PAUTReader API to a display string"""
+    if isinstance(json_response, dict):
+        if "FolderName" in json_response:
+            return f"Current directory: {json_response['FolderName']}"
+        if "Message" in json_response:
+            return json_response["Message"]
+    return str(json_response)
+
+
+# Commands whose result PAUTReader also shows in its own window (file information panel, SNR
+# window, defect overlay on the C-scan). A skipped command does not update that view, so the
+# reply says where its text comes from.
+DISPLAY_COMMANDS = ("getFileInformation", "doAnalysisSNR", "startDefectDetection")
+STORED_RESULT_NOTE = ("\n(Result of an earlier run; PAUTReader's view was not updated. "
+                      "Ask to run it again to show it there.)")
+
+
+def analysis_keys(commands):
+    """
+    Analysis store key of every command for the file it runs on (None if not stored).
+    Taken before the commands are sent, so a result is stored under the file the command ran
+    on even if another loadData finishes while it runs; a loadData in the list changes the
+    file for the commands after it.
+    """
+    loaded_file = app_state.current_file()
+    keys = []
+    for command_name, args in commands:
+        if command_name == "loadData":
+            loaded_file = args[0] if args else None
+        stored = command_name in ANALYSIS_COMMANDS and loaded_file
+        keys.append(analysis_cache.key(command_name, loaded_file) if stored else None)
+    return keys
+
+
+def cached_command_response(command_name, args, cache_key=None):
+    """
+    Response of a command that does not need to be sent: the application state mirror knows
+    it is already done, or the analysis was already run on the same file content
+    (cache_key: see analysis_keys)
+    """
+    cached_msg = app_state.cached_response(command_name, args)
+    if cached_msg is None and cache_key:
+        cached_msg = analysis_cache.get(command_name, None, key=cache_key)
+    if cached_msg is not None and command_name in DISPLAY_COMMANDS:
+        cached_msg += STORED_RESULT_NOTE
+    return cached_msg
+
+
+def remember_response(command_name, args, success, json_response=None, response_msg="", cache_key=None):
+    """Update the state mirror and the analysis store from a command response (cache_key: see analysis_keys)"""
+    app_state.record(command_name, args, success, json_response, response_msg)
+    if success and cache_key:
+        analysis_cache.store(command_name, None, response_msg, key=cache_key)
+
+
+def _send_folder_analysis(folder, files):
+    response = send_command("doFolderAnalysis", folder, files)
+    if response.status_code != 200:
+        print(f"Failed to execute command 'doFolderAnalysis'. Status code:", response.status_code)
+        return False, response.text
+    return True, response.json()
+
+
+def is_local_folder_analysis(command_name, args, base_url=None):
+    """doFolderAnalysis of a folder on this machine, sent to the main PAUTReader instance"""
+    return command_name == "doFolderAnalysis" and base_url is None and bool(args) and os.path.isdir(args[0])
+
+
+def run_folder_analysis(folder, rerun=False, progress=None):
+    """
+    Analyse a local folder: sharded over FOLDER_ANALYSIS_INSTANCES when configured, otherwise
+    one incremental doFolderAnalysis request (only new or modified files are sent)
+
+    Returns:
+        tuple: (success, message)
+    """
+    if FOLDER_ANALYSIS_INSTANCES:
+        return execute_folder_analysis_sharded(folder, rerun, progress)
+    return analyse_folder_incremental(folder, _send_folder_analysis, rerun=rerun)
+
+
+_running_drivers = set()
+_running_drivers_lock = threading.Lock()
+
+
+def cancel_folder_analysis():
+    """Stop the running sharded folder analyses (files already sent still finish)"""
+    with _running_drivers_lock:
+        drivers = list(_running_drivers)
+    for driver in drivers:
+        driver.cancel()
+
+
+def execute_folder_analysis_sharded(folder, rerun=False, progress=None):
+    """
+    Analyse a local folder file by file on the FOLDER_ANALYSIS_INSTANCES
+
+    Args:
+        folder: Local inspection folder
+        rerun: Analyse unchanged files again
+        progress: Optional callback receiving a progress line after every file
+
+    Returns:
+        tuple: (success, summary message)
+    """
+    driver = FolderAnalysisDriver(send_command, FOLDER_ANALYSIS_INSTANCES)
+    on_file = (lambda event: progress(format_progress(event))) if progress else None
+    with _running_drivers_lock:
+        _running_drivers.add(driver)
+    try:
+        summary = driver.run(folder, rerun=rerun, progress=on_file)
+    finally:
+        with _running_drivers_lock:
+            _running_drivers.discard(driver)
+    if BASE_URL in FOLDER_ANALYSIS_INSTANCES:
+        # The main instance now has some other file loaded
+        app_state.invalidate()
+    return not summary["failed"] or bool(summary["analysed"]), format_summary(folder, summary)
+
+
+def execute_command_gui(command_name, *args, rerun=False, progress=None):
+    """
+    Execute a command and build the chat messages for it (traced as one span)
+
+    Args:
+        command_name: Key of COMMAND_ENDPOINTS
+        *args: Arguments for the command payload
+        rerun: Send the command even if it was already done (ignore mirror and analysis store)
+        progress: Optional callback for progress lines of long commands (sharded folder analysis)
+
+    Returns:
+        tuple: (status message, response message)
+    """
+    with span("execute_command_gui", command=command_name):
+        return _execute_command_gui(command_name, *args, rerun=rerun, progress=progress)
+
+
+def _execute_command_gui(command_name, *args, rerun=False, progress=None):
     fail_success_msg = ""
     response_msg = ""
     if command_name in COMMAND_ENDPOINTS:
-        command_info = COMMAND_ENDPOINTS[command_name]
-        endpoint = command_info["endpoint"]
-        method = command_info["method"]
-        payload = command_info["payload"](*args)
-
-        if method == "POST":
-            response = requests.post(endpoint, json=payload)
-        elif method == "GET":
-            response = requests.get(endpoint, params=payload)
-        else:
-            raise ValueError("Unsupported HTTP method")
+        # Skip commands that would not change anything in PAUTReader (file already loaded, analysis done)
+        cache_key = analysis_keys([(command_name, args)])[0]
+        cached_msg = None if rerun else cached_command_response(command_name, args, cache_key)
+        if cached_msg is not None:
+            print(f"Command '{command_name}' skipped, answered from the state mirror / analysis store.")
+            return f"Command '{command_name}' skipped: already done.", cached_msg
+
+        # Folders on this machine are analysed incrementally: only new or modified files are sent
+        if is_local_folder_analysis(command_name, args):
+            success, response_msg = run_folder_analysis(args[0], rerun, progress)
+            if success:
+                return f"Command '{command_name}' executed successfully.", response_msg
+            return f"Failed to execute command '{command_name}'.", response_msg
+
+        response = send_command(command_name, *args)
 
         if response.status_code == 200:
             print(f"Command '{command_name}' executed successfully.")
@@ -121,19 +402,13 @@ def execute_command_gui(command_name, *args):
             fail_success_msg = f"Command '{command_name}' executed successfully."
             
             # Convert JSON response to string for display
-            if isinstance(json_response, dict):
-                if "FolderName" in json_response:
-                    response_msg = f"Current directory: {json_response['FolderName']}"
-                elif "Message" in json_response:
-                    response_msg = json_response["Message"]
-                else:
-                    response_msg = str(json_response)
-            else:
-                response_msg = str(json_response)
+            response_msg = response_message(json_response)
+            remember_response(command_name, args, True, json_response, response_msg, cache_key)
 
         else:
             print(f"Failed to execute command '{command_name}'. Status code:", response.status_code)
             print("Response:", response.text)
+            remember_response(command_name, args, False)
             fail_success_msg = f"Failed to execute command '{command_name}'. Status code: {response.status_code}"
             response_msg = f"Failed to execute instruction.\n"  # response.text
             if response.status_code == 403:
@@ -144,3 +419,149 @@ def execute_command_gui(command_name, *args):
         fail_success_msg = f"Unknown command '{command_name}'"
 
     return fail_success_msg, response_msg
+
+
+#  ______________________ Batch dispatch ______________________
+# One POST to {BASE_URL}/batch runs an ordered list of commands inside PAUTReader:
+#   {"Commands": [{"Endpoint": "loadData", "Method": "POST", "Payload": {...}}, ...], "StopOnError": true}
+# and answers {"Results": [{"Endpoint": ..., "StatusCode": 200, "Body": {...}}, ...]}.
+# Older PAUTReader builds answer 404/405; batch_supported remembers that per API root.
+BATCH_TIMEOUT = (3.05, 7200)
+batch_supported = {}
+
+
+def step_result(command_name, status_code, body=None, error="", elapsed=0.0, cached_message=None):
+    """Structured result of one command (shared by batch and individual dispatch)"""
+    success = status_code == 200 and not error
+    if cached_message is not None:
+        message = cached_message
+    elif success:
+        message = response_message(body)
+    elif error:
+        message = error
+    else:
+        message = "Failed to execute instruction.\n"
+        if status_code == 403:
+            message += "Access to the requested resource is forbidden."
+    return {
+        "command": command_name,
+        "success": success,
+        "status_code": status_code,
+        "message": message,
+        "response": body,
+        "elapsed": elapsed,
+        "cached": cached_message is not None,
+    }
+
+
+def _cached_steps(commands, keys, rerun=False):
+    """
+    Results for the leading commands that are already done (see cached_command_response).
+    Once a command has to be sent, the rest is sent too since it may depend on the new state.
+    """
+    results = []
+    if rerun:
+        return results
+    for (command_name, args), cache_key in zip(commands, keys):
+        cached_message = cached_command_response(command_name, args, cache_key)
+        if cached_message is None:
+            break
+        results.append(step_result(command_name, 200, cached_message=cached_message))
+    return results
+
+
+def _execute_steps_individually(commands, base_url=None, stop_on_error=True, rerun=False, progress=None):
+    keys = analysis_keys(commands)
+    results = _cached_steps(commands, keys, rerun)
+    for (command_name, args), cache_key in list(zip(commands, keys))[len(results):]:
+        started = time.perf_counter()
+        if command_name not in COMMAND_ENDPOINTS:
+            results.append(step_result(command_name, 0, error=f"Unknown command '{command_name}'"))
+        elif is_local_folder_analysis(command_name, args, base_url):
+            success, message = run_folder_analysis(args[0], rerun, progress)
+            results.append(step_result(command_name, 200 if success else 0, {"Message": message},
+                                       error="" if success else message, elapsed=time.perf_counter() - started))
+        else:
+            try:
+                response = send_command(command_name, *args, base_url=base_url)
+                body = response.json() if response.status_code == 200 else response.text
+                results.append(step_result(command_name, response.status_code, body,
+                                           elapsed=time.perf_counter() - started))
+                remember_response(command_name, args, results[-1]["success"], body, results[-1]["message"],
+                                  cache_key)
+            except requests.RequestException as e:
+                results.append(step_result(command_name, 0, error=f"Error executing command: {e}",
+                                           elapsed=time.perf_counter() - started))
+        if stop_on_error and not results[-1]["success"]:
+            break
+    return results
+
+
+def execute_command_batch(commands, base_url=None, stop_on_error=True, rerun=False, progress=None):
+    """
+    Run an ordered list of commands, in one request when PAUTReader supports batches
+
+    Args:
+        commands: List of (command_name, args) tuples
+        base_url: Optional API root of another PAUTReader instance (defaults to BASE_URL)
+        stop_on_error: Do not run the remaining commands after a failed one
+        rerun: Send every command even if it was already done
+        progress: Optional callback for progress lines of long commands (folder analysis)
+
+    Returns:
+        list: step_result dicts, one per executed command, in order. If PAUTReader rejects the
+        whole batch, the last entry is a result for the command name "batch" instead.
+    """
+    root = (base_url or BASE_URL).rstrip("/")
+    unknown = [command_name for command_name, _ in commands if command_name not in COMMAND_ENDPOINTS]
+    # Local folders go through run_folder_analysis (incremental or sharded, with progress)
+    local_folder = any(is_local_folder_analysis(command_name, args, base_url) for command_name, args in commands)
+    if unknown or local_folder or batch_supported.get(root) is False:
+        return _execute_steps_individually(commands, base_url, stop_on_error, rerun, progress)
+
+    keys = analysis_keys(commands)
+    cached = _cached_steps(commands, keys, rerun)
+    commands, keys = commands[len(cached):], keys[len(cached):]
+    if len(commands) < 2:
+        return cached + _execute_steps_individually(commands, base_url, stop_on_error, rerun, progress)
+
+    steps = []
+    for command_name, args in commands:
+        command_info = COMMAND_ENDPOINTS[command_name]
+        steps.append({
+            "Endpoint": command_info["endpoint"][len(BASE_URL) + 1:],
+            "Method": command_info["method"],
+            "Payload": command_info["payload"](*args),
+        })
+
+    started = time.perf_counter()
+    try:
+        payload = {"Commands": steps, "StopOnError": stop_on_error}
+        response = instrumented_request("batch", "POST", f"{root}/batch", BATCH_TIMEOUT, payload, json=payload)
+    except requests.RequestException as e:
+        print(f"Batch request failed, sending commands one by one: {e}")
+        return cached + _execute_steps_individually(commands, base_url, stop_on_error, rerun, progress)
+
+    if response.status_code in (404, 405):
+        print("PAUTReader has no batch endpoint, sending commands one by one.")
+        batch_supported[root] = False
+        return cached + _execute_steps_individually(commands, base_url, stop_on_error, rerun, progress)
+    batch_supported[root] = True
+
+    elapsed = time.perf_counter() - started
+    if response.status_code != 200:
+        # The batch as a whole was refused; none of its steps has a result of its own
+        print(f"Batch request failed. Status code: {response.status_code}")
+        names = ", ".join(command_name for command_name, _ in commands)
+        return cached + [step_result("batch", response.status_code, response.text, elapsed=elapsed,
+                                     error=f"PAUTReader rejected the batch ({names}). "
+                                           f"Status code: {response.status_code}")]
+
+    results = cached
+    for (command_name, args), cache_key, step in zip(commands, keys, response.json().get("Results", [])):
+        results.append(step_result(command_name, step.get("StatusCode", 0), step.get("Body"),
+                                   error=step.get("Error", ""), elapsed=step.get("Elapsed", 0.0)))
+        remember_response(command_name, args, results[-1]["success"], step.get("Body"), results[-1]["message"],
+                          cache_key)
+    print(f"Batch of {len(commands)} commands finished in {elapsed:.3f}s")
+    return results
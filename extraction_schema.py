@@ -0,0 +1,129 @@
+"""
+Schema for the single-call command/argument extraction.
+The same definition drives the OpenAI structured-output request and the local validation
+of its response, so a malformed answer is repaired here instead of triggering more LLM calls.
+"""
+import re
+import json
+from typing import List, Literal
+
+from pydantic import BaseModel, ValidationError, field_validator, model_validator
+
+COMMAND_NAMES = ["loadData", "updatePlot", "getFileInformation", "getDirectory",
+                 "doAnalysisSNR", "startDefectDetection", "setNewDirectory", "makeSingleFileOnly",
+                 "doFolderAnalysis"]
+
+
+class ExtractionResult(BaseModel):
+    """Everything extract_all_information_gpt needs from one user message"""
+    commands: List[str] = []
+    filename: str = ""
+    folder_path: str = ""
+    intent: Literal["execute_commands", "chat"] = "chat"
+
+    @field_validator("commands", mode="before")
+    @classmethod
+    def keep_known_commands(cls, value):
+        # Accept "loadData, updatePlot" as well as a list, and drop names the app does not know
+        if value is None:
+            return []
+        if isinstance(value, str):
+            value = [part.strip() for part in value.split(",")]
+        return [name for name in value if name in COMMAND_NAMES]
+
+    @field_validator("filename", "folder_path", mode="before")
+    @classmethod
+    def empty_if_missing(cls, value):
+        return "" if value is None else str(value).strip()
+
+    @model_validator(mode="after")
+    def intent_matches_commands(self):
+        self.intent = "execute_commands" if self.commands else "chat"
+        return self
+
+
+# Strict JSON schema for response_format (strict mode needs every field required and no extras)
+EXTRACTION_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "command_extraction",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "commands": {"type": "array", "items": {"type": "string", "enum": COMMAND_NAMES}},
+                "filename": {"type": "string"},
+                "folder_path": {"type": "string"},
+                "intent": {"type": "string", "enum": ["execute_commands", "chat"]},
+            },
+            "required": ["commands", "filename", "folder_path", "intent"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+_JSON_STRING = re.compile(r'("(?:[^"\\]|\\.)*")')
+
+
+def _repair_json(text: str) -> str:
+    """Fix the usual ways a model wraps or damages a JSON object"""
+    text = text.strip()
+    # Markdown code fences
+    text = re.sub(r"^```(?:json)?\s*|\s*```$", "", text)
+    # Prose before/after the object
+    start, end = text.find("{"), text.rfind("}")
+    if start != -1 and end > start:
+        text = text[start:end + 1]
+    # // comments copied from the prompt example and trailing commas; string values (URLs,
+    # UNC paths) may contain "//" and ",}" and are left alone
+    text = _strip_comments(text)
+    return "".join(part if part.startswith('"') else re.sub(r",\s*([}\]])", r"\1", part)
+                   for part in _JSON_STRING.split(text))
+
+
+def _strip_comments(text: str) -> str:
+    """Remove // comments that are outside of JSON strings"""
+    result = []
+    in_string = False
+    index = 0
+    while index < len(text):
+        char = text[index]
+        if in_string:
+            if char == "\\":
+                result.append(text[index:index + 2])
+                index += 2
+                continue
+            in_string = char != '"'
+        elif char == '"':
+            in_string = True
+        elif text.startswith("//", index):
+            end = text.find("\n", index)
+            index = len(text) if end == -1 else end
+            continue
+        result.append(char)
+        index += 1
+    return "".join(result)
+
+
+def parse_extraction(text: str) -> ExtractionResult:
+    """
+    Validate a model response against ExtractionResult, repairing it locally if needed.
+
+    Args:
+        text: Raw message content returned by the model
+
+    Returns:
+        ExtractionResult
+
+    Raises:
+        ValueError: If the response cannot be parsed even after repair
+    """
+    try:
+        return ExtractionResult.model_validate_json(text)
+    except ValidationError as first_error:
+        repaired = _repair_json(text)
+        try:
+            return ExtractionResult.model_validate(json.loads(repaired))
+        except (ValidationError, json.JSONDecodeError) as e:
+            raise ValueError(f"Unrepairable extraction response: {e}") from first_error
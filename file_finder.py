@@ -9,6 +9,9 @@ import platform
 import difflib
 from typing import List, Optional, Tuple
 
+from tracing import traced
+
+
 def normalize_filename(filename: str) -> str:
     """
     Normalize a filename for fuzzy matching by:
@@ -130,6 +133,7 @@ def score_filename_match(query: str, filename: str) -> float:
     # Return the highest score
     return max(scores) if scores else 0.0
 
+@traced()
 def find_file_in_system(filename: str, search_path: Optional[str] = None,
                         file_extension: Optional[str] = None, process_callback=None) -> Optional[str]:
     """
@@ -384,11 +388,11 @@ def get_current_directory_from_app():
         The current directory path if successful, None otherwise
     """
     try:
-        import requests
+        from command_process import send_command
 
         print("Requesting current directory from app...")
-        # Call the getDirectory API
-        response = requests.get("http://localhost:5000/api/app/getDirectory?folderName=Documents")
+        # Call the getDirectory API over the pooled keep-alive session
+        response = send_command("getDirectory")
 
         if response.status_code == 200:
             try:
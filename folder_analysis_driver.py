@@ -0,0 +1,170 @@
+"""
+Parallel sharded folder analysis.
+Instead of handing a whole folder to one PAUTReader and waiting for a single response, the
+driver enumerates the .fpd/.opd files and shards them over several PAUTReader instances.
+Every instance gets exactly one worker, which runs loadData followed by the analysis command
+for one file at a time: PAUTReader holds one loaded file per instance, so two sessions on the
+same instance would get each other's results. Per-file completions and throughput are reported
+through a progress callback.
+
+Backpressure: files are fed through a bounded queue, so enumeration of a large network share
+never runs far ahead of the workers.
+"""
+import os
+import time
+import queue
+import threading
+from typing import Callable, List, Optional
+
+from folder_manifest import FolderManifest, MANIFEST_DIR, MAX_LISTED_FILES
+
+
+class FolderAnalysisDriver:
+    """
+    Shards the files of a folder over PAUTReader worker instances.
+
+    Args:
+        send: Function send(command_name, *args, base_url=...) returning a requests.Response
+        base_urls: API roots of the PAUTReader instances to use
+        analysis_command: Command run on every loaded file
+        queue_size: Files enumerated ahead of the workers (default: two per worker)
+    """
+    def __init__(self, send: Callable, base_urls: List[str], analysis_command: str = "startDefectDetection", queue_size: Optional[int] = None):
+        if not base_urls:
+            raise ValueError("At least one PAUTReader instance is required")
+        self.send = send
+        self.base_urls = list(dict.fromkeys(base_urls))  # an instance listed twice still gets one worker
+        self.analysis_command = analysis_command
+        self.workers = len(self.base_urls)
+        self.queue_size = queue_size or 2 * self.workers
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _analyse_file(self, base_url: str, path: str):
+        response = self.send("loadData", path, base_url=base_url)
+        if response.status_code != 200:
+            return False, f"Could not load file (status {response.status_code})"
+        response = self.send(self.analysis_command, base_url=base_url)
+        if response.status_code != 200:
+            return False, f"Analysis failed (status {response.status_code})"
+        body = response.json()
+        return True, body.get("Message", str(body)) if isinstance(body, dict) else str(body)
+
+    def run(self, folder: str, rerun: bool = False, progress: Optional[Callable[[dict], None]] = None,
+            manifest_dir: str = MANIFEST_DIR) -> dict:
+        """
+        Analyse every new or modified data file of a folder
+
+        Args:
+            folder: Local inspection folder
+            rerun: Analyse unchanged files again
+            progress: Called from worker threads after every file with a dict of
+                      file, success, message, done, total, files_per_min, eta
+            manifest_dir: Directory the folder manifests are kept in
+
+        Returns:
+            dict: total, analysed, failed, reused, elapsed, files_per_min, not_analysed (files
+                  left after cancel() or a worker stopped), results (name -> message)
+        """
+        manifest = FolderManifest(folder, manifest_dir)
+        current = manifest.scan()
+        names = sorted(current) if rerun else manifest.changed_files(current)
+        total = len(names)
+        print(f"Sharded folder analysis of {folder}: {total} files over {self.workers} instances")
+
+        files = queue.Queue(maxsize=self.queue_size)
+        results, failures = {}, {}
+        lock = threading.Lock()
+        started = time.perf_counter()
+
+        def put(item) -> bool:
+            """Blocks while the workers are busy; False once cancelled or every worker is gone"""
+            while not self.cancelled.is_set() and any(thread.is_alive() for thread in workers):
+                try:
+                    files.put(item, timeout=0.2)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def producer():
+            for item in names + [None] * self.workers:  # one end marker per worker
+                if not put(item):
+                    return
+
+        def worker(base_url):
+            while not self.cancelled.is_set():
+                try:
+                    name = files.get(timeout=0.2)
+                except queue.Empty:
+                    continue
+                if name is None:
+                    return
+                try:
+                    success, message = self._analyse_file(base_url, os.path.join(manifest.folder, name))
+                except Exception as e:
+                    success, message = False, f"Error: {e}"
+                with lock:
+                    (results if success else failures)[name] = message
+                    done = len(results) + len(failures)
+                elapsed = time.perf_counter() - started
+                rate = done / elapsed * 60 if elapsed > 0 else 0.0
+                if progress is not None:
+                    try:
+                        progress({
+                            "file": name,
+                            "success": success,
+                            "message": message,
+                            "done": done,
+                            "total": total,
+                            "files_per_min": rate,
+                            "eta": (total - done) / rate * 60 if rate else None,
+                        })
+                    except Exception as e:
+                        print(f"Folder analysis progress callback failed: {e}")
+
+        workers = [threading.Thread(target=worker, args=(base_url,), daemon=True) for base_url in self.base_urls]
+        for thread in workers:
+            thread.start()
+        feeder = threading.Thread(target=producer, daemon=True)
+        feeder.start()
+        for thread in workers + [feeder]:
+            thread.join()
+
+        manifest.update(current, results)
+        manifest.save()
+        elapsed = time.perf_counter() - started
+        return {
+            "total": total,
+            "analysed": len(results),
+            "failed": failures,
+            "reused": len(current) - total,
+            "elapsed": elapsed,
+            "files_per_min": len(results) / elapsed * 60 if elapsed > 0 else 0.0,
+            "not_analysed": total - len(results) - len(failures),
+            "results": {name: entry["result"] for name, entry in manifest.files.items()},
+        }
+
+
+def format_summary(folder: str, summary: dict) -> str:
+    """Chat message for a finished sharded folder analysis"""
+    lines = [f"Folder analysis of {folder}: {summary['analysed']} files analysed in {summary['elapsed']:.1f}s "
+             f"({summary['files_per_min']:.1f} files/min), {summary['reused']} unchanged results reused."]
+    if summary["not_analysed"]:
+        lines.append(f"Stopped early: {summary['not_analysed']} files were not analysed.")
+    for name, message in sorted(summary["failed"].items()):
+        lines.append(f"{name}: {message}")
+    for name in sorted(summary["results"])[:MAX_LISTED_FILES]:
+        lines.append(f"{name}: {summary['results'][name]}")
+    if len(summary["results"]) > MAX_LISTED_FILES:
+        lines.append(f"... and {len(summary['results']) - MAX_LISTED_FILES} more files")
+    return "\n".join(lines)
+
+
+def format_progress(event: dict) -> str:
+    """Process message for one finished file"""
+    eta = f", about {event['eta'] / 60:.0f} min left" if event["eta"] else ""
+    return (f"Folder analysis {event['done']}/{event['total']}: {event['file']} - {event['message']} "
+            f"({event['files_per_min']:.1f} files/min{eta})")
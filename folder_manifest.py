@@ -0,0 +1,139 @@
+"""
+Incremental folder analysis.
+A manifest per folder remembers every data file's size, mtime and last analysis result, so
+doFolderAnalysis only sends new or modified files to PAUTReader and merges their results
+with the ones already known. Manifests are JSON files in MANIFEST_DIR.
+"""
+import os
+import json
+import time
+import hashlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+MANIFEST_DIR = "folder_manifests"
+ANALYSIS_EXTENSIONS = (".fpd", ".opd")
+MAX_LISTED_FILES = 20
+
+
+class FolderManifest:
+    """
+    Files of one folder with the state they had when they were last analysed.
+
+    Args:
+        folder: Inspection folder
+        manifest_dir: Directory the manifest JSON is kept in
+    """
+    def __init__(self, folder: str, manifest_dir: str = MANIFEST_DIR):
+        self.folder = os.path.abspath(folder)
+        folder_id = hashlib.sha1(os.path.normcase(self.folder).encode("utf-8")).hexdigest()[:16]
+        self.manifest_path = os.path.join(manifest_dir, f"{folder_id}.json")
+        self.files: Dict[str, dict] = {}
+        if os.path.exists(self.manifest_path):
+            try:
+                with open(self.manifest_path, "r", encoding="utf-8") as f:
+                    self.files = json.load(f).get("files", {})
+            except (OSError, ValueError) as e:
+                print(f"Could not read folder manifest {self.manifest_path}: {e}")
+
+    def scan(self) -> Dict[str, dict]:
+        """Data files currently in the folder: name -> {"size", "mtime_ns"}"""
+        current = {}
+        with os.scandir(self.folder) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith(ANALYSIS_EXTENSIONS):
+                    stat = entry.stat()
+                    current[entry.name] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        return current
+
+    def changed_files(self, current: Dict[str, dict]) -> List[str]:
+        """Names of files that are new or were modified since their last analysis"""
+        changed = []
+        for name, info in sorted(current.items()):
+            known = self.files.get(name)
+            if known is None or known["size"] != info["size"] or known["mtime_ns"] != info["mtime_ns"]:
+                changed.append(name)
+        return changed
+
+    def update(self, current: Dict[str, dict], results: Dict[str, str]):
+        """Record analysis results for the given files and drop files that no longer exist"""
+        now = time.time()
+        for name, message in results.items():
+            if name in current:
+                self.files[name] = dict(current[name], result=message, analysed_at=now)
+        for name in [name for name in self.files if name not in current]:
+            del self.files[name]
+
+    def save(self):
+        try:
+            os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+            temp_path = self.manifest_path + ".tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"folder": self.folder, "files": self.files}, f, ensure_ascii=False, indent=1)
+            os.replace(temp_path, self.manifest_path)
+        except OSError as e:
+            print(f"Could not write folder manifest {self.manifest_path}: {e}")
+
+
+def analyse_folder_incremental(folder: str, send: Callable[[str, Optional[List[str]]], Tuple[bool, object]],
+                               rerun: bool = False, manifest_dir: str = MANIFEST_DIR) -> Tuple[bool, str]:
+    """
+    Analyse only the new or modified files of a folder
+
+    Args:
+        folder: Local inspection folder
+        send: Function send(folder, files) posting doFolderAnalysis for the listed files
+              (None means the whole folder, an empty list only the folder report);
+              returns (success, JSON response)
+        rerun: Analyse every file again
+        manifest_dir: Directory the manifests are kept in
+
+    Returns:
+        tuple: (success, message merging new and stored results)
+    """
+    manifest = FolderManifest(folder, manifest_dir)
+    current = manifest.scan()
+    to_analyse = sorted(current) if rerun else manifest.changed_files(current)
+    reused = len(current) - len(to_analyse)
+    print(f"Folder analysis of {folder}: {len(to_analyse)} new/changed files, {reused} unchanged")
+
+    # Sent even when nothing changed (an empty "Files" list), so PAUTReader rebuilds its folder report
+    success, response = send(folder, None if rerun or not manifest.files else to_analyse)
+    if not success:
+        return False, "Failed to execute instruction.\n"
+    results = _results_per_file(response)
+    manifest.update(current, results)
+    manifest.save()
+    if to_analyse and not results:
+        # Without per-file results nothing can be reused next time: the whole folder is sent again
+        return True, _folder_message(response)
+
+    lines = [f"Folder analysis of {folder}: {len(to_analyse)} new or modified files analysed, "
+             f"{reused} unchanged results reused."]
+    for name in sorted(current)[:MAX_LISTED_FILES]:
+        entry = manifest.files.get(name)
+        if entry:
+            marker = "" if name in results else " (unchanged)"
+            lines.append(f"{name}: {entry['result']}{marker}")
+    if len(current) > MAX_LISTED_FILES:
+        lines.append(f"... and {len(current) - MAX_LISTED_FILES} more files")
+    return True, "\n".join(lines)
+
+
+def _results_per_file(response) -> Dict[str, str]:
+    """
+    Per-file result messages from a doFolderAnalysis response.
+    PAUTReader builds that only report one message for the whole folder give none.
+    """
+    results = {}
+    if isinstance(response, dict) and isinstance(response.get("Results"), list):
+        for item in response["Results"]:
+            name = os.path.basename(str(item.get("File", "")))
+            if name:
+                results[name] = str(item.get("Message", ""))
+    return results
+
+
+def _folder_message(response) -> str:
+    if isinstance(response, dict) and "Message" in response:
+        return str(response["Message"])
+    return str(response)
@@ -0,0 +1,76 @@
+"""
+Pooled HTTP sessions for talking to the PAUTReader API.
+Each thread gets its own requests.Session (Session objects are not guaranteed to be
+thread-safe), all configured with keep-alive connection pools and the same retry policy,
+so repeated commands reuse an open TCP connection to localhost:5000.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# (connect, read) timeout in seconds used when an endpoint does not define its own
+DEFAULT_TIMEOUT = (3.05, 60)
+
+
+def make_retry_policy(attempts: int = 2, backoff: float = 0.2) -> Retry:
+    """
+    Retry policy shared by all sessions.
+    Connection failures are retried for every method (the request never reached the app);
+    read errors and 502/503/504 answers are only retried for idempotent GET requests.
+    """
+    return Retry(
+        total=attempts + 1,
+        connect=attempts,
+        read=attempts,
+        status=attempts,
+        backoff_factor=backoff,
+        status_forcelist=(502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        raise_on_status=False,
+    )
+
+
+class SessionPool:
+    """
+    Thread-local keep-alive sessions with a shared configuration.
+    """
+    def __init__(self, pool_maxsize: int = 4, retry_attempts: int = 2, backoff: float = 0.2):
+        self.pool_maxsize = pool_maxsize
+        self.retry_attempts = retry_attempts
+        self.backoff = backoff
+        self.local = threading.local()
+        self.sessions = []
+        self.lock = threading.Lock()
+
+    def _new_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize,
+                              max_retries=make_retry_policy(self.retry_attempts, self.backoff))
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        session.headers.update({"Connection": "keep-alive"})
+        return session
+
+    @property
+    def session(self) -> requests.Session:
+        """Session owned by the calling thread (created on first use)"""
+        session = getattr(self.local, "session", None)
+        if session is None:
+            session = self._new_session()
+            self.local.session = session
+            with self.lock:
+                self.sessions.append(session)
+        return session
+
+    def request(self, method: str, url: str, timeout=DEFAULT_TIMEOUT, **kwargs) -> requests.Response:
+        return self.session.request(method, url, timeout=timeout, **kwargs)
+
+    def close_all(self):
+        """Close every session created so far (their threads will open new ones if needed)"""
+        with self.lock:
+            for session in self.sessions:
+                session.close()
+            self.sessions = []
+        self.local = threading.local()
@@ -14,6 +14,7 @@ import re
 from transformers import AutoModelForCausalLM, AutoTokenizer
 import torch
 import ollama
+from ollama_lifecycle import OllamaModelManager
 
 
 # now we will use only english. Other languages will be added later
@@ -23,6 +24,8 @@ nlp = spacy.load("en_core_web_md")
 # TODO: think, it will be better to do in VS. I e file information is stored there
 opened_file_name = ""
 command_queue = Queue()
+# mistral is preloaded in the background and kept resident, see ollama_lifecycle
+ollama_models = OllamaModelManager(["mistral"])
 
 command_keywords = {
     "loadData": ["load", "open", "load file", "open file", "file", "load data", "open data", "open datafile", "load datafile", "datafile"],
@@ -57,7 +60,8 @@ def extract_filename_ollama(user_input):
     response = ollama.generate(
         model="mistral",
         prompt=f"{system_prompt}\n\n{user_input}",
-        options={"temperature": 0}
+        options={"temperature": 0},
+        keep_alive=ollama_models.keep_alive
     )
     print(response)
     return response['response'].strip()
@@ -95,7 +99,6 @@ def extract_arguments(command, user_input):
     args = []
 
     if command == "loadData":
-        # TODO: it works well, but need to add model warmup (first time it takes few sec to set)
         filename = extract_filename_ollama(user_input).strip()
         if filename:
             args.append(filename)
@@ -170,6 +173,7 @@ def run_chat_bot():
         process_input(user_input)
 
 if __name__ == "__main__":
+    ollama_models.start()
     listener_thread = Thread(target=command_listener)
     listener_thread.daemon = True
     listener_thread.start()
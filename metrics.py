@@ -0,0 +1,171 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+Counters and histograms are keyed by label values; start_metrics_server() serves them on
+/metrics for a Prometheus scraper and start_log_summary() prints a periodic summary.
+"""
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Sequence, Tuple
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 7200)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+
+def _escape(value: str) -> str:
+    """Label value escaping of the exposition format (file paths and error texts may hold these)"""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_text(label_names: Sequence[str], label_values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(label_names, label_values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.values: Dict[tuple, float] = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for key, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_label_text(self.label_names, key)} {value:g}")
+        return "\n".join(lines)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self.series: Dict[tuple, dict] = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+                self.series[key] = series
+            series["counts"][bisect.bisect_left(self.buckets, value)] += 1
+            series["sum"] += value
+            series["count"] += 1
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile (None without samples)"""
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self.lock:
+            series = self.series.get(key)
+            if not series or not series["count"]:
+                return None
+            target = q * series["count"]
+            cumulative = 0
+            for index, count in enumerate(series["counts"]):
+                cumulative += count
+                if cumulative >= target:
+                    return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return None
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for key, series in sorted(self.series.items()):
+                cumulative = 0
+                labels = _label_text(self.label_names, key)
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    bucket_labels = _label_text(self.label_names, key, 'le="%g"' % bound)
+                    lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+                bucket_labels = _label_text(self.label_names, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {series['count']}")
+                lines.append(f"{self.name}_sum{labels} {series['sum']:g}")
+                lines.append(f"{self.name}_count{labels} {series['count']}")
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, metric):
+        with self.lock:
+            return self.metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, label_names))
+
+    def histogram(self, name: str, help_text: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, label_names, buckets))
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format"""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+registry = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # keep scrapes out of the console
+
+
+def start_metrics_server(port: int = 9464, host: str = "127.0.0.1") -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics in a background thread; returns None if the port is taken"""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"Could not start metrics endpoint on port {port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Metrics available at http://{host}:{port}/metrics")
+    return server
+
+
+def start_log_summary(summary, interval: float = 300.0) -> threading.Event:
+    """
+    Print summary() every interval seconds (when it returns text)
+
+    Returns:
+        Event that stops the summary thread when set
+    """
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(interval):
+            text = summary()
+            if text:
+                print(text)
+
+    threading.Thread(target=run, daemon=True).start()
+    return stop
@@ -0,0 +1,111 @@
+"""
+Lifecycle manager for local Ollama models.
+Preloads the configured models in the background at startup, keeps them resident with
+periodic keep-alive requests and reports load/evict events, so the first real request
+does not pay the multi-second model load.
+"""
+import time
+import threading
+from typing import Callable, Dict, List, Optional
+
+try:
+    import ollama
+    OLLAMA_AVAILABLE = True
+except ImportError:
+    print("Warning: ollama module not available. Local models will not be preloaded.")
+    OLLAMA_AVAILABLE = False
+
+
+def _base_name(model_name: str) -> str:
+    """'mistral:latest' -> 'mistral'"""
+    return model_name.split(":")[0]
+
+
+class OllamaModelManager:
+    """
+    Keeps a set of Ollama models loaded.
+
+    Events are reported as dicts {"event": "loaded" | "evicted" | "load_failed", "model": ..., "time": ...,
+    "load_seconds": ...} through on_event (default: printed) and kept in self.events.
+    """
+    def __init__(self, models: List[str], keep_alive: str = "30m", check_interval: float = 120.0,
+                 on_event: Optional[Callable[[dict], None]] = None):
+        self.models = list(models)
+        self.keep_alive = keep_alive
+        self.check_interval = check_interval
+        self.on_event = on_event
+        self.events = []
+        self.loaded: Dict[str, bool] = {model: False for model in self.models}
+        self.ready = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """Start background preloading and keep-alive (no-op if already running)"""
+        if not OLLAMA_AVAILABLE or (self.thread and self.thread.is_alive()):
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._run, name="ollama-keepalive", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        """Block until every configured model has been loaded once (or the timeout expires)"""
+        return self.ready.wait(timeout)
+
+    def is_loaded(self, model: str) -> bool:
+        return self.loaded.get(model, False)
+
+    def _report(self, event: str, model: str, **details):
+        entry = {"event": event, "model": model, "time": time.time()}
+        entry.update(details)
+        self.events.append(entry)
+        self.events = self.events[-100:]
+        if self.on_event:
+            self.on_event(entry)
+        else:
+            extra = ", ".join(f"{key}={value}" for key, value in details.items())
+            print(f"Ollama model {event}: {model}" + (f" ({extra})" if extra else ""))
+
+    def _load(self, model: str):
+        """Load a model (or refresh its keep-alive) with an empty prompt"""
+        started = time.perf_counter()
+        try:
+            response = ollama.generate(model=model, prompt="", keep_alive=self.keep_alive)
+        except Exception as e:
+            self.loaded[model] = False
+            self._report("load_failed", model, error=str(e))
+            return
+        if not self.loaded[model]:
+            load_ns = response.get("load_duration")
+            load_seconds = load_ns / 1e9 if load_ns else time.perf_counter() - started
+            self._report("loaded", model, load_seconds=round(load_seconds, 2))
+        self.loaded[model] = True
+
+    def _resident_models(self) -> Optional[set]:
+        """Names of the models Ollama currently holds in memory, None if the server is unreachable"""
+        try:
+            running = ollama.ps()
+        except Exception as e:
+            print(f"Could not query running Ollama models: {e}")
+            return None
+        return {_base_name(entry.get("model") or entry.get("name", "")) for entry in running.get("models", [])}
+
+    def _run(self):
+        for model in self.models:
+            self._load(model)
+        if all(self.loaded.values()):
+            self.ready.set()
+
+        while not self.stop_event.wait(self.check_interval):
+            resident = self._resident_models()
+            for model in self.models:
+                if resident is not None and self.loaded[model] and _base_name(model) not in resident:
+                    self.loaded[model] = False
+                    self._report("evicted", model)
+                # Reloads evicted models and pushes keep_alive forward for resident ones
+                self._load(model)
+            if all(self.loaded.values()):
+                self.ready.set()
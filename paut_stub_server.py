@@ -0,0 +1,193 @@
+"""
+Local stub of the PAUTReader REST API (http://localhost:5000/api/app) for testing and benchmarks.
+It implements every endpoint from command_process.COMMAND_ENDPOINTS with in-memory state
+and an optional artificial processing delay, plus the /batch endpoint for ordered command lists.
+
+Run standalone:
+    python paut_stub_server.py --port 5000 --delay-ms 20
+"""
+import os
+import time
+import argparse
+import threading
+
+from typing import List, Optional
+
+from fastapi import FastAPI, HTTPException, Query
+from pydantic import BaseModel
+import uvicorn
+
+app = FastAPI()
+
+# Simulated application state and per-request processing delay in seconds
+state = {"directory": os.path.expanduser("~/Documents"), "loaded_file": "", "delay": 0.0, "batch": True}
+
+
+class LoadDataRequest(BaseModel):
+    FilePath: str
+
+
+class SetDirectoryRequest(BaseModel):
+    TargetFolder: str
+    isrootPathForSearchIsCurrentDir: bool = False
+    rootPathForFolderSearch: str = ""
+
+
+class FolderAnalysisRequest(BaseModel):
+    Folder: str
+    Files: Optional[List[str]] = None
+
+
+class BatchStep(BaseModel):
+    Endpoint: str
+    Method: str = "POST"
+    Payload: dict = {}
+
+
+class BatchRequest(BaseModel):
+    Commands: List[BatchStep]
+    StopOnError: bool = True
+
+
+def _work():
+    if state["delay"]:
+        time.sleep(state["delay"])
+
+
+def _require_file():
+    if not state["loaded_file"]:
+        return {"Message": "No file is loaded."}
+    return None
+
+
+@app.post("/api/app/loadData")
+def load_data(request: LoadDataRequest):
+    _work()
+    state["loaded_file"] = request.FilePath
+    return {"Message": f"File loaded: {request.FilePath}"}
+
+
+@app.post("/api/app/updatePlot")
+def update_plot():
+    _work()
+    return _require_file() or {"Message": "Plot updated."}
+
+
+@app.post("/api/app/getFileInformation")
+def get_file_information():
+    _work()
+    return _require_file() or {"Message": f"File information: {state['loaded_file']}"}
+
+
+@app.get("/api/app/getDirectory")
+def get_directory(folderName: str = Query("Documents")):
+    _work()
+    return {"FolderName": state["directory"]}
+
+
+@app.post("/api/app/setNewDirectory")
+def set_new_directory(request: SetDirectoryRequest):
+    _work()
+    state["directory"] = request.TargetFolder
+    return {"Message": f"Directory changed to {request.TargetFolder}"}
+
+
+@app.post("/api/app/startSNRAnalysis")
+def start_snr_analysis():
+    _work()
+    return _require_file() or {"Message": f"SNR analysis finished for {state['loaded_file']}"}
+
+
+@app.post("/api/app/startDefectDetection")
+def start_defect_detection():
+    _work()
+    return _require_file() or {"Message": f"Defect detection finished for {state['loaded_file']}"}
+
+
+@app.post("/api/app/makeSingleFileOnly")
+def make_single_file_only():
+    _work()
+    return _require_file() or {"Message": f"Report created for {state['loaded_file']}"}
+
+
+@app.post("/api/app/doFolderAnalysis")
+def do_folder_analysis(request: FolderAnalysisRequest):
+    files = request.Files
+    if files is None:
+        files = sorted(name for name in os.listdir(request.Folder)
+                       if name.lower().endswith((".fpd", ".opd"))) if os.path.isdir(request.Folder) else []
+    results = []
+    for name in files:
+        _work()
+        results.append({"File": name, "Message": f"No defects found in {name}"})
+    return {"Message": f"Folder analysis finished for {request.Folder}: {len(results)} files", "Results": results}
+
+
+# Batch step handlers by endpoint name; each takes the step payload
+BATCH_HANDLERS = {
+    "loadData": lambda payload: load_data(LoadDataRequest(**payload)),
+    "updatePlot": lambda payload: update_plot(),
+    "getFileInformation": lambda payload: get_file_information(),
+    "getDirectory": lambda payload: get_directory(),
+    "setNewDirectory": lambda payload: set_new_directory(SetDirectoryRequest(**payload)),
+    "startSNRAnalysis": lambda payload: start_snr_analysis(),
+    "startDefectDetection": lambda payload: start_defect_detection(),
+    "makeSingleFileOnly": lambda payload: make_single_file_only(),
+    "doFolderAnalysis": lambda payload: do_folder_analysis(FolderAnalysisRequest(**payload)),
+}
+
+
+@app.post("/api/app/batch")
+def batch(request: BatchRequest):
+    if not state["batch"]:
+        # Behave like a PAUTReader build without batch support
+        raise HTTPException(status_code=404)
+    results = []
+    for step in request.Commands:
+        endpoint = step.Endpoint.split("?")[0]
+        started = time.perf_counter()
+        handler = BATCH_HANDLERS.get(endpoint)
+        if handler is None:
+            result = {"Endpoint": endpoint, "StatusCode": 404, "Error": f"Unknown endpoint '{endpoint}'"}
+        else:
+            try:
+                result = {"Endpoint": endpoint, "StatusCode": 200, "Body": handler(step.Payload)}
+            except Exception as e:
+                result = {"Endpoint": endpoint, "StatusCode": 500, "Error": str(e)}
+        result["Elapsed"] = time.perf_counter() - started
+        results.append(result)
+        if request.StopOnError and result["StatusCode"] != 200:
+            break
+    return {"Results": results}
+
+
+def start_stub_server(port=5055, delay=0.0, batch=True):
+    """
+    Start the stub in a background thread
+
+    Args:
+        port: Port to listen on (127.0.0.1)
+        delay: Artificial processing time per request in seconds
+        batch: Serve the /batch endpoint (False answers 404 like older PAUTReader builds)
+
+    Returns:
+        tuple: (server, base_url); set server.should_exit = True to stop it
+    """
+    state["delay"] = delay
+    state["batch"] = batch
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}/api/app"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="PAUTReader API stub")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--delay-ms", type=float, default=0.0)
+    options = parser.parse_args()
+    state["delay"] = options.delay_ms / 1000.0
+    uvicorn.run(app, host="127.0.0.1", port=options.port)
@@ -0,0 +1,111 @@
+"""
+Registry of pre-rendered system prompts.
+Each (prompt_type, language) prompt is built once, kept byte-identical for every request
+(so the provider-side prompt cache can match the prefix) and token-counted once.
+"""
+import time
+import threading
+from typing import Callable, Dict
+
+# Import tiktoken for token counting
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    print("Warning: tiktoken module not available. Prompt token counts will be estimated.")
+    TIKTOKEN_AVAILABLE = False
+
+
+class PromptRegistry:
+    """
+    Caches rendered prompts per (prompt_type, language_code).
+
+    Builders are registered per prompt type and receive the language code; they are only
+    called the first time a language is requested (or after clear()).
+    """
+    def __init__(self, model: str = "gpt-4o"):
+        self.builders: Dict[str, Callable[[str], str]] = {}
+        self.rendered: Dict[tuple, dict] = {}
+        self.lock = threading.Lock()
+        self.tokenizer = None
+        if TIKTOKEN_AVAILABLE:
+            try:
+                try:
+                    self.tokenizer = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    # Older tiktoken releases do not know newer model names
+                    self.tokenizer = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # Encodings are downloaded on first use; offline we fall back to estimates
+                print(f"Could not load tokenizer for prompt registry: {e}")
+
+    def register(self, prompt_type: str, builder: Callable[[str], str]):
+        """Register (or replace) the builder for a prompt type and drop its cached renders"""
+        with self.lock:
+            self.builders[prompt_type] = builder
+            for key in [key for key in self.rendered if key[0] == prompt_type]:
+                del self.rendered[key]
+
+    def count_tokens(self, text: str) -> int:
+        if self.tokenizer is not None:
+            return len(self.tokenizer.encode(text))
+        return len(text) // 4  # rough estimate for English text
+
+    def _entry(self, prompt_type: str, language_code: str, count_hit: bool = True) -> dict:
+        key = (prompt_type, language_code)
+        with self.lock:
+            entry = self.rendered.get(key)
+            if entry is not None:
+                if count_hit:
+                    entry["hits"] += 1
+                return entry
+            builder = self.builders[prompt_type]
+
+        started = time.perf_counter()
+        text = builder(language_code)
+        entry = {
+            "text": text,
+            "tokens": self.count_tokens(text),
+            "chars": len(text),
+            "render_ms": (time.perf_counter() - started) * 1000,
+            "hits": 0,
+        }
+        with self.lock:
+            # Another thread may have rendered it meanwhile; keep the first copy so the text stays identical
+            entry = self.rendered.setdefault(key, entry)
+        print(f"Prompt '{prompt_type}' ({language_code}) rendered: {entry['tokens']} tokens")
+        return entry
+
+    def get(self, prompt_type: str, language_code: str) -> str:
+        """
+        Get a rendered prompt
+
+        Args:
+            prompt_type: Registered prompt type (e.g. "master_extraction")
+            language_code: Language code (e.g. "en")
+
+        Returns:
+            Prompt text, identical for every call with the same arguments
+        """
+        return self._entry(prompt_type, language_code)["text"]
+
+    def token_count(self, prompt_type: str, language_code: str) -> int:
+        return self._entry(prompt_type, language_code, count_hit=False)["tokens"]
+
+    def metrics(self) -> Dict[str, dict]:
+        """Token size, character size, render time and cache hits per rendered prompt"""
+        with self.lock:
+            return {
+                f"{prompt_type}/{language_code}": {
+                    "tokens": entry["tokens"],
+                    "chars": entry["chars"],
+                    "render_ms": round(entry["render_ms"], 3),
+                    "hits": entry["hits"],
+                }
+                for (prompt_type, language_code), entry in self.rendered.items()
+            }
+
+    def clear(self):
+        """Drop all rendered prompts (e.g. after localization files were edited)"""
+        with self.lock:
+            self.rendered.clear()
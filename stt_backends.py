@@ -0,0 +1,151 @@
+"""
+Speech-to-text backends for voice input.
+Every backend turns 16-bit mono samples into text through the same interface, so the
+recognizer does not care whether the audio goes to the OpenAI Whisper API or stays on the
+PC. The local backend runs a quantized Whisper model on the CPU with faster-whisper
+(CTranslate2): no network needed and no WAN round-trip, at the cost of loading the model
+once (warm_up() does that, plus one dummy decode, in the background at start-up).
+
+    backend = create_backend("local", model_size="base", cpu_threads=4)
+    backend.warm_up()
+    text = backend.transcribe(samples, 16000, "en")
+"""
+import time
+import threading
+from typing import Optional
+
+import numpy as np
+
+from audio_encoding import encode_audio
+from metrics import registry, SIZE_BUCKETS
+
+BACKENDS = ("openai", "local")
+
+# Per-request telemetry, exposed on /metrics (see metrics.py)
+upload_bytes = registry.histogram("voice_upload_bytes", "Size of the encoded audio sent to Whisper",
+                                  ("codec",), SIZE_BUCKETS + (4194304, 16777216))
+transcription_duration = registry.histogram("voice_transcription_seconds",
+                                            "Encoding plus Whisper request, per upload", ("codec",))
+local_duration = registry.histogram("voice_local_transcription_seconds",
+                                    "Local speech-to-text decoding time", ("model",))
+
+
+class SpeechToTextBackend:
+    """Interface of the speech-to-text engines"""
+    name = "base"
+
+    def warm_up(self):
+        """Prepare the engine so the first real request is not slower than the others"""
+
+    def transcribe(self, samples: np.ndarray, sample_rate: int = 16000, language: Optional[str] = None) -> str:
+        """
+        Transcribe 16-bit mono samples
+
+        Returns:
+            str: Transcribed text ("" if nothing was recognized)
+        """
+        raise NotImplementedError
+
+
+class WhisperAPIBackend(SpeechToTextBackend):
+    """
+    OpenAI transcription endpoint.
+
+    Args:
+        client: OpenAI client
+        model: Transcription model
+        codec: Upload codec, see audio_encoding.CODECS
+    """
+    name = "openai"
+
+    def __init__(self, client, model: str = "whisper-1", codec: str = "flac"):
+        if client is None:
+            raise ValueError("OpenAI client not initialized")
+        self.client = client
+        self.model = model
+        self.codec = codec
+
+    def transcribe(self, samples, sample_rate=16000, language=None):
+        started = time.perf_counter()
+        file_name, audio, codec = encode_audio(samples, sample_rate, 1, self.codec)
+        upload_bytes.observe(len(audio), codec=codec)
+        options = {"language": language} if language else {}
+        transcript = self.client.audio.transcriptions.create(model=self.model, file=(file_name, audio), **options)
+        elapsed = time.perf_counter() - started
+        transcription_duration.observe(elapsed, codec=codec)
+        print(f"{len(samples) / sample_rate:.2f}s of audio as {codec} ({len(audio) / 1024:.1f} KB) "
+              f"transcribed by the API in {elapsed:.2f}s")
+        return transcript.text.strip() if transcript and hasattr(transcript, 'text') else ""
+
+
+class LocalWhisperBackend(SpeechToTextBackend):
+    """
+    Whisper on the local CPU with faster-whisper.
+
+    Args:
+        model_size: Whisper model name ("tiny", "base", "small", ...) or path to a converted model
+        cpu_threads: Threads used for decoding (0: CTranslate2 default)
+        compute_type: Weight quantization, "int8" is the fastest on CPU
+        beam_size: 1 (greedy) is fastest; larger beams are slightly more accurate
+    """
+    name = "local"
+
+    def __init__(self, model_size: str = "base", cpu_threads: int = 4, compute_type: str = "int8", beam_size: int = 1):
+        from faster_whisper import WhisperModel  # optional dependency, ImportError tells the caller
+        self._model_class = WhisperModel
+        self.model_size = model_size
+        self.cpu_threads = cpu_threads
+        self.compute_type = compute_type
+        self.beam_size = beam_size
+        self.model = None
+        self.lock = threading.Lock()  # one decode at a time; the threads are used inside the model
+
+    def _load(self):
+        if self.model is None:
+            started = time.perf_counter()
+            self.model = self._model_class(self.model_size, device="cpu", compute_type=self.compute_type,
+                                           cpu_threads=self.cpu_threads)
+            print(f"Local Whisper model '{self.model_size}' ({self.compute_type}, {self.cpu_threads} threads) "
+                  f"loaded in {time.perf_counter() - started:.1f}s")
+        return self.model
+
+    def warm_up(self):
+        started = time.perf_counter()
+        with self.lock:
+            model = self._load()
+            segments, _ = model.transcribe(np.zeros(16000, dtype=np.float32), language="en", beam_size=1)
+            list(segments)  # the decode runs while the segments are consumed
+        print(f"Local Whisper warm-up took {time.perf_counter() - started:.1f}s")
+
+    def transcribe(self, samples, sample_rate=16000, language=None):
+        if sample_rate != 16000:
+            raise ValueError("The local Whisper backend expects 16 kHz audio")
+        audio = np.asarray(samples, dtype=np.int16).reshape(-1).astype(np.float32) / 32768.0
+        started = time.perf_counter()
+        with self.lock:
+            segments, _ = self._load().transcribe(audio, language=language or None, beam_size=self.beam_size)
+            text = " ".join(segment.text.strip() for segment in segments).strip()
+        elapsed = time.perf_counter() - started
+        local_duration.observe(elapsed, model=self.model_size)
+        print(f"{len(audio) / sample_rate:.2f}s of audio transcribed locally in {elapsed:.2f}s")
+        return text
+
+
+def create_backend(name: str, client=None, **options) -> SpeechToTextBackend:
+    """
+    Create a speech-to-text backend by name
+
+    Args:
+        name: "openai" or "local"
+        client: OpenAI client (for "openai")
+        **options: Backend settings, e.g. codec for "openai", model_size / cpu_threads for "local"
+
+    Raises:
+        ValueError: Unknown backend or missing client
+        ImportError: faster-whisper is not installed (for "local")
+    """
+    if name == "openai":
+        return WhisperAPIBackend(client, **options)
+    if name == "local":
+        return LocalWhisperBackend(**options)
+    raise ValueError(f"Unknown speech-to-text backend '{name}', expected one of {', '.join(BACKENDS)}")
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Tests for the analysis result cache and the application state mirror
+"""
+
+import sys
+import os
+import tempfile
+import threading
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analysis_cache import AnalysisCache
+from app_state import AppStateMirror
+from folder_analysis_driver import FolderAnalysisDriver
+from folder_manifest import analyse_folder_incremental
+
+
+def make_scan(directory, content=b"PAUT" * 1000):
+    path = os.path.join(directory, "scan.fpd")
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def test_stored_result_is_returned_and_persisted():
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_scan(directory)
+        cache_file = os.path.join(directory, "cache.json")
+        cache = AnalysisCache(cache_file)
+        assert cache.get("startDefectDetection", path) is None
+        cache.store("startDefectDetection", path, "3 defects found")
+        assert cache.get("startDefectDetection", path) == "3 defects found"
+        assert AnalysisCache(cache_file).get("startDefectDetection", path) == "3 defects found"
+        rates = cache.hit_rates()
+        assert rates["startDefectDetection"]["hits"] == 1
+        assert rates["total"]["hit_rate"] == 0.5
+
+
+def test_changed_file_is_a_miss():
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_scan(directory)
+        cache = AnalysisCache(None)
+        cache.store("doAnalysisSNR", path, "SNR 24 dB")
+        make_scan(directory, b"PAUT" * 1001)
+        assert cache.get("doAnalysisSNR", path) is None
+
+
+def test_result_is_stored_under_the_key_taken_when_sent():
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_scan(directory)
+        other = os.path.join(directory, "other.fpd")
+        with open(other, "wb") as f:
+            f.write(b"other")
+        cache = AnalysisCache(None)
+        key = cache.key("startDefectDetection", path)
+        # Another loadData finished while the detection ran; the result still belongs to path
+        cache.store("startDefectDetection", other, "1 defect", key=key)
+        assert cache.get("startDefectDetection", path) == "1 defect"
+        assert cache.get("startDefectDetection", other) is None
+
+
+def test_state_mirror_skips_reload_until_other_file():
+    state = AppStateMirror()
+    state.record("loadData", ["C:/Data/scan.fpd"], True, {"Message": "File loaded"}, "File loaded")
+    assert state.cached_response("loadData", ["C:/Data/scan.fpd"]) is not None
+    state.record("startDefectDetection", [], True, {"Message": "2 defects"}, "2 defects")
+    assert state.cached_response("startDefectDetection", []) == "2 defects"
+    state.record("loadData", ["C:/Data/other.fpd"], True, {"Message": "File loaded"}, "File loaded")
+    assert state.cached_response("startDefectDetection", []) is None
+    assert state.cached_response("loadData", ["C:/Data/scan.fpd"]) is None
+
+
+def test_folder_analysis_sends_only_new_files():
+    sent = []
+
+    def send(folder, files):
+        sent.append(files)
+        names = files or sorted(os.listdir(folder))
+        return True, {"Results": [{"File": name, "Message": f"{name} ok"} for name in names]}
+
+    with tempfile.TemporaryDirectory() as folder, tempfile.TemporaryDirectory() as manifests:
+        for name in ("a.fpd", "b.opd", "notes.txt"):
+            with open(os.path.join(folder, name), "wb") as f:
+                f.write(b"data")
+        analyse_folder_incremental(folder, send, manifest_dir=manifests)
+        with open(os.path.join(folder, "c.fpd"), "wb") as f:
+            f.write(b"data")
+        success, message = analyse_folder_incremental(folder, send, manifest_dir=manifests)
+        assert success
+        assert sent == [None, ["c.fpd"]]
+        assert "a.fpd: a.fpd ok (unchanged)" in message
+        assert "c.fpd: c.fpd ok" in message
+        analyse_folder_incremental(folder, send, manifest_dir=manifests)
+        assert sent[-1] == []  # nothing changed: PAUTReader only rebuilds the folder report
+
+
+def test_folder_message_is_not_copied_to_every_file():
+    sent = []
+
+    def send(folder, files):
+        sent.append(files)
+        return True, {"Message": "Folder report written"}
+
+    with tempfile.TemporaryDirectory() as folder, tempfile.TemporaryDirectory() as manifests:
+        with open(os.path.join(folder, "a.fpd"), "wb") as f:
+            f.write(b"data")
+        assert analyse_folder_incremental(folder, send, manifest_dir=manifests) == (True, "Folder report written")
+        analyse_folder_incremental(folder, send, manifest_dir=manifests)
+        assert sent == [None, None]
+
+
+def test_cancel_stops_sharded_folder_analysis():
+    class Response:
+        status_code = 200
+
+        def json(self):
+            return {"Message": "ok"}
+
+    def send(command_name, *args, base_url=None):
+        time.sleep(0.05)
+        return Response()
+
+    with tempfile.TemporaryDirectory() as folder, tempfile.TemporaryDirectory() as manifests:
+        for index in range(20):
+            with open(os.path.join(folder, f"scan{index}.fpd"), "wb") as f:
+                f.write(b"data")
+        driver = FolderAnalysisDriver(send, ["http://a", "http://b"])
+        threading.Timer(0.15, driver.cancel).start()
+        summary = driver.run(folder, manifest_dir=manifests)
+        assert 0 < summary["analysed"] < 20
+        assert summary["not_analysed"] == 20 - summary["analysed"]
+
+
+def test_each_instance_analyses_one_file_at_a_time():
+    loaded = {}
+    mixed_up = []
+
+    class Response:
+        status_code = 200
+
+        def __init__(self, message):
+            self.message = message
+
+        def json(self):
+            return {"Message": self.message}
+
+    def send(command_name, *args, base_url=None):
+        if command_name == "loadData":
+            loaded[base_url] = os.path.basename(args[0])
+            time.sleep(0.01)
+            return Response("loaded")
+        name = loaded[base_url]
+        time.sleep(0.01)
+        if loaded[base_url] != name:
+            mixed_up.append(name)
+        return Response(f"{name} ok")
+
+    with tempfile.TemporaryDirectory() as folder, tempfile.TemporaryDirectory() as manifests:
+        for index in range(8):
+            with open(os.path.join(folder, f"scan{index}.fpd"), "wb") as f:
+                f.write(b"data")
+        driver = FolderAnalysisDriver(send, ["http://a", "http://a", "http://b"])
+        summary = driver.run(folder, manifest_dir=manifests)
+        assert driver.workers == 2
+        assert summary["analysed"] == 8 and not mixed_up
+        assert all(message == f"{name} ok" for name, message in summary["results"].items())
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
+    print("\n=== All Tests Completed Successfully! ===")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for the latency-based LLM backend router
+"""
+
+import sys
+import os
+import time
+import threading
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from backend_router import BackendRouter, HedgeLost, attempt_cancelled
+
+
+def test_prefers_faster_backend():
+    router = BackendRouter(min_samples=2)
+    for _ in range(3):
+        router.record("chat", "openai", 1.5)
+        router.record("chat", "ollama", 0.2)
+    assert router.ranked("chat", ["openai", "ollama"]) == ["ollama", "openai"]
+
+
+def test_fails_over_on_network_error():
+    router = BackendRouter()
+
+    def offline():
+        raise ConnectionError("network is down")
+
+    result = router.call("chat", {"openai": offline, "ollama": lambda: "local answer"})
+    assert result == "local answer"
+    # The unreachable backend is put last until its cooldown expires
+    assert router.ranked("chat", ["openai", "ollama"]) == ["ollama", "openai"]
+
+
+def test_hedges_slow_request():
+    router = BackendRouter(min_hedge_delay=0.05)
+
+    def slow():
+        time.sleep(0.5)
+        return "slow"
+
+    started = time.perf_counter()
+    result = router.call("filename", {"openai": slow, "ollama": lambda: "fast"})
+    assert result == "fast"
+    assert time.perf_counter() - started < 0.4
+
+
+def test_hedge_loser_is_cancelled():
+    router = BackendRouter(min_hedge_delay=0.05)
+    stopped = threading.Event()
+
+    def streaming():
+        for _ in range(50):
+            if attempt_cancelled():
+                stopped.set()
+                raise HedgeLost("another backend answered first")
+            time.sleep(0.02)
+        return "slow"
+
+    assert router.call("chat", {"openai": streaming, "ollama": lambda: "fast"}) == "fast"
+    assert stopped.wait(0.5)
+    time.sleep(0.05)
+    # Losing the hedge is not held against the backend
+    assert router.summary()["chat/openai"]["samples"] == 0
+
+
+def test_none_result_counts_as_failure():
+    router = BackendRouter()
+    result = router.call("command", {"openai": lambda: None, "ollama": lambda: "loadData"})
+    assert result == "loadData"
+    assert router.summary()["command/openai"]["error_rate"] == 1.0
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
+    print("\n=== All Tests Completed Successfully! ===")
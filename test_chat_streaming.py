@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Tests for coalescing streamed chat deltas
+"""
+
+import sys
+import os
+import time
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from chat_streaming import DeltaBatcher
+
+
+def test_held_back_text_is_sent_when_the_stream_pauses():
+    batches = []
+    batcher = DeltaBatcher(batches.append, frame_interval=0.05)
+    batcher.add("Hello")
+    batcher.add(", world")
+    assert batches == ["Hello"]
+    # No further delta and no end of stream: the trailing timer sends the rest
+    time.sleep(0.15)
+    assert batches == ["Hello", ", world"]
+    batcher.flush()
+    assert batcher.batches_sent == 2
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
+    print("\n=== All Tests Completed Successfully! ===")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Tests for batch command dispatch against the local PAUTReader stub server
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import command_process
+import paut_stub_server
+from command_process import execute_command_batch
+from paut_stub_server import start_stub_server
+
+STUB_PORT = 5057
+COMMANDS = [("loadData", ["C:/Data/batch.fpd"]), ("getFileInformation", []), ("updatePlot", [])]
+_stub = {}
+
+
+def run_against_stub(batch):
+    # One stub for the module (a daemon thread); its batch flag makes it answer like an older build
+    if not _stub:
+        _stub["server"], _stub["base_url"] = start_stub_server(STUB_PORT)
+    paut_stub_server.state["batch"] = batch
+    paut_stub_server.state["loaded_file"] = ""
+    base_url = _stub["base_url"]
+    command_process.batch_supported.pop(base_url, None)
+    return base_url, execute_command_batch(COMMANDS, base_url=base_url, rerun=True)
+
+
+def test_batch_runs_every_command_in_one_request():
+    base_url, results = run_against_stub(batch=True)
+    assert command_process.batch_supported[base_url] is True
+    assert [result["command"] for result in results] == ["loadData", "getFileInformation", "updatePlot"]
+    assert all(result["success"] for result in results)
+    assert "C:/Data/batch.fpd" in results[1]["message"]
+
+
+def test_missing_batch_endpoint_falls_back_to_single_commands():
+    base_url, results = run_against_stub(batch=False)
+    assert command_process.batch_supported[base_url] is False
+    assert [result["command"] for result in results] == ["loadData", "getFileInformation", "updatePlot"]
+    assert all(result["success"] for result in results)
+    assert "C:/Data/batch.fpd" in results[1]["message"]
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
+    print("\n=== All Tests Completed Successfully! ===")
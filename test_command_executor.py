@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Tests for the PAUTReader command executor
+"""
+
+import sys
+import os
+import time
+import threading
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from command_executor import CommandExecutor, DependencyFailed
+from command_pipeline import CommandPipeline
+
+
+def slow_execute(command, *args):
+    time.sleep(0.2)
+    return f"Command '{command}' executed successfully.", command
+
+
+def test_independent_commands_run_concurrently():
+    executor = CommandExecutor(execute=slow_execute, max_workers=3)
+    started = time.perf_counter()
+    futures = [executor.submit(command) for command in ("updatePlot", "getDirectory", "getFileInformation")]
+    results = [future.result(timeout=2) for future in futures]
+    assert [response for _, response in results] == ["updatePlot", "getDirectory", "getFileInformation"]
+    assert time.perf_counter() - started < 0.5
+    executor.shutdown()
+
+
+def test_dependent_command_waits_for_prerequisite():
+    order = []
+
+    def execute(command, *args):
+        time.sleep(0.1 if command == "loadData" else 0)
+        order.append(command)
+        return f"Command '{command}' executed successfully.", command
+
+    executor = CommandExecutor(execute=execute)
+    load = executor.submit("loadData", ["scan.fpd"])
+    detect = executor.submit("startDefectDetection", depends_on=[load])
+    detect.result(timeout=2)
+    assert order == ["loadData", "startDefectDetection"]
+    executor.shutdown()
+
+
+def test_failed_prerequisite_skips_dependant():
+    def execute(command, *args):
+        if command == "loadData":
+            return f"Failed to execute command '{command}'. Status code: 500", ""
+        return f"Command '{command}' executed successfully.", command
+
+    executor = CommandExecutor(execute=execute)
+    load = executor.submit("loadData", ["missing.fpd"])
+    detect = executor.submit("startDefectDetection", depends_on=[load])
+    error = detect.exception(timeout=2)
+    assert isinstance(error, DependencyFailed)
+    assert error.dependency == "loadData"
+    executor.shutdown()
+
+
+def test_failure_propagates_down_a_chain_without_deadlock():
+    def execute(command, *args):
+        if command == "setNewDirectory":
+            time.sleep(0.1)  # fails only after the whole chain is waiting on it
+            return f"Failed to execute command '{command}'. Status code: 500", ""
+        return f"Command '{command}' executed successfully.", command
+
+    executor = CommandExecutor(execute=execute)
+    directory = executor.submit("setNewDirectory", ["/missing"])
+    load = executor.submit("loadData", depends_on=[directory])
+    detect = executor.submit("startDefectDetection", depends_on=[load])
+    assert isinstance(load.exception(timeout=2), DependencyFailed)
+    error = detect.exception(timeout=2)
+    assert isinstance(error, DependencyFailed)
+    assert error.dependency == "loadData"
+    # The executor still accepts and runs commands
+    assert executor.submit("getDirectory").result(timeout=2)[1] == "getDirectory"
+    executor.shutdown()
+
+
+def test_callbacks_go_through_dispatch():
+    dispatched = []
+    done = threading.Event()
+
+    def dispatch(callback, future):
+        dispatched.append(future.command)
+        callback(future)
+
+    executor = CommandExecutor(execute=slow_execute, dispatch=dispatch)
+    executor.submit("getDirectory", on_done=lambda future: done.set())
+    assert done.wait(2)
+    assert dispatched == ["getDirectory"]
+    executor.shutdown()
+
+
+def test_pipeline_orders_only_state_dependencies():
+    executor = CommandExecutor(execute=slow_execute, max_workers=4)
+    pipeline = CommandPipeline(executor)
+    for command in ("setNewDirectory", "loadData", "updatePlot", "getFileInformation",
+                    "doAnalysisSNR", "startDefectDetection", "makeSingleFileOnly"):
+        pipeline.add(command)
+    assert pipeline.describe() == [
+        ("setNewDirectory", []),
+        ("loadData", ["setNewDirectory"]),
+        ("updatePlot", ["loadData"]),
+        ("getFileInformation", ["loadData"]),
+        ("doAnalysisSNR", ["loadData"]),
+        ("startDefectDetection", ["loadData", "doAnalysisSNR"]),
+        ("makeSingleFileOnly", ["loadData", "startDefectDetection"]),
+    ]
+    for future in pipeline.futures:
+        future.result(timeout=5)
+    executor.shutdown()
+
+
+def test_pipeline_runs_independent_commands_concurrently():
+    executor = CommandExecutor(execute=slow_execute, max_workers=4)
+    pipeline = CommandPipeline(executor)
+    started = time.perf_counter()
+    pipeline.add("loadData", ["scan.fpd"])
+    pipeline.add("updatePlot")
+    pipeline.add("getFileInformation")
+    for future in pipeline.futures:
+        future.result(timeout=2)
+    # loadData, then both readers in parallel: two steps of 0.2 s instead of three
+    assert time.perf_counter() - started < 0.55
+    executor.shutdown()
+
+
+def test_later_request_waits_for_running_load():
+    order = []
+
+    def execute(command, *args):
+        time.sleep(0.2 if command == "loadData" else 0)
+        order.append(command)
+        if command == "loadData" and args == ("missing.fpd",):
+            return f"Failed to execute command '{command}'. Status code: 500", ""
+        return f"Command '{command}' executed successfully.", command
+
+    def execute_batch(steps):
+        order.append([command for command, _ in steps])
+        return [{"command": command, "success": True, "message": "ok"} for command, _ in steps]
+
+    executor = CommandExecutor(execute=execute, execute_batch=execute_batch)
+    pipeline = CommandPipeline(executor)
+    pipeline.start_request()
+    pipeline.add("loadData", ["scan.fpd"])
+    # The next message arrives while loadData is still running
+    pipeline.start_request()
+    pipeline.add_batch([("doAnalysisSNR", []), ("startDefectDetection", [])]).result(timeout=2)
+    assert order == ["loadData", ["doAnalysisSNR", "startDefectDetection"]]
+    pipeline.start_request()
+    pipeline.add("loadData", ["missing.fpd"]).result(timeout=2)
+    # A failed load of an earlier request does not block a new one
+    pipeline.start_request()
+    assert pipeline.add("startDefectDetection").result(timeout=2)[1] == "startDefectDetection"
+    executor.shutdown()
+
+
+def test_chained_request_is_batched_independent_reads_are_not():
+    pipeline = CommandPipeline(None)
+    assert pipeline.sequential(["setNewDirectory", "loadData", "doAnalysisSNR",
+                                "startDefectDetection", "makeSingleFileOnly"])
+    assert not pipeline.sequential(["loadData", "updatePlot", "getFileInformation"])
+
+
+def test_batch_runs_as_one_job_after_its_dependencies():
+    batches = []
+
+    def execute_batch(steps, rerun=False):
+        batches.append((steps, rerun))
+        return [{"command": command, "success": True, "message": "ok"} for command, _ in steps]
+
+    executor = CommandExecutor(execute=slow_execute, execute_batch=execute_batch)
+    directory = executor.submit("setNewDirectory", ["C:/Data", False, ""])
+    batch = executor.submit_batch([("loadData", ["scan.fpd"]), ("startDefectDetection", [])],
+                                  depends_on=[directory], rerun=True)
+    assert [result["command"] for result in batch.result(timeout=2)] == ["loadData", "startDefectDetection"]
+    assert directory.done() and batches[0][1] is True
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
+    print("\n=== All Tests Completed Successfully! ===")
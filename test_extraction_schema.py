@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for schema-bound command extraction parsing
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from extraction_schema import parse_extraction
+
+
+def test_valid_response():
+    result = parse_extraction('{"commands": ["loadData", "startDefectDetection"], "filename": "test.fpd", '
+                              '"folder_path": "", "intent": "execute_commands"}')
+    assert result.commands == ["loadData", "startDefectDetection"]
+    assert result.filename == "test.fpd"
+
+
+def test_repairs_fenced_response_with_comments():
+    text = '''Here you go:
+```json
+{"commands": ["setNewDirectory",], // directory change
+ "filename": null, "folder_path": "C:/Data", "intent": "execute_commands"}
+```'''
+    result = parse_extraction(text)
+    assert result.commands == ["setNewDirectory"]
+    assert result.filename == ""
+    assert result.folder_path == "C:/Data"
+
+
+def test_repair_keeps_slashes_inside_values():
+    text = r'''{"commands": ["loadData"], // load it
+ "filename": "http://server/scans/a,}.fpd", "folder_path": "\\\\server//share/data", "intent": "execute_commands",}'''
+    result = parse_extraction(text)
+    assert result.filename == "http://server/scans/a,}.fpd"
+    assert result.folder_path == "\\\\server//share/data"
+
+
+def test_unknown_commands_become_chat():
+    result = parse_extraction('{"commands": "deleteEverything", "filename": "", "folder_path": "", '
+                              '"intent": "execute_commands"}')
+    assert result.commands == []
+    assert result.intent == "chat"
+
+
+def test_unrepairable_response_raises():
+    try:
+        parse_extraction("I cannot help with that.")
+    except ValueError:
+        return
+    raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
+    print("\n=== All Tests Completed Successfully! ===")
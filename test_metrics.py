@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Tests for the metrics registry and its Prometheus /metrics endpoint
+"""
+
+import sys
+import os
+import urllib.request
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import metrics
+from metrics import MetricsRegistry
+from command_process import command_duration, command_responses, telemetry_summary
+
+
+def test_counter_and_histogram_exposition():
+    registry = MetricsRegistry()
+    responses = registry.counter("test_responses_total", "Responses", ("command", "status"))
+    duration = registry.histogram("test_duration_seconds", "Latency", ("command",), buckets=(0.1, 1))
+    responses.inc(command="loadData", status=200)
+    responses.inc(2, command="loadData", status=200)
+    duration.observe(0.05, command="loadData")
+    duration.observe(0.5, command="loadData")
+    duration.observe(5, command="loadData")
+    lines = registry.render().splitlines()
+    assert "# TYPE test_responses_total counter" in lines
+    assert 'test_responses_total{command="loadData",status="200"} 3' in lines
+    assert "# TYPE test_duration_seconds histogram" in lines
+    assert 'test_duration_seconds_bucket{command="loadData",le="0.1"} 1' in lines
+    assert 'test_duration_seconds_bucket{command="loadData",le="1"} 2' in lines
+    assert 'test_duration_seconds_bucket{command="loadData",le="+Inf"} 3' in lines
+    assert 'test_duration_seconds_sum{command="loadData"} 5.55' in lines
+    assert 'test_duration_seconds_count{command="loadData"} 3' in lines
+    assert duration.quantile(0.5, command="loadData") == 1
+    assert duration.quantile(0.9, command="loadData") == float("inf")
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    errors = registry.counter("test_errors_total", "Errors", ("file",))
+    errors.inc(file='C:\\Data\\scan "a".fpd\nnext')
+    assert r'test_errors_total{file="C:\\Data\\scan \"a\".fpd\nnext"} 1' in registry.render()
+
+
+def test_metrics_endpoint_serves_the_registry():
+    server = metrics.start_metrics_server(port=0)
+    try:
+        metrics.registry.counter("test_scrapes_total", "Scrapes").inc()
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+            assert "test_scrapes_total 1" in response.read().decode("utf-8").splitlines()
+    finally:
+        server.shutdown()
+
+
+def test_summary_counts_every_non_200_status_as_error():
+    for status in (200, 200, 500, "error"):
+        command_duration.observe(0.2, command="testSummary")
+        command_responses.inc(command="testSummary", status=status)
+    line = next(line for line in telemetry_summary().splitlines() if "testSummary" in line)
+    assert "calls     4" in line
+    assert "errors  50.0%" in line
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
+    print("\n=== All Tests Completed Successfully! ===")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for the registry of pre-rendered system prompts
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import prompt_registry
+from prompt_registry import PromptRegistry
+
+
+def offline_registry() -> PromptRegistry:
+    """Registry built as if tiktoken were not installed"""
+    available = prompt_registry.TIKTOKEN_AVAILABLE
+    prompt_registry.TIKTOKEN_AVAILABLE = False
+    try:
+        return PromptRegistry()
+    finally:
+        prompt_registry.TIKTOKEN_AVAILABLE = available
+
+
+def test_prompt_is_rendered_once_per_language():
+    registry = offline_registry()
+    calls = []
+
+    def build(language_code):
+        calls.append(language_code)
+        return f"Extract commands. Answer in {language_code}."
+
+    registry.register("master_extraction", build)
+    first = registry.get("master_extraction", "en")
+    assert registry.get("master_extraction", "en") is first
+    assert registry.get("master_extraction", "ko") == "Extract commands. Answer in ko."
+    assert calls == ["en", "ko"]
+    assert registry.metrics()["master_extraction/en"]["hits"] == 1
+
+
+def test_registering_a_new_version_drops_old_renders():
+    registry = offline_registry()
+    registry.register("chat", lambda language_code: "v1")
+    registry.register("filename", lambda language_code: "filename v1")
+    assert registry.get("chat", "en") == "v1"
+    registry.get("filename", "en")
+    registry.register("chat", lambda language_code: "v2")
+    assert registry.get("chat", "en") == "v2"
+    assert registry.metrics()["filename/en"]["hits"] == 0  # other prompt types stay rendered
+    registry.clear()
+    assert registry.metrics() == {}
+
+
+def test_unknown_prompt_type_raises():
+    registry = offline_registry()
+    try:
+        registry.get("missing", "en")
+    except KeyError:
+        return
+    raise AssertionError("KeyError expected")
+
+
+def test_tokens_are_estimated_without_tiktoken():
+    registry = offline_registry()
+    assert registry.tokenizer is None
+    registry.register("chat", lambda language_code: "x" * 400)
+    assert registry.token_count("chat", "en") == 100
+    assert registry.metrics()["chat/en"]["hits"] == 0  # counting does not count as a use
+
+
+def test_tokens_are_counted_with_tiktoken_when_available():
+    registry = PromptRegistry()
+    if registry.tokenizer is None:
+        print("tiktoken or its encoding is not available, skipped")
+        return
+    text = "Load the file scan.fpd and run defect detection."
+    assert registry.count_tokens(text) == len(registry.tokenizer.encode(text))
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
+    print("\n=== All Tests Completed Successfully! ===")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Tests for speech-to-text backend selection and fallback
+"""
+
+import sys
+import os
+
+import numpy as np
+
+# Add the current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from stt_backends import LocalWhisperBackend, WhisperAPIBackend, create_backend
+from voice_engine import VoiceEngine
+
+
+class FakeWhisperClient:
+    """Stands in for the OpenAI client; records every transcription request"""
+    def __init__(self, text="load scan one"):
+        self.requests = []
+        self.text = text
+        self.audio = self
+        self.transcriptions = self
+
+    def create(self, model, file, **options):
+        self.requests.append({"model": model, "file_name": file[0], "bytes": len(file[1]), **options})
+        return type("Transcript", (), {"text": f" {self.text} "})()
+
+
+def test_backends_are_created_by_name():
+    client = FakeWhisperClient()
+    assert isinstance(create_backend("openai", client, codec="wav"), WhisperAPIBackend)
+    for name, backend_client in (("openai", None), ("cloud", client)):
+        try:
+            create_backend(name, backend_client)
+        except ValueError:
+            continue
+        raise AssertionError(f"ValueError expected for backend '{name}'")
+
+
+def test_whisper_api_backend_sends_language_only_when_set():
+    client = FakeWhisperClient()
+    backend = create_backend("openai", client, codec="wav")
+    samples = np.zeros(16000, dtype=np.int16)
+    assert backend.transcribe(samples) == "load scan one"
+    assert backend.transcribe(samples, 16000, "ko") == "load scan one"
+    assert client.requests[0] == {"model": "whisper-1", "file_name": "speech.wav", "bytes": 32044}
+    assert client.requests[1]["language"] == "ko"
+
+
+def test_engine_falls_back_to_the_api_without_a_local_engine():
+    client = FakeWhisperClient()
+    engine = VoiceEngine(client=client)
+    engine.stt_backend = "local"
+    installed = sys.modules.get("faster_whisper")
+    sys.modules["faster_whisper"] = None  # import fails as if faster-whisper were not installed
+    try:
+        engine.configure_backend(warm_up=False)
+    finally:
+        if installed is None:
+            del sys.modules["faster_whisper"]
+        else:
+            sys.modules["faster_whisper"] = installed
+    assert isinstance(engine.backend, WhisperAPIBackend)
+    assert engine.backend.client is client
+
+
+def test_engine_uses_the_local_engine_when_available():
+    try:
+        import faster_whisper  # noqa: F401
+    except ImportError:
+        print("faster-whisper is not installed, skipped")
+        return
+    engine = VoiceEngine(client=FakeWhisperClient())
+    engine.stt_backend = "local"
+    engine.configure_backend(warm_up=False)
+    assert isinstance(engine.backend, LocalWhisperBackend)
+
+
+if __name__ == "__main__":
+    for name, test in list(globals().items()):
+        if name.startswith("test_"):
+            test()
+            print(f"✓ {name}")
+    print("\n=== All Tests Completed Successfully! ===")
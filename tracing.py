@@ -0,0 +1,209 @@
+"""
+Span-based tracing of one user utterance end to end.
+ChatWindow.process_input opens a trace; language detection, GPT extraction, file search,
+command execution and chat calls open spans inside it (also on worker threads, the context
+is copied when work is handed to an executor). When the last span of a trace has finished,
+every span is appended to TRACE_FILE as one JSON line (rotated to TRACE_FILE.1 once it
+reaches TRACE_MAX_BYTES), and with FLAMEGRAPH_SUMMARY enabled (PAUT_TRACE_FLAMEGRAPH=1) an
+indented timeline of the utterance is printed.
+
+Spans opened outside of a trace cost nothing and are not recorded.
+"""
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+from functools import wraps
+from typing import Callable, List, Optional
+
+TRACE_FILE = "traces.jsonl"
+TRACE_MAX_BYTES = 5 * 1024 * 1024
+FLAMEGRAPH_SUMMARY = os.environ.get("PAUT_TRACE_FLAMEGRAPH", "") == "1"
+FLAMEGRAPH_WIDTH = 40
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+_export_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, trace: "Trace", name: str, parent: Optional["Span"], attributes: dict):
+        self.trace = trace
+        self.name = name
+        self.id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.id if parent else None
+        self.attributes = attributes
+        self.thread = threading.current_thread().name
+        self.start = time.perf_counter()
+        self.end = None
+        self.error = None
+
+
+class Trace:
+    """Spans of one utterance; finished (and exported) when no span or hold is open any more"""
+    def __init__(self, name: str):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.wall_start = time.time()
+        self.spans: List[Span] = []
+        self.open = 0
+        self.lock = threading.Lock()
+
+    def _acquire(self):
+        with self.lock:
+            self.open += 1
+
+    def _release(self):
+        with self.lock:
+            self.open -= 1
+            finished = self.open == 0
+        if finished:
+            _export(self)
+
+
+@contextmanager
+def _enter(trace: Trace, name: str, parent: Optional[Span], attributes: dict):
+    current = Span(trace, name, parent, attributes)
+    trace._acquire()
+    with trace.lock:
+        trace.spans.append(current)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end = time.perf_counter()
+        _current_span.reset(token)
+        trace._release()
+
+
+@contextmanager
+def start_trace(name: str, **attributes):
+    """Open the root span of a new trace"""
+    trace = Trace(name)
+    with _enter(trace, name, None, attributes) as root:
+        yield root
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """Open a child span of the current span (no-op outside of a trace)"""
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    with _enter(parent.trace, name, parent, attributes) as current:
+        yield current
+
+
+def traced(name: Optional[str] = None):
+    """Decorator running the function inside a span"""
+    def decorator(function: Callable):
+        span_name = name or function.__name__
+
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def hold() -> Callable[..., None]:
+    """
+    Keep the current trace open for work that starts later on another thread
+    (e.g. a queued command). Returns the function that releases the hold.
+    """
+    current = _current_span.get()
+    if current is None:
+        return lambda *_: None
+    trace = current.trace
+    trace._acquire()
+    released = threading.Event()
+
+    def release(*_):
+        if not released.is_set():
+            released.set()
+            trace._release()
+    return release
+
+
+def bind(function: Callable) -> Callable:
+    """
+    Wrap a function so it runs in the current trace context on another thread; the trace
+    stays open until the wrapped function has returned
+    """
+    context = contextvars.copy_context()
+    release = hold()
+
+    @wraps(function)
+    def runner(*args, **kwargs):
+        try:
+            return context.run(function, *args, **kwargs)
+        finally:
+            release()
+    return runner
+
+
+def _export(trace: Trace):
+    root_start = trace.spans[0].start
+    records = []
+    for current in trace.spans:
+        record = {
+            "trace_id": trace.id,
+            "span_id": current.id,
+            "parent_id": current.parent_id,
+            "name": current.name,
+            "start_ms": round((current.start - root_start) * 1000, 3),
+            "duration_ms": round(((current.end or current.start) - current.start) * 1000, 3),
+            "thread": current.thread,
+            "timestamp": trace.wall_start,
+        }
+        if current.attributes:
+            record["attributes"] = {key: str(value) for key, value in current.attributes.items()}
+        if current.error:
+            record["error"] = current.error
+        records.append(record)
+    with _export_lock:
+        try:
+            if os.path.exists(TRACE_FILE) and os.path.getsize(TRACE_FILE) >= TRACE_MAX_BYTES:
+                os.replace(TRACE_FILE, TRACE_FILE + ".1")
+            with open(TRACE_FILE, "a", encoding="utf-8") as f:
+                for record in records:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as e:
+            print(f"Could not write trace file {TRACE_FILE}: {e}")
+        if FLAMEGRAPH_SUMMARY:
+            print(flamegraph(records))
+
+
+def flamegraph(records: List[dict], width: int = FLAMEGRAPH_WIDTH) -> str:
+    """
+    Flamegraph-style timeline of one trace: one row per span, indented by depth, with a bar
+    placed and sized relative to the whole trace
+    """
+    if not records:
+        return ""
+    children = {}
+    for record in records:
+        children.setdefault(record["parent_id"], []).append(record)
+    total = max(record["start_ms"] + record["duration_ms"] for record in records) or 1.0
+    lines = [f"Trace {records[0]['name']} ({total:.0f} ms)"]
+
+    def walk(record, depth):
+        offset = int(record["start_ms"] / total * width)
+        length = max(1, int(record["duration_ms"] / total * width))
+        bar = " " * offset + "█" * min(length, width - offset)
+        label = ("  " * depth + record["name"])[:36]
+        marker = " !" if "error" in record else ""
+        lines.append(f"{label:<36} |{bar:<{width}}| {record['duration_ms']:9.1f} ms{marker}")
+        for child in sorted(children.get(record["span_id"], []), key=lambda item: item["start_ms"]):
+            walk(child, depth + 1)
+
+    for root in children.get(None, []):
+        walk(root, 0)
+    return "\n".join(lines)
@@ -0,0 +1,142 @@
+"""
+Voice activity detection that cuts a live recording into speech segments.
+Every 30 ms frame is classified with an adaptive energy threshold (relative to a running
+noise floor) plus a spectral check (share of energy in the speech band), so steady fan or
+hum noise does not open a segment. A segment ends after a short hangover of silence, or is
+cut when it gets too long, and is handed out immediately for transcription.
+"""
+from collections import deque
+from typing import List
+
+import numpy as np
+
+
+class SpeechSegmenter:
+    """
+    Streaming energy/spectral VAD.
+
+    Args:
+        sample_rate: Sample rate of the audio fed in
+        frame_ms: Analysis frame length
+        threshold_ratio: Frame energy over the noise floor needed to count as speech
+        min_rms: Absolute RMS (full scale 1.0) below which a frame is always silence
+        speech_band: Frequency band (Hz) holding most of the speech energy
+        band_ratio: Share of the frame energy that has to lie in the speech band
+        start_frames: Consecutive speech frames needed to open a segment
+        hangover_ms: Silence that closes a segment
+        pre_roll_ms: Audio kept before the segment start (soft word onsets)
+        min_speech_ms: Shorter segments are dropped as clicks
+        max_segment_s: Segments are cut at this length so long utterances stream too
+    """
+    def __init__(self, sample_rate: int = 16000, frame_ms: int = 30, threshold_ratio: float = 3.0,
+                 min_rms: float = 0.003, speech_band=(80, 4000), band_ratio: float = 0.6,
+                 start_frames: int = 3, hangover_ms: int = 500, pre_roll_ms: int = 240,
+                 min_speech_ms: int = 250, max_segment_s: float = 15.0):
+        self.sample_rate = sample_rate
+        self.frame_length = int(sample_rate * frame_ms / 1000)
+        self.threshold_ratio = threshold_ratio
+        self.min_rms = min_rms
+        self.band_ratio = band_ratio
+        self.start_frames = start_frames
+        self.hangover_frames = max(1, hangover_ms // frame_ms)
+        self.min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self.max_segment_frames = int(max_segment_s * 1000 / frame_ms)
+
+        frequencies = np.fft.rfftfreq(self.frame_length, 1.0 / sample_rate)
+        self.band = (frequencies >= speech_band[0]) & (frequencies <= speech_band[1])
+        self.window = np.hanning(self.frame_length).astype(np.float32)
+
+        self.pending = np.zeros(0, dtype=np.float32)
+        self.pre_roll = deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self.noise_floor = None
+        self.segment: List[np.ndarray] = []
+        self.in_speech = False
+        self.speech_run = 0
+        self.silence_run = 0
+        self.voiced_frames = 0
+
+    def is_speech(self, frame: np.ndarray) -> bool:
+        """Classify one frame (float32, full scale 1.0) and update the noise floor"""
+        rms = float(np.sqrt(np.mean(frame * frame)))
+        if self.noise_floor is None:
+            self.noise_floor = max(rms, self.min_rms / self.threshold_ratio)
+        loud = rms > self.min_rms and rms > self.noise_floor * self.threshold_ratio
+        speech = False
+        if loud:
+            spectrum = np.abs(np.fft.rfft(frame * self.window)) ** 2
+            total = float(spectrum.sum())
+            speech = total > 0 and float(spectrum[self.band].sum()) / total >= self.band_ratio
+        if not speech:
+            # Track the background level; rise slowly so speech tails do not lift it much
+            rate = 0.05 if rms > self.noise_floor else 0.2
+            self.noise_floor += rate * (rms - self.noise_floor)
+            self.noise_floor = max(self.noise_floor, 1e-5)
+        return speech
+
+    def feed(self, samples: np.ndarray) -> List[np.ndarray]:
+        """
+        Add recorded audio
+
+        Args:
+            samples: Mono int16 or float32 samples
+
+        Returns:
+            Finished speech segments (int16 arrays), usually empty
+        """
+        if samples.dtype == np.int16:
+            samples = samples.astype(np.float32) / 32768.0
+        samples = samples.reshape(-1).astype(np.float32, copy=False)
+        self.pending = np.concatenate((self.pending, samples)) if self.pending.size else samples
+        finished = []
+        frame_count = len(self.pending) // self.frame_length
+        for index in range(frame_count):
+            frame = self.pending[index * self.frame_length:(index + 1) * self.frame_length]
+            segment = self._process_frame(frame)
+            if segment is not None:
+                finished.append(segment)
+        self.pending = self.pending[frame_count * self.frame_length:].copy()
+        return finished
+
+    def _process_frame(self, frame: np.ndarray):
+        speech = self.is_speech(frame)
+        if not self.in_speech:
+            self.pre_roll.append(frame)
+            self.speech_run = self.speech_run + 1 if speech else 0
+            if self.speech_run >= self.start_frames:
+                self.in_speech = True
+                self.segment = list(self.pre_roll)
+                self.pre_roll.clear()
+                self.voiced_frames = self.speech_run
+                self.silence_run = 0
+            return None
+
+        self.segment.append(frame)
+        if speech:
+            self.voiced_frames += 1
+            self.silence_run = 0
+        else:
+            self.silence_run += 1
+        if self.silence_run >= self.hangover_frames or len(self.segment) >= self.max_segment_frames:
+            return self._close_segment()
+        return None
+
+    def _close_segment(self):
+        segment, voiced = self.segment, self.voiced_frames
+        self.segment = []
+        self.in_speech = False
+        self.speech_run = 0
+        self.silence_run = 0
+        self.voiced_frames = 0
+        if voiced < self.min_speech_frames:
+            return None
+        return (np.clip(np.concatenate(segment), -1.0, 1.0) * 32767).astype(np.int16)
+
+    def flush(self) -> List[np.ndarray]:
+        """Close the open segment at the end of the recording"""
+        if self.in_speech:
+            if self.pending.size:
+                self.segment.append(self.pending)
+                self.pending = np.zeros(0, dtype=np.float32)
+            segment = self._close_segment()
+            return [segment] if segment is not None else []
+        return []
@@ -0,0 +1,451 @@
+"""
+The one audio-to-text engine behind every voice front end.
+VoiceEngine owns the whole pipeline: capture into the lock-free AudioBuffer (sounddevice
+callback, pyaudio fallback), the consumer thread with level metering and the streaming VAD,
+silence trimming and gain normalization, and the speech-to-text backend (Whisper API with a
+compressed upload, or local faster-whisper). The Qt recognizers in voice_recognition.py and
+voice_recognition_improved.py and ai_functions_keeper_updated.extract_text are thin
+adapters, so every change here applies to all of them.
+
+Results are reported through callbacks, called from worker threads:
+    on_transcription(text), on_partial(text), on_error(message), on_status(recording),
+    on_level(rms_percent, peak_percent)
+"""
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+import numpy as np
+from openai import OpenAI
+
+from audio_buffer import AudioBuffer
+from audio_encoding import DebugAudioWriter, wav_bytes
+from audio_metering import LevelMeter
+from audio_preprocessing import normalize_gain, prepare_for_transcription
+from metrics import registry
+from stt_backends import create_backend
+
+# Capture health, exposed on /metrics (see metrics.py)
+input_overflows = registry.counter("voice_input_overflows_total",
+                                   "Audio blocks lost because the capture callback ran late")
+input_underflows = registry.counter("voice_input_underflows_total",
+                                    "Capture callbacks reporting an input underflow")
+samples_dropped = registry.counter("voice_samples_dropped_total",
+                                   "Samples overwritten because a recording exceeded max_recording_seconds")
+consumer_lag = registry.histogram("voice_consumer_lag_seconds",
+                                  "Audio waiting for level metering and the VAD when the consumer ran")
+
+BLOCK_SIZE = 1024
+MIN_RECORDING_SECONDS = 0.16  # was a 5 KB WAV file
+
+
+def load_openai_client():
+    """OpenAI client from key.txt (None if the key is missing)"""
+    try:
+        with open(os.path.join(os.path.dirname(__file__), 'key.txt'), 'r') as file:
+            client = OpenAI(api_key=file.read().strip())
+            print("Voice engine OpenAI client initialized successfully")
+            return client
+    except Exception as e:
+        print(f"Error initializing OpenAI client for voice recognition: {e}")
+        return None
+
+
+def _ignore(*_):
+    pass
+
+
+_default_engine = None
+_default_engine_lock = threading.Lock()
+
+
+def set_default_engine(engine: "VoiceEngine"):
+    """Make an engine (the GUI recognizer's, with its backend, codec and language) the shared one"""
+    global _default_engine
+    with _default_engine_lock:
+        _default_engine = engine
+
+
+def default_engine(client=None) -> "VoiceEngine":
+    """
+    The engine used by callers without a recognizer of their own (extract_text): the one
+    registered with set_default_engine, else one created on first use from client
+    """
+    global _default_engine
+    with _default_engine_lock:
+        if _default_engine is None:
+            _default_engine = VoiceEngine(client if client is not None else load_openai_client())
+            _default_engine.configure_backend(warm_up=False)
+        return _default_engine
+
+
+class VoiceEngine:
+    """
+    Capture, preprocessing and transcription of voice input.
+
+    Args:
+        client: OpenAI client for the API backend (None: only the local backend can work)
+        on_transcription: Called with the final text of a recording
+        on_partial: Called with the text recognized so far (streaming mode)
+        on_error: Called with an error message
+        on_status: Called with True/False when recording starts/stops
+        on_level: Called with RMS and peak level (percent of full scale) at most level_rate_hz times a second
+    """
+    def __init__(self, client=None, on_transcription: Callable = None, on_partial: Callable = None,
+                 on_error: Callable = None, on_status: Callable = None, on_level: Callable = None):
+        self.client = client
+        self.on_transcription = on_transcription or _ignore
+        self.on_partial = on_partial or _ignore
+        self.on_error = on_error or _ignore
+        self.on_status = on_status or _ignore
+        self.on_level = on_level or _ignore
+
+        self.recording = False
+        self.sample_rate = 16000  # 16kHz is optimal for Whisper
+        self.channels = 1  # Mono audio
+        self.max_recording_seconds = 300  # Older audio is dropped from longer recordings
+        self.audio_buffer = None
+        self.consumed = 0  # Buffer position up to which level and VAD have seen the audio
+        self.recording_thread = None
+        self.consumer_thread = None
+        self.consumer_interval = 0.05
+        self.level_meter = LevelMeter(self.sample_rate, window_ms=100, rate_hz=20)
+        # Written only by the capture callback, published to the metrics by the consumer
+        self.overflows = 0
+        self.underflows = 0
+        self.language = None  # None: Whisper detects the language
+        self.debug_mode = False  # Set to True to keep the transcribed recordings in debug_audio/
+        self.debug_writer = None
+        self.upload_codec = "flac"  # "wav", "flac" (lossless) or "opus"; see audio_encoding.CODECS
+
+        # Speech-to-text engine: "openai" (Whisper API) or "local" (faster-whisper on the CPU,
+        # works offline); see stt_backends.py. Call configure_backend() after changing these.
+        self.stt_backend = "openai"
+        self.local_model_size = "base"
+        self.stt_threads = 4
+        self.backend = None
+
+        # Streaming mode: a VAD cuts speech segments while recording and each one is
+        # transcribed in the background, so the text is ready right after the user stops
+        self.streaming = True
+        self.segmenter = None
+        self.segment_futures = []
+        self.segment_lock = threading.Lock()
+        self.transcribe_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="transcribe")
+
+        # Hands-free recordings (wake word) stop by themselves: after the first utterance, or
+        # when nothing is said within auto_stop_timeout seconds
+        self.auto_stop = False
+        self.auto_stop_timeout = 5.0
+        self.auto_stopping = False
+
+    def configure_backend(self, warm_up: bool = True):
+        """(Re)create the speech-to-text backend from the settings and warm it up in the background"""
+        try:
+            if self.stt_backend == "local":
+                self.backend = create_backend("local", model_size=self.local_model_size, cpu_threads=self.stt_threads)
+            else:
+                self.backend = create_backend("openai", self.client, codec=self.upload_codec)
+        except (ImportError, ValueError) as e:
+            print(f"Speech-to-text backend '{self.stt_backend}' unavailable: {e}")
+            self.backend = None
+            if self.stt_backend != "openai" and self.client is not None:
+                print("Falling back to the Whisper API")
+                self.backend = create_backend("openai", self.client, codec=self.upload_codec)
+        if self.backend is not None and warm_up:
+            threading.Thread(target=self._warm_up_backend, args=(self.backend,), daemon=True).start()
+
+    def _warm_up_backend(self, backend):
+        try:
+            backend.warm_up()
+        except Exception as e:
+            print(f"Warm-up of the {backend.name} speech-to-text backend failed: {e}")
+
+    # ---------------------------------------------------------------- recording
+
+    def start(self, source: Optional[Callable] = None, auto_stop: bool = False):
+        """
+        Start recording
+
+        Args:
+            source: Replaces the microphone: called on the capture thread with the AudioBuffer,
+                    writes samples into it until it returns (benchmark harness, wake-word listener)
+            auto_stop: Stop by itself at the end of the utterance (needs the VAD, so it implies streaming)
+        """
+        if self.recording:
+            return
+        self.recording = True
+        self.auto_stop = auto_stop
+        self.auto_stopping = False
+        self.audio_buffer = AudioBuffer(self.sample_rate, self.max_recording_seconds)
+        self.consumed = 0
+        self.overflows = self.underflows = 0
+        self.segment_futures = []
+        self.segmenter = None
+        if self.streaming or auto_stop:
+            try:
+                from voice_activity import SpeechSegmenter
+                self.segmenter = SpeechSegmenter(self.sample_rate)
+            except ImportError as e:
+                print(f"Streaming transcription unavailable ({e}), using whole-recording mode")
+        self.on_status(True)
+
+        target = self._record_audio if source is None else source
+        args = () if source is None else (self.audio_buffer,)
+        self.recording_thread = threading.Thread(target=target, args=args, name="audio-capture", daemon=True)
+        self.recording_thread.start()
+        # Level metering and the VAD run on their own thread so capture never waits for them
+        self.consumer_thread = threading.Thread(target=self._consume_loop, name="audio-consumer", daemon=True)
+        self.consumer_thread.start()
+
+    def stop(self):
+        """Stop recording; the transcription is reported through on_transcription / on_error"""
+        if not self.recording:
+            return
+        self.recording = False
+        self.on_status(False)
+
+        if self.recording_thread:
+            self.recording_thread.join(timeout=2.0)  # Add timeout to prevent hanging
+        if self.consumer_thread:
+            self.consumer_thread.join(timeout=2.0)
+
+        # Only the last segment (streaming) or the whole recording is still to be
+        # transcribed; do that off the caller's (GUI) thread
+        finish = self._finish_streaming if self.segmenter is not None else self._process_audio
+        threading.Thread(target=finish, name="voice-finish", daemon=True).start()
+
+    def _record_audio(self):
+        """Record audio in a separate thread with improved quality"""
+        try:
+            # Try to import sounddevice here to avoid import errors
+            try:
+                import sounddevice as sd
+
+                def callback(indata, frames, time_info, status):
+                    # Runs on the PortAudio thread: copy and count only, no locks, no printing
+                    if status.input_overflow:
+                        self.overflows += 1
+                    if status.input_underflow:
+                        self.underflows += 1
+                    self.audio_buffer.write(indata[:, 0])
+
+                # The stream copies every block into the preallocated buffer from its own callback;
+                # a high-latency (larger) host buffer rides out CPU spikes without losing blocks
+                with sd.InputStream(samplerate=self.sample_rate, channels=self.channels,
+                                    dtype='int16', blocksize=BLOCK_SIZE, latency='high', callback=callback):
+                    print("Recording started with sounddevice...")
+
+                    while self.recording:
+                        time.sleep(0.05)
+
+                    print("Recording stopped.")
+            except ImportError:
+                # Fallback to pyaudio if sounddevice is not available
+                import pyaudio
+
+                p = pyaudio.PyAudio()
+                stream = p.open(format=pyaudio.paInt16,
+                                channels=self.channels,
+                                rate=self.sample_rate,
+                                input=True,
+                                frames_per_buffer=BLOCK_SIZE)
+
+                print("Recording started with pyaudio...")
+
+                while self.recording:
+                    data = stream.read(BLOCK_SIZE, exception_on_overflow=False)
+                    self.audio_buffer.write(np.frombuffer(data, dtype=np.int16))
+
+                stream.stop_stream()
+                stream.close()
+                p.terminate()
+                print("Recording stopped.")
+
+        except Exception as e:
+            self.recording = False
+            self.on_error(f"Error during recording: {str(e)}")
+            print(f"Error during recording: {e}")
+            import traceback
+            traceback.print_exc()
+
+    def _consume_loop(self):
+        """Consumer thread: process new audio until the capture thread has finished, then a last time"""
+        reported_overflows = reported_underflows = reported_dropped = 0
+        while True:
+            capturing = self.recording_thread.is_alive()
+            self._consume_audio()
+            if self.overflows > reported_overflows:
+                print(f"Audio input overflowed ({self.overflows - reported_overflows} blocks)")
+                input_overflows.inc(self.overflows - reported_overflows)
+                reported_overflows = self.overflows
+            if self.underflows > reported_underflows:
+                input_underflows.inc(self.underflows - reported_underflows)
+                reported_underflows = self.underflows
+            if self.audio_buffer.dropped > reported_dropped:
+                samples_dropped.inc(self.audio_buffer.dropped - reported_dropped)
+                reported_dropped = self.audio_buffer.dropped
+            if not capturing:
+                return
+            time.sleep(self.consumer_interval)
+
+    def _consume_audio(self):
+        """Run level metering and the VAD over the audio recorded since the last call"""
+        end = self.audio_buffer.written
+        if end <= self.consumed:
+            return
+        consumer_lag.observe((end - self.consumed) / self.sample_rate)
+        chunk = self.audio_buffer.view(self.consumed, end)  # zero-copy view of the new samples
+        self.consumed = end
+        if self.level_meter.due():
+            # Coalesced: only the level of the latest window crosses into the GUI thread
+            window = self.audio_buffer.view(end - self.level_meter.window, end)
+            rms, peak = self.level_meter.measure(window)
+            self.on_level(rms * 100, peak * 100)  # Scale for better visualization
+        if self.segmenter is not None:
+            for segment in self.segmenter.feed(chunk):
+                self._submit_segment(segment)
+        if self.auto_stop and not self.auto_stopping and self.recording:
+            spoke = bool(self.segment_futures) and not self.segmenter.in_speech
+            silent_too_long = not self.segment_futures and not self.segmenter.in_speech and \
+                end >= self.auto_stop_timeout * self.sample_rate
+            if spoke or silent_too_long:
+                self.auto_stopping = True
+                # stop() joins this thread, so it has to run on another one
+                threading.Thread(target=self.stop, name="voice-auto-stop", daemon=True).start()
+
+    # ------------------------------------------------------------ transcription
+
+    def _submit_segment(self, segment):
+        duration = len(segment) / self.sample_rate
+        print(f"Speech segment of {duration:.2f}s detected, transcribing in background")
+        # Segments are already cut at speech boundaries by the VAD, only the gain is normalized
+        future = self.transcribe_executor.submit(self._transcribe_samples, normalize_gain(segment))
+        with self.segment_lock:
+            self.segment_futures.append(future)
+        future.add_done_callback(lambda _: self._emit_partial())
+
+    def _emit_partial(self):
+        """Report the text of all segments finished so far, in recording order"""
+        texts = []
+        with self.segment_lock:
+            futures = list(self.segment_futures)
+        for future in futures:
+            if not future.done() or future.exception() is not None:
+                break
+            if future.result():
+                texts.append(future.result())
+        if texts:
+            self.on_partial(" ".join(texts))
+
+    def _transcribe_samples(self, samples, language: Optional[str] = None):
+        """
+        Transcribe 16-bit mono samples with the configured speech-to-text backend
+
+        Returns:
+            str: Transcribed text ("" if none was returned)
+        """
+        self._save_debug_audio(samples)
+        text = self.backend.transcribe(samples, self.sample_rate, language or self.language)
+        print(f"Transcribed ({self.backend.name}): {text}")
+        return text
+
+    def transcribe(self, samples, language: Optional[str] = None) -> str:
+        """
+        Trim, normalize and transcribe a complete recording (blocking)
+
+        Args:
+            samples: 16-bit mono samples at sample_rate, as a NumPy array or raw PCM bytes
+            language: Language code (default: the engine language)
+
+        Returns:
+            str: Transcribed text ("" if the recording holds no speech)
+
+        Raises:
+            RuntimeError: No speech-to-text backend is available
+        """
+        if self.backend is None:
+            self.configure_backend(warm_up=False)
+            if self.backend is None:
+                raise RuntimeError("No speech-to-text backend available (OpenAI client not initialized)")
+        if not isinstance(samples, np.ndarray):
+            samples = np.frombuffer(samples, dtype=np.int16)
+        if len(samples) < MIN_RECORDING_SECONDS * self.sample_rate:
+            return ""
+        prepared = prepare_for_transcription(samples, self.sample_rate)
+        if prepared is None:
+            print(f"No speech detected in {len(samples) / self.sample_rate:.2f}s recording, not transcribing")
+            return ""
+        print(f"Trimmed recording from {len(samples) / self.sample_rate:.2f}s to "
+              f"{len(prepared) / self.sample_rate:.2f}s")
+        return self._transcribe_samples(prepared, language)
+
+    def _finish_streaming(self):
+        """Transcribe the open segment and report the full text of the recording"""
+        if self.backend is None:
+            self.on_error("No speech-to-text backend available (OpenAI client not initialized)")
+            return
+        stopped = time.perf_counter()
+        for segment in self.segmenter.flush():
+            self._submit_segment(segment)
+        with self.segment_lock:
+            futures = list(self.segment_futures)
+
+        texts = []
+        try:
+            for future in futures:
+                text = future.result()
+                if text:
+                    texts.append(text)
+        except Exception as e:
+            print(f"Segment transcription failed ({e}), transcribing the whole recording")
+            texts = []
+
+        if not texts:
+            # No speech found by the VAD (or a segment failed): fall back to the whole recording,
+            # which is rejected locally if it really holds no speech
+            self._process_audio()
+            return
+        transcribed_text = " ".join(texts)
+        print(f"Transcribed {len(futures)} segments, {time.perf_counter() - stopped:.2f}s after stop: {transcribed_text}")
+        self.on_transcription(transcribed_text)
+
+    def _process_audio(self):
+        """Transcribe the whole recording and report the result"""
+        if self.audio_buffer is None or not self.audio_buffer.written:
+            self.on_error("No audio recorded")
+            return
+
+        if self.backend is None:
+            self.on_error("No speech-to-text backend available (OpenAI client not initialized)")
+            return
+
+        samples = self.audio_buffer.samples()
+        # Check if the recording is too short (likely no audio)
+        if len(samples) < MIN_RECORDING_SECONDS * self.sample_rate:
+            self.on_error("Audio recording too short or no audio detected")
+            return
+
+        try:
+            print(f"Transcribing audio with language: {self.language or 'auto-detect'}")
+            transcribed_text = self.transcribe(samples)
+            if transcribed_text:
+                self.on_transcription(transcribed_text)
+            else:
+                self.on_error("No speech detected in the recording")
+        except Exception as e:
+            name = self.backend.name if self.backend is not None else "none"
+            self.on_error(f"Transcription error ({name}): {str(e)}")
+            print(f"Transcription error ({name}): {e}")
+            import traceback
+            traceback.print_exc()
+
+    def _save_debug_audio(self, samples):
+        """Keep a copy of the transcribed audio in debug mode (written in the background, folder size capped)"""
+        if not self.debug_mode:
+            return
+        if self.debug_writer is None:
+            self.debug_writer = DebugAudioWriter()
+        self.debug_writer.save(wav_bytes(samples, self.sample_rate, self.channels))
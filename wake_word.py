@@ -0,0 +1,300 @@
+"""
+Hands-free voice input: an always-on wake-word listener.
+While the chat window is idle, WakeWordListener keeps a microphone stream open and runs a
+tiny keyword spotter on it. When the wake word is heard, recording of the command starts
+(VoiceEngine with auto_stop, so it ends by itself after the utterance).
+
+The spotter is built to be cheap enough to run all the time:
+  - the audio is decimated from 16 kHz to 8 kHz and processed every 100 ms off the
+    capture callback (the callback only copies into an AudioBuffer, as in VoiceEngine);
+  - an energy/spectral VAD (SpeechSegmenter) gates everything else, so silence and steady
+    background noise cost one small FFT per 30 ms frame;
+  - only short speech bursts of wake-word length are compared, by DTW over log-mel
+    features, with a few recorded examples of the wake word (the templates in
+    WAKE_WORD_DIR, 16 kHz mono WAV files; record them with enroll()).
+
+CPU time of the listener and detection latency (end of the word to detection) are exported
+on /metrics as voice_wake_cpu_seconds_total and voice_wake_detection_seconds.
+"""
+import os
+import time
+import wave
+import threading
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from audio_buffer import AudioBuffer
+from audio_encoding import wav_bytes
+from metrics import registry
+from voice_activity import SpeechSegmenter
+
+WAKE_WORD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "wake_word")
+DETECTION_THRESHOLD = 0.8
+
+wake_cpu = registry.counter("voice_wake_cpu_seconds_total", "CPU time used by the wake-word listener")
+wake_detections = registry.counter("voice_wake_detections_total", "Wake-word detections")
+wake_latency = registry.histogram("voice_wake_detection_seconds",
+                                  "Time from the end of the wake word to its detection")
+
+
+def log_mel_features(samples: np.ndarray, sample_rate: int = 8000, bands: int = 20) -> np.ndarray:
+    """
+    Log mel filterbank energies, 25 ms frames every 10 ms, with the per-band mean removed
+
+    Returns:
+        np.ndarray: (frames, bands) features
+    """
+    frame_length, hop = int(0.025 * sample_rate), int(0.010 * sample_rate)
+    if len(samples) < frame_length:
+        return np.zeros((0, bands), dtype=np.float32)
+    count = 1 + (len(samples) - frame_length) // hop
+    index = np.arange(frame_length)[None, :] + hop * np.arange(count)[:, None]
+    frames = samples[index] * np.hamming(frame_length)
+    n_fft = 1 << (frame_length - 1).bit_length()
+    power = np.abs(np.fft.rfft(frames, n_fft)) ** 2
+    energies = np.log(power @ _mel_filters(sample_rate, n_fft, bands).T + 1e-10)
+    return (energies - energies.mean(axis=0)).astype(np.float32)
+
+
+_filter_cache = {}
+
+
+def _mel_filters(sample_rate: int, n_fft: int, bands: int) -> np.ndarray:
+    key = (sample_rate, n_fft, bands)
+    if key not in _filter_cache:
+        mel = lambda hz: 2595 * np.log10(1 + hz / 700.0)
+        hz = lambda m: 700 * (10 ** (m / 2595.0) - 1)
+        edges = hz(np.linspace(mel(100), mel(sample_rate / 2 - 200), bands + 2))
+        bins = np.fft.rfftfreq(n_fft, 1.0 / sample_rate)
+        filters = np.zeros((bands, len(bins)))
+        for band in range(bands):
+            low, center, high = edges[band:band + 3]
+            rising = (bins - low) / (center - low)
+            falling = (high - bins) / (high - center)
+            filters[band] = np.clip(np.minimum(rising, falling), 0, None)
+        _filter_cache[key] = filters
+    return _filter_cache[key]
+
+
+def dtw_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """Dynamic time warping distance of two feature sequences, per step of the warping path"""
+    cost = np.sqrt(((a[:, None, :] - b[None, :, :]) ** 2).mean(axis=2))
+    n, m = cost.shape
+    total = np.full((n + 1, m + 1), np.inf)
+    total[0, 0] = 0.0
+    for i in range(1, n + 1):
+        row, previous = total[i], total[i - 1]
+        for j in range(1, m + 1):
+            row[j] = cost[i - 1, j - 1] + min(previous[j], row[j - 1], previous[j - 1])
+    return float(total[n, m] / (n + m))
+
+
+class KeywordSpotter:
+    """
+    Template-matching keyword spotter on a decimated stream.
+
+    Args:
+        templates: Recordings of the wake word (int16, sample_rate)
+        sample_rate: Sample rate of the audio fed in (decimated by 2 internally)
+        threshold: Highest DTW distance that still counts as the wake word
+    """
+    def __init__(self, templates: List[np.ndarray], sample_rate: int = 16000, threshold: float = DETECTION_THRESHOLD):
+        if not templates:
+            raise ValueError("At least one wake-word template is required")
+        self.sample_rate = sample_rate
+        self.rate = sample_rate // 2
+        self.threshold = threshold
+        self.templates = []
+        for template in templates:
+            self.templates.append(log_mel_features(self._decimate(template)))
+        lengths = [len(features) / 100.0 for features in self.templates]  # 10 ms frames
+        self.min_seconds = 0.6 * min(lengths)
+        self.max_seconds = 1.5 * max(lengths) + 0.3
+        self.hangover_ms = 200
+        self.reset(0)  # position: samples fed so far, at sample_rate
+
+    def reset(self, position: int):
+        """Drop the partial state and continue at an absolute position (audio in between is skipped)"""
+        self.segmenter = SpeechSegmenter(self.rate, hangover_ms=self.hangover_ms, pre_roll_ms=60,
+                                         min_speech_ms=150, max_segment_s=self.max_seconds + 0.5)
+        self.odd_sample = None
+        self.position = position
+
+    @staticmethod
+    def _decimate(samples: np.ndarray) -> np.ndarray:
+        """16 -> 8 kHz: average sample pairs (a two-tap low-pass) and keep every second one"""
+        samples = samples.astype(np.float32) / 32768.0
+        even = len(samples) - len(samples) % 2
+        return samples[:even].reshape(-1, 2).mean(axis=1)
+
+    def feed(self, samples: np.ndarray) -> Optional[dict]:
+        """
+        Add int16 audio
+
+        Returns:
+            dict: distance and word_end (position at sample_rate) when the wake word was heard, else None
+        """
+        start = self.position - (1 if self.odd_sample is not None else 0)
+        self.position += len(samples)
+        if self.odd_sample is not None:
+            samples = np.concatenate(([self.odd_sample], samples))
+            self.odd_sample = None
+        if len(samples) % 2:
+            self.odd_sample = samples[-1]
+            samples = samples[:-1]
+        decimated = self._decimate(samples)
+        hangover = int(self.hangover_ms / 1000 * self.sample_rate)
+        step = self.segmenter.frame_length
+        detection = None
+        # One VAD frame at a time, so the end of a segment is known to within a frame
+        for offset in range(0, len(decimated), step):
+            for segment in self.segmenter.feed(decimated[offset:offset + step]):
+                duration = len(segment) / self.rate
+                if not self.min_seconds <= duration <= self.max_seconds:
+                    continue
+                features = log_mel_features(segment.astype(np.float32) / 32768.0, self.rate)
+                distance = min(dtw_distance(features, template) for template in self.templates)
+                if distance <= self.threshold:
+                    word_end = start + 2 * min(offset + step, len(decimated)) - hangover
+                    detection = {"distance": distance, "word_end": word_end}
+        return detection
+
+    @classmethod
+    def from_folder(cls, folder: str = WAKE_WORD_DIR, **options) -> "KeywordSpotter":
+        """Spotter with every 16 kHz mono WAV of the folder as template"""
+        templates = []
+        if os.path.isdir(folder):
+            for name in sorted(os.listdir(folder)):
+                if name.lower().endswith(".wav"):
+                    with wave.open(os.path.join(folder, name), "rb") as wf:
+                        templates.append(np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16))
+        return cls(templates, **options)
+
+
+def enroll(samples: np.ndarray, sample_rate: int = 16000, folder: str = WAKE_WORD_DIR) -> str:
+    """Save a recording of the wake word (trimmed to the speech) as a template; returns its path"""
+    from audio_preprocessing import speech_bounds
+    bounds = speech_bounds(samples, sample_rate, margin_ms=50)
+    if bounds is None:
+        raise ValueError("No speech in the wake-word recording")
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, f"wake_{time.strftime('%Y%m%d_%H%M%S')}.wav")
+    with open(path, "wb") as f:
+        f.write(wav_bytes(samples[bounds[0]:bounds[1]], sample_rate))
+    return path
+
+
+class WakeWordListener:
+    """
+    Always-on microphone listener that starts a VoiceEngine recording on the wake word.
+
+    The listener owns the only microphone stream: while the engine records, the listener
+    forwards its captured audio into the engine's buffer (VoiceEngine.start(source=...)),
+    and keyword spotting is paused.
+
+    Args:
+        engine: VoiceEngine that records the command after the wake word
+        spotter: KeywordSpotter with the wake-word templates
+        on_wake: Optional callback called with the detection dict
+        interval: Seconds between two spotting passes
+    """
+    def __init__(self, engine, spotter: KeywordSpotter, on_wake: Optional[Callable[[dict], None]] = None,
+                 interval: float = 0.1):
+        self.engine = engine
+        self.spotter = spotter
+        self.on_wake = on_wake
+        self.interval = interval
+        self.sample_rate = spotter.sample_rate
+        self.buffer = AudioBuffer(self.sample_rate, max_seconds=30)
+        self.overflows = 0
+        self.running = False
+        self.thread = None
+        self.cpu_seconds = 0.0
+        self.started = None
+
+    def start(self) -> bool:
+        """Open the microphone and start listening; False if sounddevice is not available"""
+        if self.running:
+            return True
+        try:
+            import sounddevice
+        except ImportError as e:
+            print(f"Wake-word listener unavailable: {e}")
+            return False
+        self.running = True
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self._run, args=(sounddevice,), name="wake-word", daemon=True)
+        self.thread.start()
+        return True
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(timeout=2.0)
+
+    def cpu_fraction(self) -> float:
+        """Share of one CPU core used by spotting since start()"""
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        return self.cpu_seconds / elapsed if elapsed > 0 else 0.0
+
+    def _run(self, sd):
+        def callback(indata, frames, time_info, status):
+            # Copy and count only, as in VoiceEngine's capture callback
+            if status.input_overflow:
+                self.overflows += 1
+            self.buffer.write(indata[:, 0])
+
+        try:
+            with sd.InputStream(samplerate=self.sample_rate, channels=1, dtype='int16', blocksize=1024,
+                                latency='high', callback=callback):
+                print("Wake-word listener started")
+                consumed = 0
+                while self.running:
+                    time.sleep(self.interval)
+                    cpu_started = time.thread_time()
+                    end = self.buffer.written
+                    if self.engine.recording:
+                        self.spotter.reset(end)  # the engine has the audio now
+                    else:
+                        detection = self.spotter.feed(self.buffer.view(consumed, end))
+                        if detection is not None:
+                            self._wake(detection, end)
+                    consumed = end
+                    used = time.thread_time() - cpu_started
+                    self.cpu_seconds += used
+                    wake_cpu.inc(used)
+                print(f"Wake-word listener stopped ({self.cpu_fraction() * 100:.2f}% CPU while listening)")
+        except Exception as e:
+            print(f"Wake-word listener failed: {type(e).__name__}: {e}")
+        finally:
+            # Push-to-talk checks this and opens its own stream when the listener is not running
+            self.running = False
+
+    def _wake(self, detection: dict, position: int):
+        # Audio captured since the end of the word: VAD hangover, wait for the next pass and spotting time
+        latency = (self.buffer.written - detection["word_end"]) / self.sample_rate
+        wake_detections.inc()
+        wake_latency.observe(latency)
+        print(f"Wake word detected (distance {detection['distance']:.2f}, {latency * 1000:.0f} ms after the word)")
+        self.spotter.reset(position)
+        self.record(auto_stop=True)
+        if self.on_wake is not None:
+            self.on_wake(detection)
+
+    def record(self, auto_stop: bool = False):
+        """
+        Start an engine recording fed from the listener's stream. Push-to-talk uses this while
+        the listener runs, since a second microphone stream fails on exclusive-mode host APIs.
+        """
+        self.engine.start(source=self._forward, auto_stop=auto_stop)
+
+    def _forward(self, engine_buffer: AudioBuffer):
+        """Capture source of the engine: copy the listener's audio until the engine stops recording"""
+        position = self.buffer.written
+        while self.engine.recording and self.running:
+            time.sleep(0.02)
+            end = self.buffer.written
+            if end > position:
+                engine_buffer.write(self.buffer.view(position, end))
+                position = end